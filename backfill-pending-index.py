@@ -0,0 +1,48 @@
+"""
+Backfill pendingRestaurantId on reviews that are already pending, so they
+appear in the sparse PendingReviewsIndex. New reviews get it when scraped.
+"""
+
+import boto3
+from botocore.exceptions import ClientError
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+def backfill_pending_index():
+    reviews_table = boto3.resource('dynamodb').Table('Reviews')
+    
+    scan_kwargs = {
+        'FilterExpression': 'isFake = :pending AND attribute_not_exists(pendingRestaurantId)',
+        'ExpressionAttributeValues': {':pending': 'pending'},
+        'ProjectionExpression': 'reviewId, restaurantId'
+    }
+    updated = 0
+    skipped = 0
+    
+    while True:
+        response = reviews_table.scan(**scan_kwargs)
+        for review in response.get('Items', []):
+            try:
+                reviews_table.update_item(
+                    Key={'reviewId': review['reviewId']},
+                    UpdateExpression='SET pendingRestaurantId = :rid',
+                    ConditionExpression='isFake = :pending',
+                    ExpressionAttributeValues={':rid': review['restaurantId'], ':pending': 'pending'}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                skipped += 1  # Analyzed since the scan read it
+                continue
+            updated += 1
+        
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    print(f"✅ Added {updated} pending reviews to PendingReviewsIndex ({skipped} analyzed meanwhile, skipped)")
+
+if __name__ == "__main__":
+    backfill_pending_index()
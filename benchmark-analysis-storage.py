@@ -0,0 +1,150 @@
+"""
+Measure Review item size and write capacity with the full and the compact
+comprehendAnalysis encoding, on synthetic analyzed reviews, without calling AWS.
+Usage: python benchmark-analysis-storage.py [review_count]
+Item sizes follow DynamoDB's rules (attribute names + values, numbers at about
+one byte per two significant digits, 3 bytes + 1 per element for maps and lists);
+one WCU covers 1 KB of the written item.
+"""
+
+import importlib.util
+import json
+import math
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+WORDS = ('food service place staff nasi lemak roti canai teh tarik curry rice noodles chicken sambal spicy sweet '
+         'fresh cold hot slow quick friendly rude clean dirty cheap expensive portion price parking queue lunch '
+         'dinner weekend family friends again never always really very quite bit too amazing good bad okay '
+         'decent best worst great tasty bland crispy soft makanan sedap tempat harga servis lambat cepat').split()
+ENTITY_TYPES = ['COMMERCIAL_ITEM', 'ORGANIZATION', 'LOCATION', 'PERSON', 'QUANTITY', 'DATE']
+SENTIMENTS = ['POSITIVE', 'NEGATIVE', 'NEUTRAL', 'MIXED']
+
+def load_analyzer():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def value_size(value) -> int:
+    """DynamoDB size of an attribute value in bytes"""
+
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        digits = len(Decimal(str(value)).normalize().as_tuple().digits)
+        return (digits + 1) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(key.encode('utf-8')) + value_size(item) + 1 for key, item in value.items())
+    if isinstance(value, list):
+        return 3 + sum(value_size(item) + 1 for item in value)
+    raise TypeError(f"Unsupported attribute value {type(value)}")
+
+def item_size(item) -> int:
+    return sum(len(name.encode('utf-8')) + value_size(value) for name, value in item.items())
+
+def synthetic_review(analyzer, index: int, rng: random.Random):
+    """A stored review and the analysis result the analyzer would write for it"""
+
+    words = [rng.choice(WORDS) for _ in range(int(rng.lognormvariate(3.5, 0.6)) + 3)]
+    text = ' '.join(words).capitalize() + '.'
+    scores = [rng.random() for _ in SENTIMENTS]
+    total = sum(scores)
+    sentiment = {
+        'Sentiment': rng.choice(SENTIMENTS),
+        'SentimentScore': {name.capitalize(): score / total for name, score in zip(SENTIMENTS, scores)}
+    }
+    phrase_count = min(len(words) // 3, 15)
+    key_phrases = {'KeyPhrases': [{'Text': ' '.join(rng.sample(words, min(len(words), rng.randint(1, 3))))}
+                                  for _ in range(phrase_count)]}
+    entities = {'Entities': [{'Text': rng.choice(words).capitalize(), 'Type': rng.choice(ENTITY_TYPES)}
+                             for _ in range(rng.randint(0, 6))]}
+
+    result = analyzer.build_analysis_result(text, 'en', sentiment, key_phrases, entities)
+    if rng.random() < 0.05:
+        result = analyzer.apply_near_duplicates(result, [
+            {'reviewId': f'review_{rng.getrandbits(48):012x}', 'restaurantId': f'place_{rng.getrandbits(40):010x}',
+             'similarity': rng.uniform(0.8, 1.0)}
+            for _ in range(rng.randint(1, 3))
+        ])
+    if rng.random() < 0.5:
+        result = analyzer.apply_author_behavior(result, {
+            'review_count': rng.randint(1, 40), 'restaurants_reviewed': rng.randint(1, 30),
+            'rating_mean': rng.uniform(1, 5), 'rating_variance': rng.uniform(0, 2), 'five_star_share': rng.random(),
+            'hour_reviews': rng.randint(1, 25), 'hour_five_star_reviews': rng.randint(0, 12)
+        })
+
+    review = {
+        'reviewId': f'review_{index:012x}',
+        'restaurantId': f'place_{rng.getrandbits(40):010x}',
+        'authorName': f'Reviewer {rng.randint(1, 99999)}',
+        'authorKey': f'google#{rng.getrandbits(64)}',
+        'reviewText': text,
+        'rating': rng.randint(1, 5),
+        'reviewDate': '2026-10-17T09:00:00',
+        'scrapedAt': '2026-10-17T09:30:00.123456',
+        'language': result['language'],
+        'sentiment': result['sentiment'],
+        'isFake': 'true' if result['isFake'] else 'false',
+        'confidence': Decimal(str(result['confidence'])),
+        'sourceUrl': f'https://maps.google.com/?cid={rng.getrandbits(63)}',
+        'minhashSignature': bytes(4 * analyzer.MINHASH_PERMUTATIONS),
+        'analyzedAt': result['analysisTimestamp']
+    }
+    return review, result
+
+if __name__ == "__main__":
+    review_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    analyzer = load_analyzer()
+    rng = random.Random(42)
+
+    samples = [synthetic_review(analyzer, i, rng) for i in range(review_count)]
+    print(f"📦 {review_count} synthetic analyzed reviews")
+
+    totals = {'full': [0, 0, 0], 'compact': [0, 0, 0]}  # analysis bytes, item bytes, WCU
+    encode_seconds = decode_seconds = 0.0
+    mismatches = 0
+    for review, result in samples:
+        full = json.loads(json.dumps(result), parse_float=Decimal)  # As written before compact storage
+
+        started = time.perf_counter()
+        compact = analyzer.compact_analysis(result)
+        encode_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        decoded = analyzer.expand_analysis({**review, 'comprehendAnalysis': compact})
+        decode_seconds += time.perf_counter() - started
+        if decoded['fakeReasons'] != result['fakeReasons'] or any(
+                decoded.get(field) != result[field] for field in analyzer.ANALYSIS_BLOB_FIELDS if result.get(field)):
+            mismatches += 1  # Every stored value, scores included, must come back exactly
+
+        for name, analysis in (('full', full), ('compact', compact)):
+            size = item_size({**review, 'comprehendAnalysis': analysis})
+            totals[name][0] += value_size(analysis) + len('comprehendAnalysis')
+            totals[name][1] += size
+            totals[name][2] += math.ceil(size / 1024)
+
+    for name, (analysis_bytes, item_bytes, wcu) in totals.items():
+        print(f"📏 {name:8} comprehendAnalysis {analysis_bytes / review_count:7.1f} B, "
+              f"item {item_bytes / review_count:7.1f} B, {wcu / review_count:.3f} WCU per write")
+
+    saved_bytes = (totals['full'][1] - totals['compact'][1]) / review_count
+    saved_wcu = (totals['full'][2] - totals['compact'][2]) / review_count
+    print(f"💾 Saved {saved_bytes:.1f} B ({saved_bytes / (totals['full'][1] / review_count):.0%}) "
+          f"and {saved_wcu:.3f} WCU per review write")
+    print(f"⏱️  Encode {encode_seconds / review_count * 1e6:.1f} µs, decode {decode_seconds / review_count * 1e6:.1f} µs per review")
+    print(f"🔍 Round-trip mismatches: {mismatches}")
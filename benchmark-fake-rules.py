@@ -0,0 +1,72 @@
+"""
+Benchmark fake review scoring throughput for a ruleset, without calling AWS.
+Usage: python benchmark-fake-rules.py [ruleset.json] [review_count]
+With no ruleset the analyzer's built-in rules are measured.
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import time
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+SAMPLE_REVIEWS = [
+    ("Best ever! Amazing experience, perfect place, highly recommend. Five stars!", 'en', 'POSITIVE'),
+    ("Decent food but the service was slow. Prices are fair for the portion.", 'en', 'MIXED'),
+    ("Worst ever. Terrible experience, disgusting food, horrible service. Never again.", 'en', 'NEGATIVE'),
+    ("Good", 'en', 'POSITIVE'),
+    ("Makanan sangat hebat, terbaik sekali! Pasti datang lagi, lima bintang.", 'ms', 'POSITIVE'),
+    ("Nasi lemak sedap, harga berpatutan. Tempat letak kereta agak susah.", 'ms', 'NEUTRAL'),
+]
+
+def load_analyzer(ruleset_path: str = None):
+    if ruleset_path:
+        os.environ['FAKE_RULESET_PATH'] = os.path.abspath(ruleset_path)
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_review(rng: random.Random):
+    """A sample review with Comprehend-shaped outputs"""
+    text, language, sentiment = rng.choice(SAMPLE_REVIEWS)
+    score = rng.uniform(0.5, 1.0)
+    sentiment_data = {
+        'Sentiment': sentiment,
+        'SentimentScore': {'Positive': score if sentiment == 'POSITIVE' else 1 - score,
+                           'Negative': score if sentiment == 'NEGATIVE' else 1 - score}
+    }
+    key_phrases = {'KeyPhrases': [{'Text': part.strip()} for part in text.split(',') if part.strip()]}
+    entities = {'Entities': [{'Text': 'Restaurant', 'Type': rng.choice(['ORGANIZATION', 'LOCATION'])}
+                             for _ in range(rng.randint(0, 5))]}
+    return text, sentiment_data, key_phrases, entities, language
+
+def benchmark(ruleset_path: str = None, review_count: int = 100000):
+    analyzer = load_analyzer(ruleset_path)
+    rng = random.Random(42)
+    reviews = [synthetic_review(rng) for _ in range(review_count)]
+    
+    # Compile outside the timed loop, as a warm container would have
+    for language in {review[4] for review in reviews}:
+        analyzer.get_compiled_ruleset(language)
+    
+    started = time.perf_counter()
+    fake_count = sum(1 for review in reviews if analyzer.detect_fake_review_advanced(*review)['is_fake'])
+    elapsed = time.perf_counter() - started
+    
+    print(f"📏 Ruleset version {analyzer.fake_ruleset['version']} ({len(analyzer.fake_ruleset['rules'])} rules)")
+    print(f"⚡ Scored {review_count} reviews in {elapsed:.2f}s ({review_count / elapsed:,.0f} reviews/sec)")
+    print(f"🚩 Flagged {fake_count} as fake ({fake_count / review_count:.1%})")
+
+if __name__ == "__main__":
+    benchmark(
+        sys.argv[1] if len(sys.argv) > 1 else None,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    )
@@ -0,0 +1,139 @@
+"""
+Benchmark near-duplicate review detection with the analyzer's MinHash/LSH
+scheme on synthetic reviews, without calling AWS.
+Usage: python benchmark-near-duplicates.py [review_count] [query_count]
+Builds an in-memory LSH index (each band's bucket hashes sorted, so a bucket
+lookup is a binary search, like a DynamoDB key lookup), plants lightly edited
+copies, and compares LSH queries against a linear scan of all signatures' bands.
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import time
+import numpy as np
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+PLANTED_COPY_RATE = 0.01  # Share of reviews that are edited copies of an earlier one
+WORDS = ('food service place staff nasi lemak roti canai teh tarik curry rice noodles chicken sambal spicy sweet '
+         'fresh cold hot slow quick friendly rude clean dirty cheap expensive portion price parking queue lunch '
+         'dinner weekend family friends again never always really very quite bit too amazing good bad okay '
+         'decent best worst great tasty bland crispy soft makanan sedap tempat harga servis lambat cepat').split()
+
+def load_analyzer():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def synthetic_reviews(review_count: int, rng: random.Random):
+    """Random reviews, some of them copies of an earlier review with a word or two changed"""
+    
+    texts = []
+    copies = {}  # copy index -> original index
+    for i in range(review_count):
+        if texts and rng.random() < PLANTED_COPY_RATE:
+            original = rng.randrange(len(texts))
+            words = texts[original].split()
+            for _ in range(rng.randint(1, 2)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            texts.append(' '.join(words))
+            copies[i] = original
+        else:
+            texts.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 40))))
+    return texts, copies
+
+def benchmark(review_count: int = 1000000, query_count: int = 1000):
+    analyzer = load_analyzer()
+    import trustbites_common as common  # On sys.path once the analyzer is loaded
+    rng = random.Random(7)
+    
+    started = time.perf_counter()
+    texts, copies = synthetic_reviews(review_count, rng)
+    print(f"📝 Generated {review_count:,} reviews ({len(copies):,} planted copies) in {time.perf_counter() - started:.1f}s")
+    
+    # Build: signature and band hashes per review, then sort each band
+    started = time.perf_counter()
+    band_hashes = np.zeros((review_count, common.LSH_BANDS), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        signature = analyzer.minhash_signature(text)
+        band_hashes[i] = [int(bucket.split('#')[1], 16) for bucket in analyzer.lsh_buckets(signature)]
+        if (i + 1) % 100000 == 0:
+            print(f"   ...{i + 1:,} signed")
+    band_order = np.argsort(band_hashes, axis=0, kind='stable').T
+    sorted_bands = np.take_along_axis(band_hashes, band_order.T, axis=0).T.copy()
+    build_seconds = time.perf_counter() - started
+    print(f"🏗️  Indexed in {build_seconds:.1f}s ({review_count / build_seconds:,.0f} reviews/sec, "
+          f"{(band_hashes.nbytes + band_order.nbytes + sorted_bands.nbytes) / 2 ** 20:.0f} MiB)")
+    
+    def lsh_candidates(i: int) -> set:
+        found = set()
+        for band in range(common.LSH_BANDS):
+            row = sorted_bands[band]
+            low = np.searchsorted(row, band_hashes[i, band], side='left')
+            high = np.searchsorted(row, band_hashes[i, band], side='right')
+            found.update(band_order[band, low:high].tolist())
+        found.discard(i)
+        return found
+    
+    def linear_candidates(i: int) -> set:
+        found = set(np.nonzero((band_hashes == band_hashes[i]).any(axis=1))[0].tolist())
+        found.discard(i)
+        return found
+    
+    # Queries: planted copies (to measure recall) mixed with ordinary reviews
+    copy_ids = list(copies)
+    queries = rng.sample(copy_ids, min(len(copy_ids), query_count // 2))
+    queries += rng.sample(range(review_count), query_count - len(queries))
+    
+    min_similarity = analyzer.fake_ruleset['near_duplicates']['min_similarity']
+    lsh_times = []
+    qualifying_copies = 0
+    found_copies = 0
+    candidate_total = 0
+    confirmed_total = 0
+    for i in queries:
+        started = time.perf_counter()
+        candidates = lsh_candidates(i)
+        signature = analyzer.minhash_signature(texts[i])
+        matches = [
+            candidate for candidate in candidates
+            if analyzer.signature_similarity(signature, analyzer.minhash_signature(texts[candidate])) >= min_similarity
+        ]
+        lsh_times.append(time.perf_counter() - started)
+        candidate_total += len(candidates)
+        confirmed_total += len(matches)
+        
+        # Recall counts copies whose exact shingle Jaccard reaches the threshold
+        if i in copies:
+            copy_shingles = set(common.similarity_shingle_hashes(texts[i]))
+            original_shingles = set(common.similarity_shingle_hashes(texts[copies[i]]))
+            if len(copy_shingles & original_shingles) / len(copy_shingles | original_shingles) >= min_similarity:
+                qualifying_copies += 1
+                found_copies += copies[i] in matches
+    
+    linear_times = []
+    for i in queries[:20]:
+        started = time.perf_counter()
+        linear_candidates(i)
+        linear_times.append(time.perf_counter() - started)
+    
+    lsh_ms = np.array(lsh_times) * 1000
+    print(f"🔎 LSH query: {lsh_ms.mean():.2f} ms mean, {np.percentile(lsh_ms, 99):.2f} ms p99 "
+          f"({candidate_total / len(queries):.2f} candidates, {confirmed_total / len(queries):.2f} confirmed per query)")
+    print(f"🐢 Linear band scan: {np.mean(linear_times) * 1000:.1f} ms per query")
+    print(f"🎯 Recall on planted copies with Jaccard >= {min_similarity}: "
+          f"{found_copies}/{qualifying_copies} ({found_copies / max(qualifying_copies, 1):.1%})")
+
+if __name__ == "__main__":
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    )
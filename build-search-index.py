@@ -0,0 +1,40 @@
+"""
+Backfill the RestaurantSearchIndex table from existing Restaurants items.
+New restaurants are indexed when they are stored; run this once for older data.
+"""
+
+import os
+import sys
+import boto3
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+# The search index writer shared by the Lambdas
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions'))
+from trustbites_common import index_restaurant_for_search
+
+def build_search_index():
+    dynamodb = boto3.resource('dynamodb')
+    restaurants_table = dynamodb.Table('Restaurants')
+    search_index_table = dynamodb.Table('RestaurantSearchIndex')
+    
+    scan_kwargs = {'ProjectionExpression': 'restaurantId, #name, #loc',
+                   'ExpressionAttributeNames': {'#name': 'name', '#loc': 'location'}}
+    indexed = 0
+    
+    while True:
+        response = restaurants_table.scan(**scan_kwargs)
+        for restaurant in response.get('Items', []):
+            index_restaurant_for_search(search_index_table, restaurant)
+            indexed += 1
+        
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    print(f"✅ Indexed {indexed} restaurants")
+
+if __name__ == "__main__":
+    build_search_index()
@@ -11,6 +11,7 @@ def create_lambda():
     # Create zip
     with zipfile.ZipFile('function.zip', 'w') as zip_file:
         zip_file.write('lambda-functions/api-gateway-handler.py', 'lambda_function.py')
+        zip_file.write('lambda-functions/trustbites_common.py', 'trustbites_common.py')
     
     # Create function
     lambda_client = boto3.client('lambda')
@@ -23,7 +24,12 @@ def create_lambda():
             Handler='lambda_function.lambda_handler',
             Code={'ZipFile': zip_file.read()},
             Description='TrustBites API Gateway Handler',
-            Timeout=30
+            Timeout=30,
+            Environment={
+                'Variables': {
+                    'CURSOR_SECRET': os.environ['CURSOR_SECRET']  # Required; from .env.local
+                }
+            }
         )
     
     print(f"Created function: {response['FunctionName']}")
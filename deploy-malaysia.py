@@ -12,6 +12,7 @@ def deploy_to_malaysia():
     # Create zip
     with zipfile.ZipFile('function.zip', 'w') as zip_file:
         zip_file.write('lambda-functions/api-gateway-handler.py', 'lambda_function.py')
+        zip_file.write('lambda-functions/trustbites_common.py', 'trustbites_common.py')
     
     try:
         with open('function.zip', 'rb') as zip_file:
@@ -26,7 +27,8 @@ def deploy_to_malaysia():
                 Environment={
                     'Variables': {
                         'DYNAMODB_REGION': 'ap-southeast-5',  # DynamoDB now in Malaysia
-                        'COMPREHEND_REGION': 'ap-southeast-1'  # Comprehend in Singapore
+                        'COMPREHEND_REGION': 'ap-southeast-1',  # Comprehend in Singapore
+                        'CURSOR_SECRET': os.environ['CURSOR_SECRET']  # Required by the API handler
                     }
                 }
             )
@@ -4,10 +4,25 @@ Handles HTTP requests and orchestrates the workflow
 """
 
 import json
+import math
+import os
+import time
+import hmac
+import base64
+import hashlib
+import string
+import uuid
+import zlib
 import boto3
 import logging
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from decimal import Decimal
+from typing import Dict, Any, List, Set, Tuple
+
+from trustbites_common import UNKNOWN_SENTIMENT, index_restaurant_for_search, restaurant_id_for, search_trigrams
 
 # Configure logging
 logger = logging.getLogger()
@@ -19,6 +34,89 @@ dynamodb = boto3.resource('dynamodb')
 restaurants_table = dynamodb.Table('Restaurants')
 reviews_table = dynamodb.Table('Reviews')
 analysis_table = dynamodb.Table('AnalysisResults')
+search_index_table = dynamodb.Table('RestaurantSearchIndex')
+
+# Pagination
+MAX_PAGE_SIZE = 100
+QUERY_TIME_BUDGET_SECONDS = 3.0  # Per-page budget for filtered queries
+CURSOR_SECRET = os.environ.get('CURSOR_SECRET', '').encode()
+if not CURSOR_SECRET:
+    # A per-container key would reject cursors issued by any other container
+    raise RuntimeError("CURSOR_SECRET is not configured; set it on the API handler to sign pagination cursors")
+
+# Restaurant name search
+SEARCH_RESULT_LIMIT = 20
+SEARCH_MIN_COVERAGE = 0.6  # Share of query trigrams a name must contain
+SEARCH_MAX_POSTINGS_PER_TOKEN = 5000  # Trigrams with more postings are too common to enumerate
+SEARCH_MAX_VERIFY_KEYS = 5000  # Candidate postings looked up to score common trigrams
+
+# Compact comprehendAnalysis written by the analyzer (keep in sync with comprehend-analyzer.py)
+ANALYSIS_FORMAT = 1
+REASON_CODE_PREFIX = '#'
+REASON_VALUE_SEPARATOR = '|'
+ANALYSIS_BLOB_DICTIONARY = (
+    b'"authorSignals":{"review_count":"restaurants_reviewed":"rating_mean":"rating_variance":"five_star_share":'
+    b'"hour_reviews":"hour_five_star_reviews":},"nearDuplicates":[{"reviewId":"review_","restaurantId":"similarity":0.'
+    b'"entities":[{"text":"type":"COMMERCIAL_ITEM"},{"ORGANIZATION"LOCATION"PERSON"QUANTITY"DATE"EVENT"TITLE"OTHER"}],'
+    b'"keyPhrases":["the food","sentimentScores":{"Positive":0.,"Negative":0.,"Neutral":0.,"Mixed":0.'
+)
+
+# Response cache (lives as long as the warm container)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+RESPONSE_CACHE_TTL_SECONDS = {
+    'restaurants': 300,
+    'search': 300,
+    'reviews': 120
+}
+
+class ResponseCache:
+    """Size-bounded LRU cache of API responses with per-entry expiry"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, key: str, value: Dict, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self):
+        self.entries.clear()
+        self.invalidations += 1
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'maxEntries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES)
+finished_jobs_seen = set()  # Jobs whose completion already invalidated this container's cache
 
 def lambda_handler(event, context):
     """
@@ -41,40 +139,80 @@ def lambda_handler(event, context):
         
         logger.info(f"{http_method} {path} - {query_params}")
         
-        # Route requests
-        if path == '/api/restaurants':
-            if http_method == 'GET':
-                return handle_get_restaurants(query_params)
-            elif http_method == 'POST':
-                return handle_add_restaurant(body)
-                
-        elif path == '/api/restaurants/search':
-            return handle_search_restaurants(query_params)
-            
-        elif path.startswith('/api/restaurants/') and path.endswith('/reviews'):
-            restaurant_id = path.split('/')[3]  # Extract restaurant ID from path
-            if http_method == 'GET':
-                return handle_get_restaurant_reviews(restaurant_id, query_params)
-                
-        elif path == '/api/analyze':
-            if http_method == 'POST':
-                return handle_trigger_analysis(body)
-                
-        elif path == '/api/scrape':
-            if http_method == 'POST':
-                return handle_trigger_scraping(body)
-                
-        elif path.startswith('/api/analysis/'):
-            analysis_id = path.split('/')[3]
-            return handle_get_analysis_results(analysis_id)
-            
-        else:
-            return create_response(404, {'error': 'Endpoint not found'})
+        # Serve repeat GETs from the warm-container cache
+        ttl = cache_ttl(http_method, path)
+        if not ttl:
+            return route_request(http_method, path, query_params, body)
+        
+        cache_key = json.dumps([path, sorted(query_params.items())])
+        response = response_cache.get(cache_key)
+        if response is not None:
+            return with_cache_header(response, 'HIT')
+        
+        response = route_request(http_method, path, query_params, body)
+        if response and response.get('statusCode') == 200:
+            response_cache.set(cache_key, response, ttl)
+        return with_cache_header(response, 'MISS')
             
     except Exception as e:
         logger.error(f"Error in API handler: {str(e)}")
         return create_response(500, {'error': 'Internal server error'})
 
+def route_request(http_method: str, path: str, query_params: Dict, body: Dict) -> Dict:
+    """Dispatch a parsed request to its handler"""
+    
+    if path == '/api/restaurants':
+        if http_method == 'GET':
+            return handle_get_restaurants(query_params)
+        elif http_method == 'POST':
+            return handle_add_restaurant(body)
+            
+    elif path == '/api/restaurants/search':
+        return handle_search_restaurants(query_params)
+        
+    elif path.startswith('/api/restaurants/') and path.endswith('/reviews'):
+        restaurant_id = path.split('/')[3]  # Extract restaurant ID from path
+        if http_method == 'GET':
+            return handle_get_restaurant_reviews(restaurant_id, query_params)
+            
+    elif path == '/api/analyze':
+        if http_method == 'POST':
+            return handle_trigger_analysis(body)
+            
+    elif path == '/api/scrape':
+        if http_method == 'POST':
+            return handle_trigger_scraping(body)
+            
+    elif path.startswith('/api/analysis/'):
+        analysis_id = path.split('/')[3]
+        return handle_get_analysis_results(analysis_id)
+        
+    elif path == '/api/cache/stats':
+        return create_response(200, {'success': True, 'cache': response_cache.stats()})
+        
+    else:
+        return create_response(404, {'error': 'Endpoint not found'})
+
+def cache_ttl(http_method: str, path: str) -> int:
+    """Seconds a GET response for this path may be served from cache (0 = never)"""
+    
+    if http_method != 'GET':
+        return 0
+    if path == '/api/restaurants':
+        return RESPONSE_CACHE_TTL_SECONDS['restaurants']
+    if path == '/api/restaurants/search':
+        return RESPONSE_CACHE_TTL_SECONDS['search']
+    if path.startswith('/api/restaurants/') and path.endswith('/reviews'):
+        return RESPONSE_CACHE_TTL_SECONDS['reviews']
+    return 0
+
+def with_cache_header(response: Dict, status: str) -> Dict:
+    """Copy a response, tagging whether it came from the cache"""
+    
+    if not response:
+        return response
+    return {**response, 'headers': {**response.get('headers', {}), 'X-Cache': status}}
+
 def handle_get_restaurants(query_params: Dict) -> Dict:
     """
     GET /api/restaurants
@@ -82,20 +220,28 @@ def handle_get_restaurants(query_params: Dict) -> Dict:
     - location: Filter by location
     - cuisine: Filter by cuisine type
     - limit: Number of results (default 50)
+    - cursor: `next` token from the previous page
     """
     
     try:
         location = query_params.get('location')
         cuisine = query_params.get('cuisine')
-        limit = int(query_params.get('limit', 50))
+        limit = parse_limit(query_params, 50)
+        scope = cursor_scope('/api/restaurants', query_params)
+        start_key = decode_cursor(query_params.get('cursor'), scope)
+        
+        read_kwargs = {'Limit': limit}
+        if start_key:
+            read_kwargs['ExclusiveStartKey'] = start_key
         
         if location:
             # Query by location using GSI
             response = restaurants_table.query(
                 IndexName='LocationIndex',
-                KeyConditionExpression='location = :loc',
+                KeyConditionExpression='#loc = :loc',
+                ExpressionAttributeNames={'#loc': 'location'},  # 'location' is a reserved word
                 ExpressionAttributeValues={':loc': location},
-                Limit=limit
+                **read_kwargs
             )
         elif cuisine:
             # Query by cuisine using GSI
@@ -103,28 +249,33 @@ def handle_get_restaurants(query_params: Dict) -> Dict:
                 IndexName='CuisineIndex',
                 KeyConditionExpression='cuisine = :cuisine',
                 ExpressionAttributeValues={':cuisine': cuisine},
-                Limit=limit
+                **read_kwargs
             )
         else:
             # Scan all restaurants
-            response = restaurants_table.scan(Limit=limit)
+            response = restaurants_table.scan(**read_kwargs)
         
         restaurants = response.get('Items', [])
         
-        # Add summary statistics for each restaurant
+        # Review statistics are kept as a rollup on each restaurant item
         for restaurant in restaurants:
-            try:
-                stats = get_restaurant_review_stats(restaurant['restaurantId'])
-                restaurant.update(stats)
-            except Exception as e:
-                logger.error(f"Error getting stats for {restaurant['restaurantId']}: {str(e)}")
+            if 'reviewCount' not in restaurant:
+                # Restaurants stored before the rollup existed are rebuilt once
+                try:
+                    restaurant.update(rebuild_restaurant_review_stats(restaurant['restaurantId']))
+                except Exception as e:
+                    logger.error(f"Error rebuilding stats for {restaurant['restaurantId']}: {str(e)}")
+            restaurant.update(format_review_stats(restaurant))
         
         return create_response(200, {
             'success': True,
             'restaurants': restaurants,
-            'count': len(restaurants)
+            'count': len(restaurants),
+            'next': encode_cursor(response.get('LastEvaluatedKey'), scope)
         })
         
+    except ValueError as e:
+        return create_response(400, {'error': str(e)})
     except Exception as e:
         logger.error(f"Error in get_restaurants: {str(e)}")
         return create_response(500, {'error': str(e)})
@@ -132,48 +283,178 @@ def handle_get_restaurants(query_params: Dict) -> Dict:
 def handle_search_restaurants(query_params: Dict) -> Dict:
     """
     GET /api/restaurants/search?q=restaurant+name&location=city
-    Search restaurants by name and location
+    Search restaurants by name and location using the trigram index
+    Optional query parameters:
+    - limit: Number of results (default 20)
+    - cursor: `next` token from the previous page
     """
     
     try:
         search_query = query_params.get('q', '').lower()
         location = query_params.get('location', '')
+        limit = parse_limit(query_params, SEARCH_RESULT_LIMIT)
+        scope = cursor_scope('/api/restaurants/search', query_params)
+        offset = (decode_cursor(query_params.get('cursor'), scope) or {}).get('offset', 0)
         
         if not search_query:
             return create_response(400, {'error': 'Search query (q) is required'})
         
-        # Scan restaurants and filter by name (DynamoDB doesn't support text search)
-        response = restaurants_table.scan()
-        restaurants = response.get('Items', [])
+        query_trigrams = search_trigrams(search_query)
+        if not query_trigrams:
+            return create_response(400, {'error': 'Search query (q) must contain letters or digits'})
         
-        # Filter results
-        filtered_restaurants = []
-        for restaurant in restaurants:
-            name_match = search_query in restaurant.get('name', '').lower()
-            location_match = not location or location.lower() in restaurant.get('location', '').lower()
-            
-            if name_match and location_match:
-                filtered_restaurants.append(restaurant)
+        matches, complete = match_search_trigrams(query_trigrams, location.lower())
         
+        # Rank by coverage of the query, then by similarity of the whole name
+        ranked = []
+        for restaurant_id, entry in matches.items():
+            coverage = entry['hits'] / len(query_trigrams)
+            if coverage < SEARCH_MIN_COVERAGE:
+                continue
+            similarity = entry['hits'] / (len(query_trigrams) + entry['tokenCount'] - entry['hits'])
+            ranked.append((coverage, similarity, restaurant_id))
+        ranked.sort(reverse=True)
+        
+        page_ids = [restaurant_id for _, _, restaurant_id in ranked[offset:offset + limit]]
+        restaurants = get_restaurants_by_ids(page_ids)
+        
+        next_offset = offset + limit
         return create_response(200, {
             'success': True,
-            'restaurants': filtered_restaurants[:20],  # Limit results
-            'count': len(filtered_restaurants)
+            'restaurants': restaurants,
+            'count': len(ranked),
+            'complete': complete,
+            'next': encode_cursor({'offset': next_offset}, scope) if next_offset < len(ranked) else None
         })
         
+    except ValueError as e:
+        return create_response(400, {'error': str(e)})
     except Exception as e:
         logger.error(f"Error in search_restaurants: {str(e)}")
         return create_response(500, {'error': str(e)})
 
+def match_search_trigrams(query_trigrams: Set[str], location: str) -> Tuple[Dict[str, Dict], bool]:
+    """
+    Count the query trigrams each restaurant's name contains
+    Candidates come from the complete postings of the rarer trigrams. Trigrams
+    too common to enumerate are not read in full; instead each candidate's
+    posting for them is looked up. Returns the matches and whether they are
+    complete: False when the rare trigrams alone cannot reach the coverage
+    threshold, or there were too many candidates to look up all of them.
+    """
+    
+    with ThreadPoolExecutor(max_workers=min(len(query_trigrams), 16)) as executor:
+        posting_lists = dict(zip(query_trigrams, executor.map(get_search_postings, query_trigrams)))
+    
+    rare = {trigram: postings for trigram, (postings, enumerated) in posting_lists.items() if enumerated}
+    common = [trigram for trigram in query_trigrams if trigram not in rare]
+    # A name with fewer rare hits than this cannot reach the coverage threshold
+    min_rare_hits = math.ceil(SEARCH_MIN_COVERAGE * len(query_trigrams)) - len(common)
+    complete = min_rare_hits >= 1
+    
+    # Rarest first: once too few lists remain for a new name to reach min_rare_hits,
+    # the longer lists only add hits to names already found
+    matches = {}
+    generators = rare if rare else {trigram: postings for trigram, (postings, _) in posting_lists.items()}
+    for i, postings in enumerate(sorted(generators.values(), key=len)):
+        admit_new = len(generators) - i >= min_rare_hits
+        for posting in postings:
+            if location and location not in posting.get('locationKey', ''):
+                continue
+            entry = matches.get(posting['restaurantId'])
+            if entry is None:
+                if not admit_new:
+                    continue
+                entry = matches[posting['restaurantId']] = {'hits': 0, 'tokenCount': int(posting.get('tokenCount', 0))}
+            entry['hits'] += 1
+    if not rare:
+        return matches, False
+    
+    matches = {restaurant_id: entry for restaurant_id, entry in matches.items() if entry['hits'] >= min_rare_hits}
+    if common and matches:
+        # Look up the strongest candidates first if there are too many to check them all
+        candidates = sorted(matches, key=lambda restaurant_id: -matches[restaurant_id]['hits'])
+        verified = candidates[:SEARCH_MAX_VERIFY_KEYS // len(common)]
+        complete = complete and len(verified) == len(candidates)
+        keys = [
+            {'searchTerm': f"name#{trigram}", 'restaurantId': restaurant_id}
+            for restaurant_id in verified for trigram in common
+        ]
+        for posting in get_search_postings_by_keys(keys):
+            matches[posting['restaurantId']]['hits'] += 1
+    
+    return matches, complete
+
+def get_search_postings(trigram: str) -> Tuple[List[Dict], bool]:
+    """
+    Read the postings for one name trigram
+    Returns the postings and whether that is all of them; a trigram with more
+    than SEARCH_MAX_POSTINGS_PER_TOKEN postings is cut off there.
+    """
+    
+    query_kwargs = {
+        'KeyConditionExpression': 'searchTerm = :term',
+        'ExpressionAttributeValues': {':term': f"name#{trigram}"},
+        'ProjectionExpression': 'restaurantId, locationKey, tokenCount'
+    }
+    
+    postings = []
+    while len(postings) <= SEARCH_MAX_POSTINGS_PER_TOKEN:
+        response = search_index_table.query(**query_kwargs)
+        postings.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return postings, len(postings) <= SEARCH_MAX_POSTINGS_PER_TOKEN
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    return postings[:SEARCH_MAX_POSTINGS_PER_TOKEN], False
+
+def get_search_postings_by_keys(keys: List[Dict]) -> List[Dict]:
+    """Look up specific postings with parallel BatchGetItem calls; missing keys are skipped"""
+    
+    def get_chunk(chunk: List[Dict]) -> List[Dict]:
+        found = []
+        request = {search_index_table.name: {'Keys': chunk, 'ProjectionExpression': 'restaurantId'}}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            found.extend(response.get('Responses', {}).get(search_index_table.name, []))
+            request = response.get('UnprocessedKeys')
+        return found
+    
+    chunks = [keys[i:i + 100] for i in range(0, len(keys), 100)]
+    with ThreadPoolExecutor(max_workers=min(len(chunks), 16)) as executor:
+        return [posting for found in executor.map(get_chunk, chunks) for posting in found]
+
+def get_restaurants_by_ids(restaurant_ids: List[str]) -> List[Dict]:
+    """Fetch restaurants with BatchGetItem, keeping the order of restaurant_ids"""
+    
+    if not restaurant_ids:
+        return []
+    
+    found = {}
+    request = {'Restaurants': {'Keys': [{'restaurantId': rid} for rid in restaurant_ids]}}
+    while request:
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get('Restaurants', []):
+            found[item['restaurantId']] = item
+        request = response.get('UnprocessedKeys')
+    
+    return [found[rid] for rid in restaurant_ids if rid in found]
+
 def handle_get_restaurant_reviews(restaurant_id: str, query_params: Dict) -> Dict:
     """
     GET /api/restaurants/{id}/reviews
     Get reviews for a specific restaurant
+    Optional query parameters:
+    - fake: 'true' or 'false' to filter by classification
+    - limit: Number of results (default 50)
+    - cursor: `next` token from the previous page
     """
     
     try:
-        limit = int(query_params.get('limit', 50))
+        limit = parse_limit(query_params, 50)
         fake_filter = query_params.get('fake')  # 'true', 'false', or None for all
+        scope = cursor_scope(f'/api/restaurants/{restaurant_id}/reviews', query_params)
+        start_key = decode_cursor(query_params.get('cursor'), scope)
         
         # Query reviews for restaurant
         key_condition = 'restaurantId = :rid'
@@ -196,25 +477,108 @@ def handle_get_restaurant_reviews(restaurant_id: str, query_params: Dict) -> Dic
         if filter_expression:
             query_params_dynamo['FilterExpression'] = filter_expression
         
-        response = reviews_table.query(**query_params_dynamo)
-        reviews = response.get('Items', [])
+        # A filtered page can come back short, so keep reading until the page
+        # is full, the index is exhausted or the time budget runs out
+        reviews = []
+        last_key = start_key
+        deadline = time.monotonic() + QUERY_TIME_BUDGET_SECONDS
+        while True:
+            if last_key:
+                query_params_dynamo['ExclusiveStartKey'] = last_key
+            response = reviews_table.query(**query_params_dynamo)
+            items = response.get('Items', [])
+            last_key = response.get('LastEvaluatedKey')
+            
+            remaining = limit - len(reviews)
+            if len(items) > remaining:
+                # Resume right after the last review we return
+                items = items[:remaining]
+                last_key = {attr: items[-1][attr] for attr in ('reviewId', 'restaurantId', 'scrapedAt')}
+            reviews.extend(items)
+            
+            if not last_key or len(reviews) >= limit or time.monotonic() >= deadline:
+                break
         
         return create_response(200, {
             'success': True,
             'restaurant_id': restaurant_id,
-            'reviews': reviews,
-            'count': len(reviews)
+            'reviews': [expand_review(review) for review in reviews],
+            'count': len(reviews),
+            'next': encode_cursor(last_key, scope)
         })
         
+    except ValueError as e:
+        return create_response(400, {'error': str(e)})
     except Exception as e:
         logger.error(f"Error getting reviews for restaurant {restaurant_id}: {str(e)}")
         return create_response(500, {'error': str(e)})
 
+reason_templates = {}  # Ruleset version -> reason templates (versions never change)
+
+def get_reason_templates(version: str) -> Dict[str, str]:
+    """Reason templates the analyzer registered for a ruleset version"""
+    
+    if version not in reason_templates:
+        try:
+            item = analysis_table.get_item(Key={'analysisId': f'ruleset_{version}'}).get('Item')
+        except Exception as e:
+            logger.error(f"Error loading reason templates of ruleset {version}: {str(e)}")
+            return {}
+        reason_templates[version] = item['reasonTemplates'] if item else {}
+    return reason_templates[version]
+
+def decode_reason(encoded: str, templates: Dict[str, str]) -> str:
+    """Reason sentence from a '#<code>|<value>|...' reason code"""
+    
+    if not encoded.startswith(REASON_CODE_PREFIX):
+        return encoded  # Stored verbatim
+    code, *values = encoded[len(REASON_CODE_PREFIX):].split(REASON_VALUE_SEPARATOR)
+    template = templates.get(code)
+    if template is None:
+        return encoded
+    fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+    if len(fields) != len(values):
+        return encoded
+    return template.format(**dict(zip(fields, values)))
+
+def expand_review(review: Dict) -> Dict:
+    """Review with its compact comprehendAnalysis decoded to the full analysis result"""
+    
+    stored = review.get('comprehendAnalysis')
+    if not stored or stored.get('format') != ANALYSIS_FORMAT:
+        return review  # Written before compact storage
+    
+    payload = {}
+    if 'blob' in stored:
+        decompressor = zlib.decompressobj(-15, zdict=ANALYSIS_BLOB_DICTIONARY)
+        payload = json.loads(decompressor.decompress(bytes(stored['blob'])) + decompressor.flush())
+    templates = get_reason_templates(stored['rulesetVersion'])
+    analysis = {
+        'language': review.get('language'),
+        'sentiment': review.get('sentiment'),
+        'sentimentScores': payload.get('sentimentScores', {}),
+        'keyPhrases': payload.get('keyPhrases', []),
+        'entities': payload.get('entities', []),
+        'isFake': review.get('isFake') == 'true',
+        'confidence': review.get('confidence'),
+        'fakeReasons': [decode_reason(code, templates) for code in stored.get('reasonCodes', [])],
+        'rulesetVersion': stored['rulesetVersion'],
+        'analysisTimestamp': review.get('analyzedAt')
+    }
+    for field in ('nearDuplicates', 'authorSignals'):
+        if field in payload:
+            analysis[field] = payload[field]
+    for field in ('prescorerVersion', 'error'):
+        if field in stored:
+            analysis[field] = stored[field]
+    return {**review, 'comprehendAnalysis': analysis}
+
 def handle_trigger_scraping(body: Dict) -> Dict:
     """
     POST /api/scrape
-    Trigger Google Maps scraping for a restaurant
+    Queue Google Maps scraping for a restaurant
     Body: {"restaurant_name": "Name", "location": "City", "max_reviews": 50}
+    Poll GET /api/analysis/{job_id} for progress
     """
     
     try:
@@ -225,33 +589,13 @@ def handle_trigger_scraping(body: Dict) -> Dict:
         if not restaurant_name:
             return create_response(400, {'error': 'restaurant_name is required'})
         
-        # Invoke scraper Lambda
         scraper_payload = {
             'restaurant_name': restaurant_name,
             'location': location,
             'max_reviews': max_reviews
         }
         
-        response = lambda_client.invoke(
-            FunctionName='trustbites-google-scraper',  # Update with actual function name
-            InvocationType='RequestResponse',
-            Payload=json.dumps(scraper_payload)
-        )
-        
-        result = json.loads(response['Payload'].read())
-        
-        if response['StatusCode'] == 200:
-            return create_response(200, {
-                'success': True,
-                'message': 'Scraping completed',
-                'result': result
-            })
-        else:
-            return create_response(500, {
-                'success': False,
-                'error': 'Scraping failed',
-                'details': result
-            })
+        return enqueue_job('scrape', 'trustbites-google-scraper', scraper_payload)  # Update with actual function name
             
     except Exception as e:
         logger.error(f"Error triggering scraping: {str(e)}")
@@ -260,37 +604,92 @@ def handle_trigger_scraping(body: Dict) -> Dict:
 def handle_trigger_analysis(body: Dict) -> Dict:
     """
     POST /api/analyze  
-    Trigger review analysis
-    Body: {"restaurant_id": "rest_123"} or {"review_ids": ["rev_1", "rev_2"]}
+    Queue review analysis
+    Body: {"restaurant_id": "rest_123"} or {"review_ids": ["rev_1", "rev_2"]} or {"analyze_all_pending": true}
+    Poll GET /api/analysis/{job_id} for progress
     """
     
     try:
-        # Invoke Comprehend analyzer Lambda
-        analyzer_payload = body
+        if not ('review_ids' in body or 'restaurant_id' in body or body.get('analyze_all_pending')):
+            return create_response(400, {'error': 'Must specify review_ids, restaurant_id, or analyze_all_pending'})
         
-        response = lambda_client.invoke(
-            FunctionName='trustbites-comprehend-analyzer',  # Update with actual function name
-            InvocationType='RequestResponse', 
-            Payload=json.dumps(analyzer_payload)
+        return enqueue_job('analysis', 'trustbites-comprehend-analyzer', body)  # Update with actual function name
+            
+    except Exception as e:
+        logger.error(f"Error triggering analysis: {str(e)}")
+        return create_response(500, {'error': str(e)})
+
+def enqueue_job(job_type: str, function_name: str, payload: Dict) -> Dict:
+    """Record a queued job in AnalysisResults and invoke its worker asynchronously"""
+    
+    job_id = f"job_{uuid.uuid4().hex[:12]}"
+    now = datetime.now().isoformat()
+    
+    job = {
+        'analysisId': job_id,
+        'jobType': job_type,
+        'status': 'queued',
+        'request': json.loads(json.dumps(payload), parse_float=Decimal),  # DynamoDB rejects floats
+        'createdAt': now,
+        'updatedAt': now,
+        'analysisDate': now
+    }
+    if payload.get('restaurant_id'):
+        job['restaurantId'] = payload['restaurant_id']
+    
+    analysis_table.put_item(Item=job)
+    
+    try:
+        # 'Event' returns as soon as Lambda accepts the invocation
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({**payload, 'job_id': job_id})
+        )
+    except Exception as e:
+        analysis_table.update_item(
+            Key={'analysisId': job_id},
+            UpdateExpression='SET #status = :failed, #error = :error, updatedAt = :now',
+            ExpressionAttributeNames={'#status': 'status', '#error': 'error'},
+            ExpressionAttributeValues={':failed': 'failed', ':error': str(e), ':now': datetime.now().isoformat()}
         )
+        raise
+    
+    response_cache.invalidate()  # Restaurants and reviews are about to change
+    
+    return create_response(202, {
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f"/api/analysis/{job_id}"
+    })
+
+def handle_get_analysis_results(analysis_id: str) -> Dict:
+    """
+    GET /api/analysis/{id}
+    Get the status and result of a scrape or analysis job
+    """
+    
+    try:
+        response = analysis_table.get_item(Key={'analysisId': analysis_id})
+        job = response.get('Item')
         
-        result = json.loads(response['Payload'].read())
+        if not job:
+            return create_response(404, {'error': f'Analysis {analysis_id} not found'})
+        
+        # Cached lists may predate what the finished job wrote
+        if job.get('status') in ('completed', 'failed') and analysis_id not in finished_jobs_seen:
+            finished_jobs_seen.add(analysis_id)
+            response_cache.invalidate()
+        
+        return create_response(200, {
+            'success': True,
+            'job_id': analysis_id,
+            'job': job
+        })
         
-        if response['StatusCode'] == 200:
-            return create_response(200, {
-                'success': True,
-                'message': 'Analysis completed',
-                'result': result
-            })
-        else:
-            return create_response(500, {
-                'success': False,
-                'error': 'Analysis failed',
-                'details': result
-            })
-            
     except Exception as e:
-        logger.error(f"Error triggering analysis: {str(e)}")
+        logger.error(f"Error getting analysis {analysis_id}: {str(e)}")
         return create_response(500, {'error': str(e)})
 
 def handle_add_restaurant(body: Dict) -> Dict:
@@ -300,9 +699,12 @@ def handle_add_restaurant(body: Dict) -> Dict:
     """
     
     try:
-        import uuid
-        
-        restaurant_id = f"rest_{uuid.uuid4().hex[:8]}"
+        # With a Google place ID, use the ID the scrapers derive from it so a later scrape updates this item
+        place_id = body.get('googlePlaceId')
+        if place_id:
+            restaurant_id = restaurant_id_for(place_id)
+        else:
+            restaurant_id = f"rest_{uuid.uuid4().hex[:8]}"
         
         item = {
             'restaurantId': restaurant_id,
@@ -315,10 +717,16 @@ def handle_add_restaurant(body: Dict) -> Dict:
             'avgRating': body.get('avgRating', 0.0),
             'totalReviews': body.get('totalReviews', 0),
             'lastScraped': datetime.now().isoformat(),
-            'googlePlaceId': body.get('googlePlaceId', '')
+            'googlePlaceId': body.get('googlePlaceId', ''),
+            'reviewCount': 0,
+            'fakeCount': 0,
+            'sentimentBreakdown': {}
         }
         
-        restaurants_table.put_item(Item=item)
+        # A known place ID replaces the stored item; its old name's postings must go too
+        previous = restaurants_table.put_item(Item=item, ReturnValues='ALL_OLD').get('Attributes')
+        index_restaurant_for_search(search_index_table, item, previous.get('name') if previous else None)
+        response_cache.invalidate()
         
         return create_response(201, {
             'success': True,
@@ -331,41 +739,37 @@ def handle_add_restaurant(body: Dict) -> Dict:
         return create_response(500, {'error': str(e)})
 
 def get_restaurant_review_stats(restaurant_id: str) -> Dict:
-    """Get review statistics for a restaurant"""
+    """Compute review statistics for a restaurant from its reviews"""
     
     try:
         # Query all reviews for restaurant
-        response = reviews_table.query(
-            IndexName='RestaurantIndex',
-            KeyConditionExpression='restaurantId = :rid',
-            ExpressionAttributeValues={':rid': restaurant_id}
-        )
-        
-        reviews = response.get('Items', [])
-        
-        if not reviews:
-            return {
-                'reviewCount': 0,
-                'fakeCount': 0,
-                'fakePercentage': 0.0,
-                'sentimentBreakdown': {}
-            }
-        
-        # Calculate statistics
-        total_reviews = len(reviews)
-        fake_reviews = len([r for r in reviews if r.get('isFake') == 'true'])
-        fake_percentage = (fake_reviews / total_reviews) * 100 if total_reviews > 0 else 0.0
+        query_kwargs = {
+            'IndexName': 'RestaurantIndex',
+            'KeyConditionExpression': 'restaurantId = :rid',
+            'ExpressionAttributeValues': {':rid': restaurant_id},
+            'ProjectionExpression': 'isFake, sentiment'
+        }
         
-        # Sentiment breakdown
+        total_reviews = 0
+        fake_reviews = 0
         sentiments = {}
-        for review in reviews:
-            sentiment = review.get('sentiment', 'UNKNOWN')
-            sentiments[sentiment] = sentiments.get(sentiment, 0) + 1
+        while True:
+            response = reviews_table.query(**query_kwargs)
+            for review in response.get('Items', []):
+                total_reviews += 1
+                if review.get('isFake') == 'true':
+                    fake_reviews += 1
+                sentiment = review.get('sentiment', UNKNOWN_SENTIMENT)
+                if sentiment != UNKNOWN_SENTIMENT:
+                    sentiments[sentiment] = sentiments.get(sentiment, 0) + 1
+            
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
         
         return {
             'reviewCount': total_reviews,
             'fakeCount': fake_reviews,
-            'fakePercentage': round(fake_percentage, 2),
             'sentimentBreakdown': sentiments
         }
         
@@ -373,6 +777,98 @@ def get_restaurant_review_stats(restaurant_id: str) -> Dict:
         logger.error(f"Error getting restaurant stats: {str(e)}")
         return {}
 
+def rebuild_restaurant_review_stats(restaurant_id: str) -> Dict:
+    """Recompute the review rollup for a restaurant and store it on the item"""
+    
+    stats = get_restaurant_review_stats(restaurant_id)
+    if not stats:
+        return {}
+    
+    try:
+        restaurants_table.update_item(
+            Key={'restaurantId': restaurant_id},
+            UpdateExpression='SET reviewCount = :count, fakeCount = :fake, sentimentBreakdown = :sentiments',
+            ConditionExpression='attribute_exists(restaurantId) AND attribute_not_exists(reviewCount)',
+            ExpressionAttributeValues={
+                ':count': stats['reviewCount'],
+                ':fake': stats['fakeCount'],
+                ':sentiments': stats['sentimentBreakdown']
+            }
+        )
+    except ClientError as e:
+        # Another writer initialised the rollup first; its counts win
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    
+    return stats
+
+def format_review_stats(restaurant: Dict) -> Dict:
+    """Build the review statistics returned by the API from a restaurant's rollup"""
+    
+    review_count = int(restaurant.get('reviewCount', 0))
+    fake_count = int(restaurant.get('fakeCount', 0))
+    fake_percentage = (fake_count / review_count) * 100 if review_count > 0 else 0.0
+    
+    return {
+        'reviewCount': review_count,
+        'fakeCount': fake_count,
+        'fakePercentage': round(fake_percentage, 2),
+        'sentimentBreakdown': {
+            sentiment: int(count)
+            for sentiment, count in (restaurant.get('sentimentBreakdown') or {}).items()
+            if int(count) > 0 and sentiment != UNKNOWN_SENTIMENT
+        }
+    }
+
+def parse_limit(query_params: Dict, default: int) -> int:
+    """Read the page size from query parameters, capped at MAX_PAGE_SIZE"""
+    
+    try:
+        limit = int(query_params.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def cursor_scope(path: str, query_params: Dict) -> str:
+    """Identify the query a cursor belongs to, so it cannot be replayed elsewhere"""
+    
+    params = sorted((k, v) for k, v in query_params.items() if k not in ('cursor', 'limit'))
+    return json.dumps([path, params])
+
+def encode_cursor(position: Dict, scope: str):
+    """Turn a resume position into an opaque, signed `next` token"""
+    
+    if not position:
+        return None
+    
+    payload = json.dumps({'scope': scope, 'position': position}, separators=(',', ':'), default=str).encode()
+    signature = hmac.new(CURSOR_SECRET, payload, hashlib.sha256).digest()
+    return '.'.join(base64.urlsafe_b64encode(part).decode().rstrip('=') for part in (payload, signature))
+
+def decode_cursor(token: str, scope: str):
+    """Verify a `next` token and return its resume position"""
+    
+    if not token:
+        return None
+    
+    try:
+        payload, signature = (
+            base64.urlsafe_b64decode(part + '=' * (-len(part) % 4)) for part in token.split('.')
+        )
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    
+    expected = hmac.new(CURSOR_SECRET, payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise ValueError('Invalid cursor')
+    
+    data = json.loads(payload)
+    if data.get('scope') != scope:
+        raise ValueError('Cursor does not belong to this query')
+    return data['position']
+
 def create_response(status_code: int, body: Dict) -> Dict:
     """Create properly formatted API Gateway response"""
     
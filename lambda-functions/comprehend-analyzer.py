@@ -4,24 +4,172 @@ Analyzes reviews for sentiment, language, and fake detection
 """
 
 import json
+import os
+import uuid
+import time
+import hashlib
+import math
+import random
+import string
+import threading
+import zlib
 import boto3
 import logging
+from botocore.exceptions import ClientError
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
 import re
 
+from trustbites_common import (
+    MINHASH_PERMUTATIONS, UNKNOWN_SENTIMENT, index_review_for_similarity, lsh_buckets, minhash_signature,
+    unpack_signature, update_restaurant_review_stats
+)
+
+try:
+    import numpy as np
+except ImportError:  # The local pre-scorer needs NumPy; without it every review goes to Comprehend
+    np = None
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Comprehend batch APIs accept at most 25 documents per call
+COMPREHEND_BATCH_SIZE = 25
+SUPPORTED_LANGUAGES = ['en', 'es', 'fr', 'de', 'it', 'pt', 'ar', 'hi', 'ja', 'ko', 'zh', 'zh-TW']
+
+# Concurrent execution mode (event "concurrency" overrides the default)
+ANALYSIS_CONCURRENCY = int(os.environ.get('ANALYSIS_CONCURRENCY', 1))
+MAX_THROTTLE_RETRIES = 5
+THROTTLE_BACKOFF_BASE_SECONDS = 0.2
+THROTTLE_BACKOFF_MAX_SECONDS = 5.0
+THROTTLE_DECREASE_COOLDOWN_SECONDS = 1.0  # One halving per burst of throttles
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded'
+}
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_SIZE = 100
+BATCH_GET_CONCURRENCY = 8
+REVIEW_ANALYSIS_ATTRIBUTES = ['reviewId', 'restaurantId', 'reviewText', 'rating', 'language', 'minhashSignature',
+                              'authorKey', 'reviewDate']
+
+# Content-hash cache of Comprehend outputs
+ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYSIS_CACHE_TTL_DAYS', 30)) * 24 * 3600
+ANALYSIS_CACHE_MEMORY_ENTRIES = 10000
+
+# Sparse GSI holding only pending reviews (pendingRestaurantId exists only while pending)
+PENDING_INDEX_NAME = 'PendingReviewsIndex'
+
+# Backlog drain mode
+DRAIN_SCAN_PAGE_SIZE = 1000  # Items evaluated per scan page
+DRAIN_MIN_TIME_MARGIN_MS = 30000  # Stop before the Lambda deadline by at least this much
+DRAIN_MAX_PASSES = int(os.environ.get('DRAIN_MAX_PASSES', 10))  # Full passes over the pending index
+DRAIN_MAX_CONTINUATIONS = int(os.environ.get('DRAIN_MAX_CONTINUATIONS', 100))  # Self-invocations per drain
+
+# Optional JSON file replacing the built-in fake review ruleset
+FAKE_RULESET_PATH = os.environ.get('FAKE_RULESET_PATH')
+
+# Near-duplicate lookups (MinHash/LSH parameters live in trustbites_common)
+LSH_MAX_BUCKET_CANDIDATES = 50  # Postings read per bucket
+
+# Comprehend outputs and near-duplicate matches kept on a stored analysis result
+STORED_KEY_PHRASES = 10
+STORED_ENTITIES = 5
+STORED_NEAR_DUPLICATES = 5
+
+# Local pre-scorer (JSON model from train-prescorer.py) that finalizes clear-cut reviews without Comprehend
+PRESCORER_MODEL_PATH = os.environ.get('PRESCORER_MODEL_PATH')
+PRESCORER_BATCH_SIZE = 1000  # Reviews per feature matrix
+PRESCORER_DENSE_FEATURES = 4  # Length, rating, exclamation density, superlatives
+PRESCORER_SUPERLATIVES = [
+    'best', 'worst', 'amazing', 'perfect', 'awesome', 'excellent', 'outstanding', 'incredible',
+    'fantastic', 'terrible', 'horrible', 'awful', 'disgusting', 'greatest', 'ever',
+    'terbaik', 'terburuk', 'hebat', 'sangat', 'paling'
+]
+
+# Compact comprehendAnalysis: reasons as codes into the ruleset's reason templates
+# (registered on the AnalysisResults item ruleset_<version>), Comprehend outputs
+# in one compressed blob, nothing that is already a top-level review attribute
+ANALYSIS_FORMAT = 1
+ANALYSIS_BLOB_FIELDS = ['sentimentScores', 'keyPhrases', 'entities', 'nearDuplicates', 'authorSignals']
+REASON_CODE_PREFIX = '#'
+REASON_VALUE_SEPARATOR = '|'
+# Preset deflate dictionary for the blob (raw deflate); changing it needs a new ANALYSIS_FORMAT
+ANALYSIS_BLOB_DICTIONARY = (
+    b'"authorSignals":{"review_count":"restaurants_reviewed":"rating_mean":"rating_variance":"five_star_share":'
+    b'"hour_reviews":"hour_five_star_reviews":},"nearDuplicates":[{"reviewId":"review_","restaurantId":"similarity":0.'
+    b'"entities":[{"text":"type":"COMMERCIAL_ITEM"},{"ORGANIZATION"LOCATION"PERSON"QUANTITY"DATE"EVENT"TITLE"OTHER"}],'
+    b'"keyPhrases":["the food","sentimentScores":{"Positive":0.,"Negative":0.,"Neutral":0.,"Mixed":0.'
+)
+FIXED_REASON_TEMPLATES = {
+    'ce': 'Basic analysis due to Comprehend error',
+    'ps': 'Local pre-scorer: {verdict} (p={p})'
+}
+
 # AWS clients
 comprehend = boto3.client('comprehend')
+lambda_client = boto3.client('lambda')
 dynamodb = boto3.resource('dynamodb')
+restaurants_table = dynamodb.Table('Restaurants')
 reviews_table = dynamodb.Table('Reviews')
+analysis_table = dynamodb.Table('AnalysisResults')
+analysis_cache_table = dynamodb.Table('AnalysisCache')
+similarity_index_table = dynamodb.Table('ReviewSimilarityIndex')
+author_profiles_table = dynamodb.Table('AuthorProfiles')
 
 def lambda_handler(event, context):
     """
-    Lambda handler for review analysis using Amazon Comprehend
+    Lambda entry point
+    When invoked for an API job (event carries "job_id"), progress and the
+    result are recorded on the job's AnalysisResults item
+    """
+    
+    job_id = event.get('job_id')
+    if job_id:
+        update_job_status(job_id, 'running')
+    
+    result = run_analysis(event, context)
+    
+    if job_id:
+        body = json.loads(result['body'], parse_float=Decimal)
+        if body.get('continued'):
+            # A follow-up invocation carries on with the same job
+            update_job_status(job_id, 'running', {'progress': body})
+        elif result['statusCode'] == 200:
+            update_job_status(job_id, 'completed', {'result': body})
+        else:
+            update_job_status(job_id, 'failed', {'error': body.get('error', 'Unknown error')})
+    
+    return result
+
+def update_job_status(job_id: str, status: str, fields: Optional[Dict] = None):
+    """Record job progress on its AnalysisResults item"""
+    
+    now = datetime.now().isoformat()
+    attributes = {'status': status, 'updatedAt': now, **(fields or {})}
+    if status in ('completed', 'failed'):
+        attributes['completedAt'] = now
+    
+    try:
+        analysis_table.update_item(
+            Key={'analysisId': job_id},
+            UpdateExpression='SET ' + ', '.join(f'#a{i} = :v{i}' for i in range(len(attributes))),
+            ExpressionAttributeNames={f'#a{i}': name for i, name in enumerate(attributes)},
+            ExpressionAttributeValues={f':v{i}': value for i, value in enumerate(attributes.values())}
+        )
+    except Exception as e:
+        logger.error(f"Error updating job {job_id}: {str(e)}")
+
+def run_analysis(event, context):
+    """
+    Run review analysis using Amazon Comprehend
     
     Expected event structure:
     {
@@ -29,11 +177,17 @@ def lambda_handler(event, context):
         # OR
         "restaurant_id": "rest_123",           # Analyze all pending reviews for restaurant
         # OR  
-        "analyze_all_pending": true            # Analyze all pending reviews
+        "analyze_all_pending": true,           # Analyze all pending reviews
+        "drain": true                          # ...across as many invocations as needed
     }
+    Optional: "concurrency": 8 to analyze on a worker pool,
+              "prescore": false to send every review to Comprehend
     """
     
     try:
+        if event.get('analyze_all_pending') and event.get('drain'):
+            return drain_pending_reviews(event, context)
+        
         # Get reviews to analyze
         if 'review_ids' in event:
             reviews = get_reviews_by_ids(event['review_ids'])
@@ -57,28 +211,29 @@ def lambda_handler(event, context):
                 })
             }
         
-        logger.info(f"Analyzing {len(reviews)} reviews")
+        analysis_cache_stats.reset()
+        prescorer_stats.reset()
+        concurrency = int(event.get('concurrency', ANALYSIS_CONCURRENCY))
+        logger.info(f"Analyzing {len(reviews)} reviews (concurrency {concurrency})")
+        started = time.monotonic()
         
-        # Analyze each review
-        analyzed_count = 0
-        for review in reviews:
-            try:
-                analysis_result = analyze_review_with_comprehend(review['reviewText'], review['language'])
-                
-                # Update review with analysis results
-                update_review_analysis(review['reviewId'], analysis_result)
-                analyzed_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error analyzing review {review['reviewId']}: {str(e)}")
-                continue
+        analyzed_count, engine_stats = analyze_and_store(reviews, concurrency, event.get('prescore', True))
+        
+        elapsed = time.monotonic() - started
+        reviews_per_second = round(analyzed_count / elapsed, 2) if elapsed > 0 else 0.0
+        logger.info(f"Analyzed {analyzed_count} reviews in {elapsed:.2f}s ({reviews_per_second} reviews/sec)")
         
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
                 'analyzed_count': analyzed_count,
-                'total_reviews': len(reviews)
+                'total_reviews': len(reviews),
+                'elapsed_seconds': round(elapsed, 3),
+                'reviews_per_second': reviews_per_second,
+                'analysis_cache': analysis_cache_stats.snapshot(),
+                'prescorer': prescorer_stats.snapshot(),
+                **engine_stats
             })
         }
         
@@ -89,43 +244,245 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_reviews_by_ids(review_ids: List[str]) -> List[Dict]:
-    """Get specific reviews by their IDs"""
-    reviews = []
+def analyze_and_store(reviews: List[Dict], concurrency: int, prescore: bool = True) -> Tuple[int, Dict]:
+    """Analyze reviews and write the results, serially or on the worker pool"""
+    
+    review_signals = gather_review_signals(reviews)
+    
+    if concurrency > 1:
+        engine_stats = analyze_and_store_concurrently(reviews, concurrency, prescore, review_signals)
+        return engine_stats.pop('analyzed_count'), engine_stats
     
-    for review_id in review_ids:
+    # Analyze reviews in language-grouped batches
+    analysis_results = analyze_reviews_batch(reviews, prescore)
+    
+    analyzed_count = 0
+    for review in reviews:
         try:
-            response = reviews_table.get_item(Key={'reviewId': review_id})
-            if 'Item' in response:
-                reviews.append(response['Item'])
+            # Update review with analysis results
+            store_analysis(review['reviewId'], analysis_results[review['reviewId']], review_signals)
+            analyzed_count += 1
+            
         except Exception as e:
-            logger.error(f"Error getting review {review_id}: {str(e)}")
+            logger.error(f"Error analyzing review {review['reviewId']}: {str(e)}")
+            continue
     
-    return reviews
+    return analyzed_count, {}
 
-def get_pending_reviews_by_restaurant(restaurant_id: str) -> List[Dict]:
-    """Get all pending reviews for a specific restaurant"""
+def drain_pending_reviews(event: Dict, context) -> Dict:
+    """
+    Work through the whole pending backlog within the invocation's time budget
+    Pages through the sparse pending index, analyzing reviews as they are
+    read. Before the deadline the scan position is checkpointed on an
+    AnalysisResults item and the function re-invokes itself to continue. A
+    drain ends after a full pass over the table finds nothing pending, and
+    fails when a pass analyzes none of the reviews it found (they would only
+    be retried forever) or the pass or continuation cap is reached.
+    """
+    
+    drain_id = event.get('job_id') or event.get('drain_id') or f"drain_{uuid.uuid4().hex[:12]}"
+    cursor = event.get('cursor')
+    pass_found = int(event.get('pass_found', 0))
+    pass_analyzed = int(event.get('pass_analyzed', 0))
+    passes = int(event.get('passes', 0))
+    continuations = int(event.get('continuations', 0))
+    total_analyzed = int(event.get('total_analyzed', 0))
+    concurrency = int(event.get('concurrency', ANALYSIS_CONCURRENCY))
+    
+    analysis_cache_stats.reset()
+    prescorer_stats.reset()
+    started = time.monotonic()
+    analyzed_count = 0
+    slowest_page_ms = 0.0
+    finished = False
+    error = None
+    
+    while True:
+        page_started = time.monotonic()
+        scan_kwargs = {
+            'IndexName': PENDING_INDEX_NAME,
+            'Limit': DRAIN_SCAN_PAGE_SIZE
+        }
+        if cursor:
+            scan_kwargs['ExclusiveStartKey'] = cursor
+        response = reviews_table.scan(**scan_kwargs)
+        
+        reviews = response.get('Items', [])
+        pass_found += len(reviews)
+        if reviews:
+            page_analyzed, _ = analyze_and_store(reviews, concurrency, event.get('prescore', True))
+            analyzed_count += page_analyzed
+            pass_analyzed += page_analyzed
+        
+        cursor = response.get('LastEvaluatedKey')
+        if not cursor:
+            passes += 1
+            if pass_found == 0:
+                finished = True
+                break
+            if pass_analyzed == 0:
+                error = f"Drain stalled: none of the {pass_found} pending reviews found in pass {passes} could be analyzed"
+                break
+            if passes >= DRAIN_MAX_PASSES:
+                error = f"Drain stopped after {passes} passes with reviews still pending"
+                break
+            # New reviews may have landed behind the scan; check with another pass
+            pass_found = 0
+            pass_analyzed = 0
+        
+        slowest_page_ms = max(slowest_page_ms, (time.monotonic() - page_started) * 1000)
+        if context is None or context.get_remaining_time_in_millis() < max(DRAIN_MIN_TIME_MARGIN_MS, 2 * slowest_page_ms):
+            break
+    
+    elapsed = time.monotonic() - started
+    total_analyzed += analyzed_count
+    if not finished and error is None and continuations >= DRAIN_MAX_CONTINUATIONS:
+        error = f"Drain stopped after {continuations} continuations with reviews still pending"
+    
+    result = {
+        'success': error is None,
+        'drain_id': drain_id,
+        'analyzed_count': analyzed_count,
+        'total_analyzed': total_analyzed,
+        'elapsed_seconds': round(elapsed, 3),
+        'reviews_per_second': round(analyzed_count / elapsed, 2) if elapsed > 0 else 0.0,
+        'remaining_backlog_estimate': 0 if finished else estimate_pending_backlog(pass_found),
+        'analysis_cache': analysis_cache_stats.snapshot(),
+        'prescorer': prescorer_stats.snapshot(),
+        'passes': passes,
+        'continued': False
+    }
+    
+    if error:
+        result['error'] = error
+        logger.error(f"Drain {drain_id}: {error}")
+        if not event.get('job_id'):
+            update_job_status(drain_id, 'failed', {'error': error, 'result': json.loads(json.dumps(result), parse_float=Decimal)})
+        return {
+            'statusCode': 500,
+            'body': json.dumps(result, default=str)
+        }
+    
+    if not finished:
+        checkpoint = {
+            **event,
+            'drain': True,
+            'drain_id': drain_id,
+            'cursor': cursor,
+            'pass_found': pass_found,
+            'pass_analyzed': pass_analyzed,
+            'passes': passes,
+            'continuations': continuations + 1,
+            'total_analyzed': total_analyzed
+        }
+        update_job_status(drain_id, 'running', {'checkpoint': json.loads(json.dumps(checkpoint, default=str), parse_float=Decimal)})
+        
+        if context is not None:
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps(checkpoint, default=str)
+            )
+            result['continued'] = True
+        else:
+            result['checkpoint'] = checkpoint
+    elif not event.get('job_id'):
+        update_job_status(drain_id, 'completed', {'result': json.loads(json.dumps(result), parse_float=Decimal)})
+    
+    logger.info(f"Drain {drain_id}: analyzed {analyzed_count} reviews, {result['reviews_per_second']} reviews/sec, "
+                f"~{result['remaining_backlog_estimate']} pending left")
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps(result, default=str)
+    }
+
+def estimate_pending_backlog(pass_found: int) -> int:
+    """Pending reviews left, from the pending index size less what this pass has taken"""
+    
     try:
-        response = reviews_table.query(
-            IndexName='RestaurantIndex',
-            KeyConditionExpression='restaurantId = :rid',
-            FilterExpression='isFake = :pending',
-            ExpressionAttributeValues={
-                ':rid': restaurant_id,
-                ':pending': 'pending'
-            }
+        # DynamoDB refreshes index item counts roughly every six hours
+        index_items = next(
+            index['ItemCount'] for index in reviews_table.global_secondary_indexes or []
+            if index['IndexName'] == PENDING_INDEX_NAME
         )
-        return response.get('Items', [])
+    except Exception as e:
+        logger.error(f"Error reading pending index size: {str(e)}")
+        return 0
+    
+    return max(0, int(index_items) - pass_found)
+
+def get_reviews_by_ids(review_ids: List[str], attributes: List[str] = REVIEW_ANALYSIS_ATTRIBUTES) -> List[Dict]:
+    """Get specific reviews by their IDs with parallel BatchGetItem calls"""
+    
+    unique_ids = list(dict.fromkeys(review_ids))  # BatchGetItem rejects duplicate keys
+    chunks = chunked(unique_ids, BATCH_GET_SIZE)
+    
+    found = {}
+    with ThreadPoolExecutor(max_workers=min(len(chunks), BATCH_GET_CONCURRENCY) or 1) as executor:
+        for items in executor.map(lambda chunk: batch_get_reviews(chunk, attributes), chunks):
+            for item in items:
+                found[item['reviewId']] = item
+    
+    return [found[review_id] for review_id in unique_ids if review_id in found]
+
+def batch_get_reviews(review_ids: List[str], attributes: List[str] = REVIEW_ANALYSIS_ATTRIBUTES) -> List[Dict]:
+    """Fetch up to 100 reviews"""
+    return batch_get_items('Reviews', [{'reviewId': review_id} for review_id in review_ids], attributes)
+
+def batch_get_items(table_name: str, keys: List[Dict], attributes: Optional[List[str]] = None) -> List[Dict]:
+    """Fetch up to 100 items from one table, retrying UnprocessedKeys with jittered backoff"""
+    
+    request = {table_name: {'Keys': keys}}
+    if attributes:
+        # Placeholders for every name, since e.g. 'language' is a reserved word
+        request[table_name]['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(attributes)))
+        request[table_name]['ExpressionAttributeNames'] = {f'#p{i}': name for i, name in enumerate(attributes)}
+    items = []
+    
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        try:
+            response = dynamodb.batch_get_item(RequestItems=request)
+        except Exception as e:
+            logger.error(f"Error getting {len(keys)} items from {table_name}: {str(e)}")
+            break
+        
+        items.extend(response.get('Responses', {}).get(table_name, []))
+        request = response.get('UnprocessedKeys')
+        if not request:
+            break
+        
+        delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+    else:
+        logger.error(f"Gave up on {len(request[table_name]['Keys'])} unprocessed {table_name} keys")
+    
+    return items
+
+def get_pending_reviews_by_restaurant(restaurant_id: str) -> List[Dict]:
+    """Get all pending reviews for a specific restaurant from the sparse pending index"""
+    try:
+        query_kwargs = {
+            'IndexName': PENDING_INDEX_NAME,
+            'KeyConditionExpression': 'pendingRestaurantId = :rid',
+            'ExpressionAttributeValues': {':rid': restaurant_id}
+        }
+        reviews = []
+        while True:
+            response = reviews_table.query(**query_kwargs)
+            reviews.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return reviews
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
     except Exception as e:
         logger.error(f"Error getting pending reviews for restaurant {restaurant_id}: {str(e)}")
         return []
 
 def get_all_pending_reviews(limit: int = 100) -> List[Dict]:
-    """Get all pending reviews (limited for Lambda execution time)"""
+    """Get pending reviews from the sparse pending index (limited for Lambda execution time)"""
     try:
         response = reviews_table.scan(
-            FilterExpression='isFake = :pending',
-            ExpressionAttributeValues={':pending': 'pending'},
+            IndexName=PENDING_INDEX_NAME,
             Limit=limit
         )
         return response.get('Items', [])
@@ -139,6 +496,11 @@ def analyze_review_with_comprehend(review_text: str, detected_language: str = No
     Returns comprehensive analysis including fake detection
     """
     
+    cache_key = analysis_cache_key(review_text, detected_language)
+    cached = get_cached_analyses([cache_key]).get(cache_key)
+    if cached:
+        return build_analysis_from_cache(review_text, cached)
+    
     try:
         # Step 1: Detect language if not provided
         if not detected_language or detected_language == 'unknown':
@@ -146,8 +508,7 @@ def analyze_review_with_comprehend(review_text: str, detected_language: str = No
             detected_language = lang_response['Languages'][0]['LanguageCode'] if lang_response['Languages'] else 'en'
         
         # Ensure language is supported by Comprehend
-        supported_languages = ['en', 'es', 'fr', 'de', 'it', 'pt', 'ar', 'hi', 'ja', 'ko', 'zh', 'zh-TW']
-        if detected_language not in supported_languages:
+        if detected_language not in SUPPORTED_LANGUAGES:
             detected_language = 'en'  # Default to English
         
         # Step 2: Sentiment Analysis
@@ -168,181 +529,1410 @@ def analyze_review_with_comprehend(review_text: str, detected_language: str = No
             LanguageCode=detected_language
         )
         
+        store_cached_analyses([
+            cache_entry(cache_key, detected_language, sentiment_response, keyphrases_response, entities_response)
+        ])
+        
         # Step 5: Advanced Fake Detection Algorithm
-        fake_analysis = detect_fake_review_advanced(
-            review_text, 
-            sentiment_response, 
-            keyphrases_response, 
-            entities_response,
-            detected_language
-        )
+        return build_analysis_result(review_text, detected_language, sentiment_response,
+                                     keyphrases_response, entities_response)
         
-        # Compile results
-        analysis_result = {
-            'language': detected_language,
-            'sentiment': sentiment_response['Sentiment'],
-            'sentimentScores': sentiment_response['SentimentScore'],
-            'keyPhrases': [kp['Text'] for kp in keyphrases_response['KeyPhrases'][:10]],  # Top 10
-            'entities': [{'text': e['Text'], 'type': e['Type']} for e in entities_response['Entities'][:5]],  # Top 5
-            'isFake': fake_analysis['is_fake'],
-            'confidence': fake_analysis['confidence'],
-            'fakeReasons': fake_analysis['reasons'],
-            'analysisTimestamp': datetime.now().isoformat()
+    except Exception as e:
+        logger.error(f"Error in Comprehend analysis: {str(e)}")
+        # Return basic analysis if Comprehend fails
+        return build_basic_analysis_result(review_text, detected_language, e)
+
+def analyze_reviews_batch(reviews: List[Dict], prescore: bool = True) -> Dict[str, Dict]:
+    """
+    Analyze many reviews with the Comprehend batch APIs
+    Reviews are grouped by language into chunks of up to 25 documents, so each
+    chunk costs one call per API instead of one call per review.
+    Returns analysis results keyed by reviewId.
+    """
+    
+    results, chunks, duplicates = prepare_analysis_chunks(reviews, prescore)
+    
+    # Steps 2-5 per language chunk
+    for language, chunk in chunks:
+        try:
+            results.update(analyze_chunk(chunk, language))
+        except Exception as e:
+            logger.error(f"Error in Comprehend batch analysis: {str(e)}")
+            results.update({
+                review['reviewId']: build_basic_analysis_result(review['reviewText'], language, e)
+                for review in chunk
+            })
+    
+    # Repeated texts are answered from what their first copy just cached
+    results.update(analyze_duplicates(duplicates))
+    
+    return results
+
+def prepare_analysis_chunks(reviews: List[Dict], prescore: bool = True) -> Tuple[Dict[str, Dict], List[Tuple[str, List[Dict]]], List[Dict]]:
+    """
+    Resolve review languages and split reviews into (language, chunk) batches
+    Reviews answered from the analysis cache or the local pre-scorer, or that
+    cannot go to Comprehend, are analyzed locally and returned separately,
+    keyed by reviewId. Reviews repeating the text of another review in this
+    run are held back as duplicates.
+    """
+    
+    results = {}
+    languages = {}
+    to_detect = []
+    duplicates = []
+    fresh = []
+    
+    cache_keys = {
+        review['reviewId']: analysis_cache_key(review['reviewText'], review.get('language'))
+        for review in reviews if (review.get('reviewText') or '').strip()
+    }
+    cached = get_cached_analyses(list(set(cache_keys.values())))
+    seen_keys = set()
+    
+    for review in reviews:
+        review_text = review.get('reviewText') or ''
+        if not review_text.strip():
+            # Comprehend rejects empty documents
+            results[review['reviewId']] = build_basic_analysis_result(
+                review_text, review.get('language'), ValueError('Empty review text'))
+            continue
+        
+        cache_key = cache_keys[review['reviewId']]
+        if cache_key in cached:
+            results[review['reviewId']] = build_analysis_from_cache(review_text, cached[cache_key])
+            continue
+        fresh.append(review)
+    
+    # Clear-cut reviews never reach Comprehend
+    if prescore:
+        results.update(prescore_reviews(fresh))
+    
+    for review in fresh:
+        if review['reviewId'] in results:
+            continue
+        cache_key = cache_keys[review['reviewId']]
+        if cache_key in seen_keys:
+            duplicates.append(review)
+            continue
+        seen_keys.add(cache_key)
+        
+        language = review.get('language')
+        if not language or language == 'unknown':
+            to_detect.append(review)
+        else:
+            languages[review['reviewId']] = language
+    
+    # Step 1: Detect missing languages
+    for chunk in chunked(to_detect, COMPREHEND_BATCH_SIZE):
+        try:
+            response = comprehend.batch_detect_dominant_language(TextList=[r['reviewText'] for r in chunk])
+            for item in response.get('ResultList', []):
+                detected = item['Languages'][0]['LanguageCode'] if item['Languages'] else 'en'
+                languages[chunk[item['Index']]['reviewId']] = detected
+            for error in response.get('ErrorList', []):
+                logger.warning(f"Language detection failed for review {chunk[error['Index']]['reviewId']}: {error['ErrorMessage']}")
+        except Exception as e:
+            logger.error(f"Error in batch language detection: {str(e)}")
+        for review in chunk:
+            languages.setdefault(review['reviewId'], 'en')
+    
+    # Group by (supported) language
+    by_language = {}
+    for review in reviews:
+        if review['reviewId'] not in languages:
+            continue
+        language = languages[review['reviewId']]
+        if language not in SUPPORTED_LANGUAGES:
+            language = 'en'  # Default to English
+        by_language.setdefault(language, []).append(review)
+    
+    chunks = [
+        (language, chunk)
+        for language, language_reviews in by_language.items()
+        for chunk in chunked(language_reviews, COMPREHEND_BATCH_SIZE)
+    ]
+    return results, chunks, duplicates
+
+def analyze_chunk(chunk: List[Dict], language: str) -> Dict[str, Dict]:
+    """
+    Run sentiment, key phrase and entity batch detection over one language chunk
+    Errors from the batch calls themselves (e.g. throttling) are raised to the caller.
+    """
+    
+    text_list = [review['reviewText'] for review in chunk]
+    
+    responses = {
+        'sentiment': comprehend.batch_detect_sentiment(TextList=text_list, LanguageCode=language),
+        'keyphrases': comprehend.batch_detect_key_phrases(TextList=text_list, LanguageCode=language),
+        'entities': comprehend.batch_detect_entities(TextList=text_list, LanguageCode=language)
+    }
+    
+    # Index each API's per-document results and errors by position in the chunk
+    per_item = {name: {item['Index']: item for item in response.get('ResultList', [])}
+                for name, response in responses.items()}
+    errors = {}
+    for response in responses.values():
+        for error in response.get('ErrorList', []):
+            errors.setdefault(error['Index'], error['ErrorMessage'])
+    
+    results = {}
+    new_cache_entries = []
+    for index, review in enumerate(chunk):
+        sentiment = per_item['sentiment'].get(index)
+        keyphrases = per_item['keyphrases'].get(index)
+        entities = per_item['entities'].get(index)
+        
+        if index in errors or not (sentiment and keyphrases and entities):
+            # Per-document failure: retry this review on its own
+            logger.warning(f"Batch analysis failed for review {review['reviewId']}: {errors.get(index, 'missing result')}")
+            results[review['reviewId']] = analyze_review_with_comprehend(review['reviewText'], language)
+            continue
+        
+        results[review['reviewId']] = build_analysis_result(review['reviewText'], language, sentiment,
+                                                            keyphrases, entities)
+        new_cache_entries.append(cache_entry(
+            analysis_cache_key(review['reviewText'], review.get('language')),
+            language, sentiment, keyphrases, entities
+        ))
+    
+    store_cached_analyses(new_cache_entries)
+    return results
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease
+    The limit halves when a task is throttled and grows by roughly one slot
+    for every `limit` tasks that succeed, up to max_limit.
+    """
+    
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.active = 0
+        self.peak_active = 0
+        self.min_limit_seen = float(max_limit)
+        self.throttle_events = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+    
+    def acquire(self):
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+    
+    def release(self, throttled: bool = False):
+        with self.condition:
+            self.active -= 1
+            if throttled:
+                self.throttle_events += 1
+                now = time.monotonic()
+                if now - self.last_decrease >= THROTTLE_DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.min_limit_seen = min(self.min_limit_seen, self.limit)
+                    self.last_decrease = now
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+def is_throttling_error(error: Exception) -> bool:
+    """Whether an AWS error means we are over a rate or throughput limit"""
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+def run_with_backoff(limiter: AdaptiveConcurrencyLimiter, task: Callable, *args):
+    """Run a task inside a limiter slot, retrying throttled attempts with jittered backoff"""
+    
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        limiter.acquire()
+        try:
+            result = task(*args)
+        except Exception as e:
+            throttled = is_throttling_error(e)
+            limiter.release(throttled=throttled)
+            if not throttled or attempt == MAX_THROTTLE_RETRIES:
+                raise
+            delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+            continue
+        limiter.release()
+        return result
+
+def analyze_and_store_concurrently(reviews: List[Dict], max_concurrency: int, prescore: bool = True,
+                                   review_signals: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    Analyze and store reviews on a worker pool bounded by an adaptive limit
+    Comprehend chunks and DynamoDB updates share the same limit, so throttling
+    from either service slows both down until it clears.
+    """
+    
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+    review_signals = review_signals or {}
+    results, chunks, duplicates = prepare_analysis_chunks(reviews, prescore)
+    analyzed_count = 0
+    
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        update_futures = {
+            executor.submit(run_with_backoff, limiter, store_analysis, review_id, result, review_signals): review_id
+            for review_id, result in results.items()
+        }
+        chunk_futures = {
+            executor.submit(run_with_backoff, limiter, analyze_chunk, chunk, language): (language, chunk)
+            for language, chunk in chunks
         }
         
-        return analysis_result
+        for future in as_completed(chunk_futures):
+            language, chunk = chunk_futures[future]
+            try:
+                chunk_results = future.result()
+            except Exception as e:
+                logger.error(f"Error in Comprehend batch analysis: {str(e)}")
+                chunk_results = {
+                    review['reviewId']: build_basic_analysis_result(review['reviewText'], language, e)
+                    for review in chunk
+                }
+            for review_id, result in chunk_results.items():
+                future = executor.submit(run_with_backoff, limiter, store_analysis, review_id, result, review_signals)
+                update_futures[future] = review_id
+        
+        # Repeated texts are answered from what their first copy just cached
+        for review_id, result in analyze_duplicates(duplicates).items():
+            future = executor.submit(run_with_backoff, limiter, store_analysis, review_id, result, review_signals)
+            update_futures[future] = review_id
         
+        for future in as_completed(update_futures):
+            try:
+                future.result()
+                analyzed_count += 1
+            except Exception as e:
+                logger.error(f"Error analyzing review {update_futures[future]}: {str(e)}")
+    
+    return {
+        'analyzed_count': analyzed_count,
+        'max_concurrency': max_concurrency,
+        'peak_concurrency': limiter.peak_active,
+        'min_concurrency_limit': int(limiter.min_limit_seen),
+        'final_concurrency_limit': int(limiter.limit),
+        'throttle_events': limiter.throttle_events
+    }
+
+class AnalysisCacheStats:
+    """Hit/miss counters for the analysis cache, reset per invocation"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.counts = {'memory_hits': 0, 'table_hits': 0, 'misses': 0, 'expired': 0, 'stored': 0}
+    
+    def add(self, name: str, count: int = 1):
+        with self.lock:
+            self.counts[name] += count
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+        lookups = counts['memory_hits'] + counts['table_hits'] + counts['misses']
+        hits = counts['memory_hits'] + counts['table_hits']
+        counts['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return counts
+
+analysis_cache_stats = AnalysisCacheStats()
+analysis_cache_memory = OrderedDict()  # In-container tier in front of the AnalysisCache table
+analysis_cache_lock = threading.Lock()
+
+def analysis_cache_key(review_text: str, language: Optional[str]) -> str:
+    """Hash of the normalized review text and its language hint"""
+    
+    normalized = ' '.join(re.sub(r'[^\w\s]', ' ', review_text.lower()).split())
+    language_hint = language if language and language != 'unknown' else 'auto'
+    return hashlib.sha256(f"{language_hint}\n{normalized}".encode('utf-8')).hexdigest()
+
+def cache_entry(cache_key: str, language: str, sentiment_response: Dict,
+                keyphrases_response: Dict, entities_response: Dict) -> Dict:
+    """AnalysisCache item holding the Comprehend outputs the fake detection rules read"""
+    
+    now = time.time()
+    entry = {
+        'contentHash': cache_key,
+        'language': language,
+        'sentiment': {
+            'Sentiment': sentiment_response['Sentiment'],
+            'SentimentScore': sentiment_response['SentimentScore']
+        },
+        'keyPhrases': [{'Text': kp['Text'], 'Score': kp.get('Score', 0)} for kp in keyphrases_response['KeyPhrases']],
+        'entities': [{'Text': e['Text'], 'Type': e['Type'], 'Score': e.get('Score', 0)} for e in entities_response['Entities']],
+        'cachedAt': datetime.now().isoformat(),
+        'expiresAt': int(now + ANALYSIS_CACHE_TTL_SECONDS)  # DynamoDB TTL attribute
+    }
+    # DynamoDB needs Decimal rather than float
+    return json.loads(json.dumps(entry), parse_float=Decimal)
+
+def get_cached_analyses(cache_keys: List[str]) -> Dict[str, Dict]:
+    """Look up unexpired cache entries, memory first, then the AnalysisCache table"""
+    
+    now = time.time()
+    found = {}
+    missing = []
+    
+    with analysis_cache_lock:
+        for key in cache_keys:
+            entry = analysis_cache_memory.get(key)
+            if entry and entry['expiresAt'] > now:
+                analysis_cache_memory.move_to_end(key)
+                found[key] = entry
+            else:
+                missing.append(key)
+    analysis_cache_stats.add('memory_hits', len(found))
+    
+    for chunk in chunked(missing, 100):
+        request = {'AnalysisCache': {'Keys': [{'contentHash': key} for key in chunk]}}
+        try:
+            while request:
+                response = dynamodb.batch_get_item(RequestItems=request)
+                for entry in response.get('Responses', {}).get('AnalysisCache', []):
+                    if entry['expiresAt'] > now:
+                        found[entry['contentHash']] = entry
+                        remember_cached_analysis(entry)
+                        analysis_cache_stats.add('table_hits')
+                    else:
+                        # DynamoDB deletes expired items lazily
+                        analysis_cache_stats.add('expired')
+                request = response.get('UnprocessedKeys')
+        except Exception as e:
+            logger.error(f"Error reading analysis cache: {str(e)}")
+    
+    analysis_cache_stats.add('misses', len(cache_keys) - len(found))
+    return found
+
+def store_cached_analyses(entries: List[Dict]):
+    """Write new cache entries to both tiers; failures only cost a future cache miss"""
+    
+    if not entries:
+        return
+    
+    for entry in entries:
+        remember_cached_analysis(entry)
+    
+    try:
+        with analysis_cache_table.batch_writer(overwrite_by_pkeys=['contentHash']) as batch:
+            for entry in entries:
+                batch.put_item(Item=entry)
+        analysis_cache_stats.add('stored', len(entries))
     except Exception as e:
-        logger.error(f"Error in Comprehend analysis: {str(e)}")
-        # Return basic analysis if Comprehend fails
-        return {
-            'language': detected_language or 'en',
-            'sentiment': 'UNKNOWN',
-            'sentimentScores': {},
-            'keyPhrases': [],
-            'entities': [],
-            'isFake': detect_fake_review_basic(review_text)['is_fake'],
-            'confidence': 0.5,
-            'fakeReasons': ['Basic analysis due to Comprehend error'],
-            'analysisTimestamp': datetime.now().isoformat(),
-            'error': str(e)
+        logger.error(f"Error writing analysis cache: {str(e)}")
+
+def remember_cached_analysis(entry: Dict):
+    """Keep an entry in the bounded in-container tier"""
+    
+    with analysis_cache_lock:
+        analysis_cache_memory[entry['contentHash']] = entry
+        analysis_cache_memory.move_to_end(entry['contentHash'])
+        while len(analysis_cache_memory) > ANALYSIS_CACHE_MEMORY_ENTRIES:
+            analysis_cache_memory.popitem(last=False)
+
+def build_analysis_from_cache(review_text: str, entry: Dict) -> Dict:
+    """Re-run the fake detection rules over cached Comprehend outputs"""
+    
+    return build_analysis_result(
+        review_text,
+        entry['language'],
+        entry['sentiment'],
+        {'KeyPhrases': entry['keyPhrases']},
+        {'Entities': entry['entities']}
+    )
+
+def analyze_duplicates(reviews: List[Dict]) -> Dict[str, Dict]:
+    """Analyze reviews whose text was already analyzed earlier in this run"""
+    
+    results = {}
+    for review in reviews:
+        # Normally a memory hit; falls back to Comprehend if the first copy failed
+        results[review['reviewId']] = analyze_review_with_comprehend(review['reviewText'], review.get('language'))
+    return results
+
+def chunked(items: List, size: int) -> List[List]:
+    """Split a list into consecutive chunks of at most `size` items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def build_analysis_result(review_text: str, language: str, sentiment_response: Dict,
+                          keyphrases_response: Dict, entities_response: Dict) -> Dict:
+    """Combine Comprehend outputs and the fake review verdict into one analysis result"""
+    
+    fake_analysis = detect_fake_review_advanced(
+        review_text, 
+        sentiment_response, 
+        keyphrases_response, 
+        entities_response,
+        language
+    )
+    
+    # Compile results
+    return {
+        'language': language,
+        'sentiment': sentiment_response['Sentiment'],
+        'sentimentScores': sentiment_response['SentimentScore'],
+        'keyPhrases': [kp['Text'] for kp in keyphrases_response['KeyPhrases'][:STORED_KEY_PHRASES]],
+        'entities': [{'text': e['Text'], 'type': e['Type']} for e in entities_response['Entities'][:STORED_ENTITIES]],
+        'isFake': fake_analysis['is_fake'],
+        'confidence': fake_analysis['confidence'],
+        'fakeReasons': fake_analysis['reasons'],
+        'rulesetVersion': fake_analysis['ruleset_version'],
+        'analysisTimestamp': datetime.now().isoformat()
+    }
+
+def build_basic_analysis_result(review_text: str, language: str, error: Exception) -> Dict:
+    """Analysis result from the keyword fallback, used when Comprehend is unavailable"""
+    
+    basic_analysis = detect_fake_review_basic(review_text)
+    
+    return {
+        'language': language or 'en',
+        'sentiment': UNKNOWN_SENTIMENT,
+        'sentimentScores': {},
+        'keyPhrases': [],
+        'entities': [],
+        'isFake': basic_analysis['is_fake'],
+        'confidence': 0.5,
+        'fakeReasons': [FIXED_REASON_TEMPLATES['ce']],
+        'rulesetVersion': basic_analysis['ruleset_version'],
+        'analysisTimestamp': datetime.now().isoformat(),
+        'error': str(error)
+    }
+
+# Fake review rules, kept as data so they can be tuned without code changes.
+# Rules are evaluated in order; each adds its reason (and raises confidence) when it matches.
+# Bump the version whenever a rule changes: it is stored with every analysis result.
+DEFAULT_FAKE_RULESET = {
+    'version': '3',
+    'base_confidence': 0.5,
+    'no_match': {'confidence': 0.3, 'reason': 'No suspicious patterns detected'},
+    'rules': [
+        {
+            'type': 'sentiment', 'sentiment': 'POSITIVE', 'score': 'Positive', 'above': 0.95,
+            'confidence': 0.8, 'reason': 'Extremely positive sentiment (>95% confidence)'
+        },
+        {
+            'type': 'sentiment', 'sentiment': 'NEGATIVE', 'score': 'Negative', 'above': 0.9,
+            'confidence': 0.75, 'reason': 'Extremely negative sentiment (>90% confidence)'
+        },
+        {
+            'type': 'phrases', 'source': 'key_phrases', 'min_matches': 3,
+            'confidence': 0.75, 'reason': 'Multiple suspicious positive phrases ({count} found)',
+            'phrases': [
+                'best ever', 'amazing experience', 'perfect place', 'highly recommend',
+                'five stars', '5 stars', 'outstanding service', 'will definitely come back'
+            ]
+        },
+        {
+            'type': 'phrases', 'source': 'key_phrases', 'min_matches': 3,
+            'confidence': 0.7, 'reason': 'Multiple suspicious negative phrases ({count} found)',
+            'phrases': [
+                'worst ever', 'terrible experience', 'never again', 'waste of money',
+                'disgusting food', 'horrible service', 'one star', '1 star'
+            ]
+        },
+        {
+            'type': 'word_count', 'below': 5,
+            'confidence': 0.6, 'reason': 'Unusually short review (<5 words)'
+        },
+        {
+            'type': 'word_count', 'above': 200,
+            'confidence': 0.65, 'reason': 'Unusually long review (>200 words)'
+        },
+        {
+            'type': 'phrases', 'source': 'text', 'languages': ['ms'], 'min_matches': 2,
+            'confidence': 0.7, 'reason': 'Multiple Bahasa Melayu fake indicators',
+            'phrases': ['sangat hebat', 'terbaik sekali', 'pasti datang lagi', 'lima bintang']
+        },
+        {
+            # Too many specific mentions might be promotional; lowers trust without flagging
+            'type': 'entities', 'entity_types': ['COMMERCIAL_ITEM', 'ORGANIZATION'], 'above': 3,
+            'flags_fake': False, 'confidence': 0.6, 'reason': 'Multiple commercial entity mentions'
+        }
+    ],
+    # Copies of reviews posted at other restaurants, found through the MinHash/LSH index
+    'near_duplicates': {
+        'min_similarity': 0.8,
+        'min_other_restaurants': 1,
+        'confidence': 0.85,
+        'reason': 'Near-duplicate of reviews at {count} other restaurant(s)'
+    },
+    # Author rollups kept by the scrapers in AuthorProfiles; a rule fires when its
+    # signal is above/below the limit and the author has at least min_reviews reviews
+    'author_behavior': [
+        {
+            'signal': 'hour_five_star_reviews', 'above': 9,
+            'confidence': 0.85, 'reason': '{value} five-star reviews by this author within one hour'
+        },
+        {
+            'signal': 'hour_reviews', 'above': 19,
+            'confidence': 0.75, 'reason': '{value} reviews by this author within one hour'
+        },
+        {
+            'signal': 'rating_variance', 'below': 0.01, 'min_reviews': 10,
+            'confidence': 0.65, 'reason': 'All {review_count} reviews by this author give the same rating'
+        }
+    ],
+    # Keyword fallback used when Comprehend is unavailable
+    'basic': {
+        'phrases': ['amazing', 'perfect', 'best ever', 'highly recommend', 'five stars'],
+        'min_matches': 3,
+        'fake_confidence': 0.6,
+        'real_confidence': 0.4,
+        'reason': 'Basic keyword analysis'
+    }
+}
+
+FAKE_RULE_TYPES = {'sentiment', 'phrases', 'word_count', 'entities'}
+AUTHOR_SIGNALS = {
+    'review_count', 'restaurants_reviewed', 'rating_mean', 'rating_variance',
+    'five_star_share', 'hour_reviews', 'hour_five_star_reviews'
+}
+PHRASE_SOURCES = {'text', 'key_phrases'}
+
+def trie_pattern(phrases: List[str]) -> str:
+    """Regex alternation of phrases merged on shared prefixes, so each position is matched in one walk"""
+    
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End of a phrase
+    
+    def node_pattern(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + node_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            # Greedy optional: prefer the longer phrase, the shorter one is implied
+            body = ('(?:' + body + ')?') if len(branches) == 1 else (body + '?')
+        return body
+    
+    return node_pattern(trie)
+
+class PhraseMatcher:
+    """Finds which of a set of phrases occur in a text with a single compiled regex scan"""
+    
+    def __init__(self, phrases: List[str]):
+        self.phrases = sorted({phrase.lower() for phrase in phrases if phrase})
+        # The scan reports the longest phrase at each position; any phrase
+        # contained in it occurs as well
+        self.implied = {
+            phrase: [other for other in self.phrases if other in phrase]
+            for phrase in self.phrases
         }
+        self.pattern = None
+        if self.phrases:
+            pattern = trie_pattern(self.phrases)
+            # A plain scan resumes after each match; that is only exact when no
+            # phrase can start inside another and run past its end
+            if self.has_straddling_phrases():
+                pattern = '(?=(' + pattern + '))'
+            else:
+                pattern = '(' + pattern + ')'
+            self.pattern = re.compile(pattern)
+    
+    def has_straddling_phrases(self) -> bool:
+        """Whether a proper suffix of one phrase is a proper prefix of another"""
+        prefix_owners = {}
+        for phrase in self.phrases:
+            for length in range(1, len(phrase)):
+                prefix_owners.setdefault(phrase[:length], set()).add(phrase)
+        for phrase in self.phrases:
+            for start in range(1, len(phrase)):
+                owners = prefix_owners.get(phrase[start:], ())
+                if any(owner != phrase for owner in owners):
+                    return True
+        return False
+    
+    def find(self, text: str) -> set:
+        """Distinct phrases occurring in an already lower-cased text"""
+        found = set()
+        if self.pattern is None:
+            return found
+        for match in self.pattern.finditer(text):
+            phrase = match.group(1)
+            if phrase not in found:
+                found.update(self.implied[phrase])
+        return found
+
+class CompiledRuleset:
+    """A fake review ruleset narrowed to one language, with one phrase matcher per scanned source"""
+    
+    def __init__(self, ruleset: Dict, language: str):
+        self.version = str(ruleset['version'])
+        self.base_confidence = ruleset['base_confidence']
+        self.no_match = ruleset['no_match']
+        self.rules = []
+        source_phrases = {source: [] for source in PHRASE_SOURCES}
+        
+        for rule in ruleset['rules']:
+            if rule['type'] not in FAKE_RULE_TYPES:
+                raise ValueError(f"Unknown fake review rule type: {rule['type']}")
+            languages = rule.get('languages')
+            if languages and language not in languages:
+                continue
+            phrases = frozenset()
+            if rule['type'] == 'phrases':
+                if rule['source'] not in PHRASE_SOURCES:
+                    raise ValueError(f"Unknown phrase source: {rule['source']}")
+                phrases = frozenset(phrase.lower() for phrase in rule['phrases'])
+                source_phrases[rule['source']].extend(phrases)
+            self.rules.append((rule, phrases))
+        
+        self.matchers = {source: PhraseMatcher(phrases) for source, phrases in source_phrases.items()}
+        
+        for rule in ruleset.get('author_behavior', []):
+            if rule['signal'] not in AUTHOR_SIGNALS:
+                raise ValueError(f"Unknown author signal: {rule['signal']}")
+
+def load_fake_ruleset() -> Dict:
+    """The ruleset from FAKE_RULESET_PATH (JSON) if configured, otherwise the built-in one"""
+    
+    if not FAKE_RULESET_PATH:
+        return DEFAULT_FAKE_RULESET
+    
+    try:
+        with open(FAKE_RULESET_PATH) as f:
+            ruleset = json.load(f)
+        CompiledRuleset(ruleset, 'en')  # Validate before use
+        logger.info(f"Loaded fake review ruleset version {ruleset['version']} from {FAKE_RULESET_PATH}")
+        return ruleset
+    except Exception as e:
+        logger.error(f"Error loading fake review ruleset {FAKE_RULESET_PATH}, using built-in rules: {str(e)}")
+        return DEFAULT_FAKE_RULESET
+
+# Loaded and compiled once per container
+fake_ruleset = load_fake_ruleset()
+compiled_rulesets = {}
+basic_matcher = PhraseMatcher(fake_ruleset['basic']['phrases'])
+
+def get_compiled_ruleset(language: str) -> CompiledRuleset:
+    """Compiled ruleset for a language, built on first use"""
+    
+    compiled = compiled_rulesets.get(language)
+    if compiled is None:
+        compiled = CompiledRuleset(fake_ruleset, language)
+        compiled_rulesets[language] = compiled
+    return compiled
 
 def detect_fake_review_advanced(review_text: str, sentiment_data: Dict, keyphrases_data: Dict, entities_data: Dict, language: str) -> Dict:
     """
     Advanced fake review detection using Comprehend analysis results
+    Scores the review against the active ruleset; the review text and the
+    key phrases are each scanned once for all phrase rules
     """
     
+    ruleset = get_compiled_ruleset(language)
     is_fake = False
-    confidence = 0.5
+    confidence = ruleset.base_confidence
     reasons = []
     
-    # Get sentiment scores
-    sentiment_scores = sentiment_data['SentimentScore']
     sentiment = sentiment_data['Sentiment']
+    sentiment_scores = sentiment_data['SentimentScore']
+    found_phrases = {}
+    word_count = None
     
-    # Rule 1: Extremely positive sentiment (potential fake positive)
-    if sentiment == 'POSITIVE' and sentiment_scores.get('Positive', 0) > 0.95:
-        is_fake = True
-        confidence = max(confidence, 0.8)
-        reasons.append('Extremely positive sentiment (>95% confidence)')
-    
-    # Rule 2: Extremely negative sentiment (potential fake negative)
-    elif sentiment == 'NEGATIVE' and sentiment_scores.get('Negative', 0) > 0.9:
-        is_fake = True
-        confidence = max(confidence, 0.75)
-        reasons.append('Extremely negative sentiment (>90% confidence)')
-    
-    # Rule 3: Suspicious key phrases
-    key_phrases = [kp['Text'].lower() for kp in keyphrases_data.get('KeyPhrases', [])]
-    
-    fake_positive_phrases = [
-        'best ever', 'amazing experience', 'perfect place', 'highly recommend',
-        'five stars', '5 stars', 'outstanding service', 'will definitely come back'
-    ]
-    
-    fake_negative_phrases = [
-        'worst ever', 'terrible experience', 'never again', 'waste of money',
-        'disgusting food', 'horrible service', 'one star', '1 star'
-    ]
-    
-    positive_phrase_count = sum(1 for phrase in fake_positive_phrases if any(phrase in kp for kp in key_phrases))
-    negative_phrase_count = sum(1 for phrase in fake_negative_phrases if any(phrase in kp for kp in key_phrases))
-    
-    if positive_phrase_count >= 3:
-        is_fake = True
-        confidence = max(confidence, 0.75)
-        reasons.append(f'Multiple suspicious positive phrases ({positive_phrase_count} found)')
-    
-    if negative_phrase_count >= 3:
-        is_fake = True
-        confidence = max(confidence, 0.7)
-        reasons.append(f'Multiple suspicious negative phrases ({negative_phrase_count} found)')
-    
-    # Rule 4: Review length analysis
-    word_count = len(review_text.split())
-    if word_count < 5:
-        is_fake = True
-        confidence = max(confidence, 0.6)
-        reasons.append('Unusually short review (<5 words)')
-    elif word_count > 200:
-        is_fake = True
-        confidence = max(confidence, 0.65)
-        reasons.append('Unusually long review (>200 words)')
-    
-    # Rule 5: Language-specific patterns
-    if language == 'ms':  # Bahasa Melayu specific checks
-        ms_fake_indicators = ['sangat hebat', 'terbaik sekali', 'pasti datang lagi', 'lima bintang']
-        ms_indicator_count = sum(1 for indicator in ms_fake_indicators if indicator in review_text.lower())
-        if ms_indicator_count >= 2:
-            is_fake = True
-            confidence = max(confidence, 0.7)
-            reasons.append('Multiple Bahasa Melayu fake indicators')
-    
-    # Rule 6: Entity analysis (too many specific mentions might be promotional)
-    entities = entities_data.get('Entities', [])
-    commercial_entities = [e for e in entities if e['Type'] in ['COMMERCIAL_ITEM', 'ORGANIZATION']]
-    if len(commercial_entities) > 3:
-        confidence = max(confidence, 0.6)
-        reasons.append('Multiple commercial entity mentions')
+    for rule, phrases in ruleset.rules:
+        rule_type = rule['type']
+        count = None
+        
+        if rule_type == 'sentiment':
+            matched = sentiment == rule['sentiment'] and sentiment_scores.get(rule['score'], 0) > rule['above']
+        
+        elif rule_type == 'phrases':
+            source = rule['source']
+            if source not in found_phrases:
+                if source == 'text':
+                    scanned = review_text.lower()
+                else:
+                    # Phrases never contain newlines, so no match spans two key phrases
+                    scanned = '\n'.join(kp['Text'].lower() for kp in keyphrases_data.get('KeyPhrases', []))
+                found_phrases[source] = ruleset.matchers[source].find(scanned)
+            count = len(found_phrases[source] & phrases)
+            matched = count >= rule['min_matches']
+        
+        elif rule_type == 'word_count':
+            if word_count is None:
+                word_count = len(review_text.split())
+            count = word_count
+            matched = ('below' in rule and word_count < rule['below']) or ('above' in rule and word_count > rule['above'])
+        
+        else:  # entities
+            entity_types = rule['entity_types']
+            count = sum(1 for e in entities_data.get('Entities', []) if e['Type'] in entity_types)
+            matched = count > rule['above']
+        
+        if matched:
+            if rule.get('flags_fake', True):
+                is_fake = True
+            confidence = max(confidence, rule['confidence'])
+            reasons.append(rule['reason'].format(count=count))
     
     # Final decision
     if not reasons:
-        reasons.append('No suspicious patterns detected')
-        confidence = 0.3  # Low confidence that it's fake
+        reasons.append(ruleset.no_match['reason'])
+        confidence = ruleset.no_match['confidence']  # Low confidence that it's fake
     
     return {
         'is_fake': is_fake,
         'confidence': confidence,
-        'reasons': reasons
+        'reasons': reasons,
+        'ruleset_version': ruleset.version
     }
 
 def detect_fake_review_basic(review_text: str) -> Dict:
     """Basic fake detection fallback"""
-    fake_indicators = ['amazing', 'perfect', 'best ever', 'highly recommend', 'five stars']
-    indicator_count = sum(1 for indicator in fake_indicators if indicator in review_text.lower())
+    rule = fake_ruleset['basic']
+    indicator_count = len(basic_matcher.find(review_text.lower()))
     
-    is_fake = indicator_count >= 3
+    is_fake = indicator_count >= rule['min_matches']
     
     return {
         'is_fake': is_fake,
-        'confidence': 0.6 if is_fake else 0.4,
-        'reasons': ['Basic keyword analysis']
+        'confidence': rule['fake_confidence'] if is_fake else rule['real_confidence'],
+        'reasons': [rule['reason']],
+        'ruleset_version': str(fake_ruleset['version'])
     }
 
-def update_review_analysis(review_id: str, analysis_result: Dict):
-    """Update review with analysis results in DynamoDB"""
+class PrescorerStats:
+    """Counters for the local pre-scorer, reset per invocation"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.counts = {'scored': 0, 'finalized_fake': 0, 'finalized_genuine': 0, 'escalated': 0}
+    
+    def add(self, name: str, count: int = 1):
+        with self.lock:
+            self.counts[name] += count
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            counts = dict(self.counts)
+        finalized = counts['finalized_fake'] + counts['finalized_genuine']
+        counts['local_rate'] = round(finalized / counts['scored'], 4) if counts['scored'] else 0.0
+        return counts
+
+def prescorer_tokens(review_text: str) -> List[str]:
+    """Word unigrams and bigrams of a review"""
+    words = re.findall(r'\w+', review_text.lower())
+    return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+def prescorer_hashed_tokens(review: Dict, hash_dims: int) -> List[int]:
+    """Feature columns of a review's n-grams (crc32 is stable across processes, unlike hash())"""
+    return [zlib.crc32(token.encode('utf-8')) % hash_dims for token in prescorer_tokens(review.get('reviewText') or '')]
+
+def prescorer_dense_features(review: Dict, superlatives: frozenset) -> List[float]:
+    """Length, rating, exclamation density and superlative count of a review"""
+    
+    review_text = review.get('reviewText') or ''
+    words = re.findall(r'\w+', review_text.lower())
+    return [
+        math.log1p(len(words)),
+        float(review.get('rating') or 0),
+        review_text.count('!') / max(len(review_text), 1),
+        float(sum(1 for word in words if word in superlatives))
+    ]
+
+def prescorer_matrix(hashed: List[List[int]], dense: List[List[float]], model: Dict):
+    """
+    Feature matrix for a batch: L2-normalized sublinear TF-IDF over the hashed
+    n-grams, followed by the standardized dense features
+    """
+    
+    counts = np.zeros((len(hashed), model['hash_dims']), dtype=np.float32)
+    rows = np.repeat(np.arange(len(hashed)), [len(columns) for columns in hashed])
+    columns = np.fromiter((column for review_columns in hashed for column in review_columns), dtype=np.int64, count=len(rows))
+    np.add.at(counts, (rows, columns), 1.0)
+    
+    tfidf = np.log1p(counts) * model['idf']
+    tfidf /= np.maximum(np.linalg.norm(tfidf, axis=1, keepdims=True), 1e-9)
+    
+    dense_features = (np.asarray(dense, dtype=np.float32) - model['dense_mean']) / model['dense_std']
+    return np.hstack([tfidf, dense_features])
+
+def prescorer_probabilities(reviews: List[Dict], model: Dict):
+    """Probability that each review is fake, per the linear model"""
+    
+    hashed = [prescorer_hashed_tokens(review, model['hash_dims']) for review in reviews]
+    dense = [prescorer_dense_features(review, model['superlatives']) for review in reviews]
+    logits = prescorer_matrix(hashed, dense, model) @ model['weights'] + model['bias']
+    return 1.0 / (1.0 + np.exp(-logits))
+
+def load_prescorer_model() -> Optional[Dict]:
+    """The pre-scorer model from PRESCORER_MODEL_PATH, or None when the tier is disabled"""
+    
+    if not PRESCORER_MODEL_PATH:
+        return None
+    if np is None:
+        logger.warning("PRESCORER_MODEL_PATH is set but NumPy is not installed; pre-scorer disabled")
+        return None
     
     try:
-        reviews_table.update_item(
-            Key={'reviewId': review_id},
-            UpdateExpression='''
-                SET 
-                    #lang = :lang,
-                    sentiment = :sentiment,
-                    isFake = :is_fake,
-                    confidence = :confidence,
-                    comprehendAnalysis = :analysis,
-                    analyzedAt = :timestamp
-            ''',
-            ExpressionAttributeNames={
-                '#lang': 'language'  # 'language' is a reserved word
-            },
-            ExpressionAttributeValues={
-                ':lang': analysis_result['language'],
-                ':sentiment': analysis_result['sentiment'],
-                ':is_fake': 'true' if analysis_result['isFake'] else 'false',
-                ':confidence': analysis_result['confidence'],
-                ':analysis': analysis_result,
-                ':timestamp': datetime.now().isoformat()
-            }
+        with open(PRESCORER_MODEL_PATH) as f:
+            model = json.load(f)
+        for name in ('idf', 'dense_mean', 'dense_std', 'weights'):
+            model[name] = np.asarray(model[name], dtype=np.float32)
+        model['superlatives'] = frozenset(model['superlatives'])
+        if model['weights'].shape[0] != model['hash_dims'] + PRESCORER_DENSE_FEATURES:
+            raise ValueError(f"expected {model['hash_dims'] + PRESCORER_DENSE_FEATURES} weights, got {model['weights'].shape[0]}")
+        logger.info(f"Loaded pre-scorer model version {model['version']} from {PRESCORER_MODEL_PATH}")
+        return model
+    except Exception as e:
+        logger.error(f"Error loading pre-scorer model {PRESCORER_MODEL_PATH}, pre-scorer disabled: {str(e)}")
+        return None
+
+# Loaded once per container
+prescorer_model = load_prescorer_model()
+prescorer_stats = PrescorerStats()
+
+def prescore_reviews(reviews: List[Dict]) -> Dict[str, Dict]:
+    """
+    Finalize clear-cut reviews locally
+    Reviews the model scores below genuine_below or above fake_above get an
+    analysis result without Comprehend; the uncertain band is left out of the
+    returned results (keyed by reviewId) and escalated by the caller.
+    """
+    
+    model = prescorer_model
+    if model is None or not reviews:
+        return {}
+    
+    results = {}
+    for batch in chunked(reviews, PRESCORER_BATCH_SIZE):
+        try:
+            probabilities = prescorer_probabilities(batch, model)
+        except Exception as e:
+            logger.error(f"Error in local pre-scoring: {str(e)}")
+            continue
+        
+        for review, probability in zip(batch, probabilities.tolist()):
+            if probability >= model['fake_above']:
+                results[review['reviewId']] = build_prescored_result(review, probability, True, model)
+            elif probability <= model['genuine_below']:
+                results[review['reviewId']] = build_prescored_result(review, probability, False, model)
+        prescorer_stats.add('scored', len(batch))
+    
+    finalized_fake = sum(1 for result in results.values() if result['isFake'])
+    prescorer_stats.add('finalized_fake', finalized_fake)
+    prescorer_stats.add('finalized_genuine', len(results) - finalized_fake)
+    prescorer_stats.add('escalated', len(reviews) - len(results))
+    return results
+
+def build_prescored_result(review: Dict, probability: float, is_fake: bool, model: Dict) -> Dict:
+    """Analysis result for a review finalized by the local pre-scorer"""
+    
+    verdict = 'clearly fake' if is_fake else 'clearly genuine'
+    return {
+        'language': review.get('language') or 'unknown',
+        'sentiment': UNKNOWN_SENTIMENT,
+        'sentimentScores': {},
+        'keyPhrases': [],
+        'entities': [],
+        'isFake': is_fake,
+        'confidence': round(probability, 4),
+        'fakeReasons': [FIXED_REASON_TEMPLATES['ps'].format(verdict=verdict, p=f'{probability:.2f}')],
+        'prescorerVersion': model['version'],
+        'analysisTimestamp': datetime.now().isoformat()
+    }
+
+def query_similarity_bucket(bucket: str) -> List[Dict]:
+    """Reviews sharing an LSH bucket (capped, so hot buckets stay cheap)"""
+    
+    try:
+        response = similarity_index_table.query(
+            KeyConditionExpression='#bucket = :bucket',
+            ExpressionAttributeNames={'#bucket': 'bucket'},
+            ExpressionAttributeValues={':bucket': bucket},
+            Limit=LSH_MAX_BUCKET_CANDIDATES
         )
+        return response.get('Items', [])
+    except Exception as e:
+        logger.error(f"Error querying similarity bucket {bucket}: {str(e)}")
+        return []
+
+def signature_similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / MINHASH_PERMUTATIONS
+
+def review_signature(review: Dict) -> Optional[List[int]]:
+    """Stored signature of a review, computed from its text for reviews scraped before the index"""
+    
+    stored = review.get('minhashSignature')
+    if stored is not None:
+        return unpack_signature(stored)
+    return minhash_signature(review.get('reviewText'))
+
+def find_near_duplicates(reviews: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Near-duplicates of each review at other restaurants, keyed by reviewId
+    Candidates come from the review's LSH buckets, so the work depends on
+    bucket sizes rather than on how many reviews are stored; similarity is then
+    estimated from the signatures. Reviews stored before the index existed are
+    indexed here on first sight.
+    """
+    
+    rule = fake_ruleset.get('near_duplicates')
+    if not rule:
+        return {}
+    
+    signatures = {}
+    restaurants = {}
+    for review in reviews:
+        signature = review_signature(review)
+        if signature is None or not review.get('restaurantId'):
+            continue
+        signatures[review['reviewId']] = signature
+        restaurants[review['reviewId']] = review['restaurantId']
+        if 'minhashSignature' not in review:
+            try:
+                index_review_for_similarity(similarity_index_table, review['reviewId'], review['restaurantId'], signature)
+            except Exception as e:
+                logger.error(f"Error indexing review {review['reviewId']} for similarity: {str(e)}")
+    
+    buckets = {review_id: lsh_buckets(signature) for review_id, signature in signatures.items()}
+    unique_buckets = list({bucket for review_buckets in buckets.values() for bucket in review_buckets})
+    with ThreadPoolExecutor(max_workers=min(len(unique_buckets), BATCH_GET_CONCURRENCY) or 1) as executor:
+        postings = dict(zip(unique_buckets, executor.map(query_similarity_bucket, unique_buckets)))
+    
+    # Only reviews at other restaurants count; re-scrapes of the same place are not copies
+    candidates = {}
+    for review_id, review_buckets in buckets.items():
+        candidates[review_id] = {
+            posting['reviewId']: posting['restaurantId']
+            for bucket in review_buckets for posting in postings[bucket]
+            if posting['restaurantId'] != restaurants[review_id]
+        }
+    
+    missing = list({candidate for found in candidates.values() for candidate in found if candidate not in signatures})
+    candidate_signatures = dict(signatures)
+    for review in get_reviews_by_ids(missing, ['reviewId', 'reviewText', 'minhashSignature']) if missing else []:
+        signature = review_signature(review)
+        if signature is not None:
+            candidate_signatures[review['reviewId']] = signature
+    
+    near_duplicates = {}
+    for review_id, found in candidates.items():
+        matches = []
+        for candidate_id, restaurant_id in found.items():
+            if candidate_id not in candidate_signatures:
+                continue
+            similarity = signature_similarity(signatures[review_id], candidate_signatures[candidate_id])
+            if similarity >= rule['min_similarity']:
+                matches.append({'reviewId': candidate_id, 'restaurantId': restaurant_id, 'similarity': similarity})
+        if matches:
+            near_duplicates[review_id] = sorted(matches, key=lambda match: -match['similarity'])
+    
+    logger.info(f"Near-duplicate check: {len(near_duplicates)} of {len(reviews)} reviews matched "
+                f"({len(unique_buckets)} buckets read)")
+    return near_duplicates
+
+def apply_near_duplicates(analysis_result: Dict, matches: Optional[List[Dict]]) -> Dict:
+    """Add the near-duplicate verdict of the active ruleset to an analysis result"""
+    
+    rule = fake_ruleset.get('near_duplicates')
+    if not rule or not matches:
+        return analysis_result
+    
+    other_restaurants = {match['restaurantId'] for match in matches}
+    if len(other_restaurants) < rule['min_other_restaurants']:
+        return analysis_result
+    
+    no_match_reason = fake_ruleset['no_match']['reason']
+    return {
+        **analysis_result,
+        'isFake': True,
+        'confidence': max(analysis_result['confidence'], rule['confidence']),
+        'fakeReasons': [reason for reason in analysis_result['fakeReasons'] if reason != no_match_reason]
+                       + [rule['reason'].format(count=len(other_restaurants))],
+        'nearDuplicates': matches[:STORED_NEAR_DUPLICATES]
+    }
+
+def get_author_signals(reviews: List[Dict]) -> Dict[str, Dict]:
+    """
+    Behavior signals of each review's author, keyed by reviewId
+    Read from the rollups the scrapers maintain in AuthorProfiles: the
+    author's profile plus the hourly window the review falls in, so a review
+    costs two item reads however many reviews its author has written.
+    """
+    
+    if not fake_ruleset.get('author_behavior'):
+        return {}
+    
+    wanted = {
+        review['reviewId']: (review['authorKey'], f"hour#{review['reviewDate'][:13]}")
+        for review in reviews if review.get('authorKey') and review.get('reviewDate')
+    }
+    keys = list({
+        (author, profile_key)
+        for author, hour in wanted.values()
+        for profile_key in ('profile', hour)
+    })
+    chunks = chunked(keys, BATCH_GET_SIZE)
+    
+    items = {}
+    with ThreadPoolExecutor(max_workers=min(len(chunks), BATCH_GET_CONCURRENCY) or 1) as executor:
+        for found in executor.map(
+            lambda chunk: batch_get_items('AuthorProfiles', [{'authorKey': a, 'profileKey': p} for a, p in chunk]),
+            chunks
+        ):
+            for item in found:
+                items[(item['authorKey'], item['profileKey'])] = item
+    
+    signals = {}
+    for review_id, (author, hour) in wanted.items():
+        profile = items.get((author, 'profile'))
+        if profile:
+            signals[review_id] = author_signals(profile, items.get((author, hour), {}))
+    return signals
+
+def author_signals(profile: Dict, window: Dict) -> Dict:
+    """Signals the author_behavior rules can test, from an author's profile and hourly window"""
+    
+    review_count = int(profile.get('reviewCount', 0))
+    rated_count = int(profile.get('ratedCount', 0))
+    rating_mean = float(profile.get('ratingSum', 0)) / rated_count if rated_count else 0.0
+    rating_variance = float(profile.get('ratingSquareSum', 0)) / rated_count - rating_mean ** 2 if rated_count else 0.0
+    
+    return {
+        'review_count': review_count,
+        'restaurants_reviewed': len(profile.get('restaurantIds', ())),
+        'rating_mean': rating_mean,
+        'rating_variance': max(0.0, rating_variance),
+        'five_star_share': int(profile.get('fiveStarCount', 0)) / review_count if review_count else 0.0,
+        'hour_reviews': int(window.get('reviewCount', 0)),
+        'hour_five_star_reviews': int(window.get('fiveStarCount', 0))
+    }
+
+def apply_author_behavior(analysis_result: Dict, signals: Optional[Dict]) -> Dict:
+    """
+    Add the author_behavior verdicts of the active ruleset to an analysis result
+    The signals are kept on the result (authorSignals) so it can be re-scored later.
+    """
+    
+    rules = fake_ruleset.get('author_behavior')
+    if not rules or not signals:
+        return analysis_result
+    analysis_result = {**analysis_result, 'authorSignals': signals}
+    
+    fired = [
+        rule for rule in rules
+        if signals['review_count'] >= rule.get('min_reviews', 0)
+        and (('above' in rule and signals[rule['signal']] > rule['above'])
+             or ('below' in rule and signals[rule['signal']] < rule['below']))
+    ]
+    if not fired:
+        return analysis_result
+    
+    no_match_reason = fake_ruleset['no_match']['reason']
+    return {
+        **analysis_result,
+        'isFake': analysis_result['isFake'] or any(rule.get('flags_fake', True) for rule in fired),
+        'confidence': max([analysis_result['confidence']] + [rule['confidence'] for rule in fired]),
+        'fakeReasons': [reason for reason in analysis_result['fakeReasons'] if reason != no_match_reason]
+                       + [rule['reason'].format(value=signals[rule['signal']], **signals) for rule in fired]
+    }
+
+def gather_review_signals(reviews: List[Dict]) -> Dict[str, Dict]:
+    """Signals that look beyond a single review (near-duplicates, author behavior), keyed by reviewId"""
+    
+    review_signals = {}
+    for name, gather in (('near_duplicates', find_near_duplicates), ('author', get_author_signals)):
+        try:
+            found = gather(reviews)
+        except Exception as e:
+            logger.error(f"Error gathering {name} signals: {str(e)}")
+            continue
+        for review_id, value in found.items():
+            review_signals.setdefault(review_id, {})[name] = value
+    return review_signals
+
+def store_analysis(review_id: str, analysis_result: Dict, review_signals: Dict[str, Dict]):
+    """Write a review's analysis with its cross-review signals applied"""
+    
+    signals = review_signals.get(review_id, {})
+    analysis_result = apply_near_duplicates(analysis_result, signals.get('near_duplicates'))
+    analysis_result = apply_author_behavior(analysis_result, signals.get('author'))
+    update_review_analysis(review_id, analysis_result)
+
+def stored_rule_inputs_complete(analysis: Dict) -> bool:
+    """
+    Whether a stored analysis result still holds every input the active ruleset reads
+    Key phrases, entities and near-duplicate matches are stored capped; a list at
+    its cap may have been cut down, and re-scoring it could drop a verdict.
+    """
+    
+    rules = fake_ruleset['rules']
+    capped_inputs = (
+        (any(rule['type'] == 'phrases' and rule['source'] == 'key_phrases' for rule in rules), 'keyPhrases', STORED_KEY_PHRASES),
+        (any(rule['type'] == 'entities' for rule in rules), 'entities', STORED_ENTITIES),
+        (bool(fake_ruleset.get('near_duplicates')), 'nearDuplicates', STORED_NEAR_DUPLICATES)
+    )
+    return not any(read and len(analysis.get(field) or []) >= cap for read, field, cap in capped_inputs)
+
+def rescore_stored_analysis(review_text: str, analysis: Dict) -> Optional[Dict]:
+    """
+    Re-apply the active ruleset to a stored analysis result, without Comprehend
+    Uses the Comprehend outputs and cross-review signals kept on the result.
+    Returns None for results that have no Comprehend outputs (keyword
+    fallback, pre-scorer) or whose stored outputs were cut down.
+    """
+    
+    if analysis.get('error') or analysis.get('prescorerVersion') or analysis.get('sentiment', UNKNOWN_SENTIMENT) == UNKNOWN_SENTIMENT:
+        return None
+    if not stored_rule_inputs_complete(analysis):
+        return None
+    
+    result = build_analysis_result(
+        review_text,
+        analysis['language'],
+        {'Sentiment': analysis['sentiment'], 'SentimentScore': analysis.get('sentimentScores', {})},
+        {'KeyPhrases': [{'Text': text} for text in analysis.get('keyPhrases', [])]},
+        {'Entities': [{'Text': entity['text'], 'Type': entity['type']} for entity in analysis.get('entities', [])]}
+    )
+    
+    rule = fake_ruleset.get('near_duplicates')
+    if rule and analysis.get('nearDuplicates'):
+        matches = [match for match in analysis['nearDuplicates'] if match['similarity'] >= rule['min_similarity']]
+        result = apply_near_duplicates(result, matches)
+    return apply_author_behavior(result, analysis.get('authorSignals'))
+
+def reason_templates_for(ruleset: Dict) -> Dict[str, str]:
+    """Reason templates of a ruleset by reason code"""
+    
+    templates = {'nm': ruleset['no_match']['reason'], 'bk': ruleset['basic']['reason']}
+    templates.update({f'r{i}': rule['reason'] for i, rule in enumerate(ruleset['rules'])})
+    if ruleset.get('near_duplicates'):
+        templates['nd'] = ruleset['near_duplicates']['reason']
+    templates.update({f'a{i}': rule['reason'] for i, rule in enumerate(ruleset.get('author_behavior') or [])})
+    templates.update(FIXED_REASON_TEMPLATES)
+    return templates
+
+class ReasonCodec:
+    """
+    Encodes reason sentences as '#<code>|<value>|...' against a set of reason templates
+    Reasons that no template reproduces exactly are kept verbatim.
+    """
+    
+    def __init__(self, templates: Dict[str, str]):
+        self.templates = templates
+        self.fields = {}
+        self.patterns = []
+        for code, template in templates.items():
+            parsed = list(string.Formatter().parse(template))
+            fields = [field for _, field, _, _ in parsed if field is not None]
+            if not all(field.isidentifier() for field in fields) or any(spec or conversion for _, _, spec, conversion in parsed):
+                continue  # Positional or formatted fields can't be rebuilt from text
+            self.fields[code] = fields
+            pattern = ''.join(re.escape(literal) + ('(.*?)' if field is not None else '') for literal, field, _, _ in parsed)
+            self.patterns.append((code, re.compile(pattern + r'\Z', re.DOTALL)))
+    
+    def encode(self, reason: str) -> str:
+        for code, pattern in self.patterns:
+            match = pattern.match(reason)
+            if not match or any(REASON_VALUE_SEPARATOR in value for value in match.groups()):
+                continue
+            encoded = REASON_CODE_PREFIX + REASON_VALUE_SEPARATOR.join((code,) + match.groups())
+            if self.decode(encoded) == reason:
+                return encoded
+        return reason
+    
+    def decode(self, encoded: str) -> str:
+        if not encoded.startswith(REASON_CODE_PREFIX):
+            return encoded
+        code, *values = encoded[len(REASON_CODE_PREFIX):].split(REASON_VALUE_SEPARATOR)
+        fields = self.fields.get(code)
+        if fields is None or len(fields) != len(values):
+            return encoded
+        return self.templates[code].format(**dict(zip(fields, values)))
+
+reason_codecs = {str(fake_ruleset['version']): ReasonCodec(reason_templates_for(fake_ruleset))}
+reason_codec = reason_codecs[str(fake_ruleset['version'])]
+reason_templates_registered = False
+
+def register_reason_templates():
+    """Record the active ruleset's reason templates so stored reason codes can be decoded"""
+    
+    global reason_templates_registered
+    if reason_templates_registered:
+        return
+    
+    version = str(fake_ruleset['version'])
+    try:
+        analysis_table.put_item(Item={
+            'analysisId': f'ruleset_{version}',
+            'rulesetVersion': version,
+            'reasonTemplates': reason_codec.templates,
+            'createdAt': datetime.now().isoformat()
+        })
+        reason_templates_registered = True
+    except Exception as e:
+        logger.error(f"Error registering reason templates of ruleset {version}: {str(e)}")
+
+def get_reason_codec(version: str) -> Optional[ReasonCodec]:
+    """Reason codec of a ruleset version, from its registered templates"""
+    
+    version = str(version)
+    if version not in reason_codecs:
+        try:
+            item = analysis_table.get_item(Key={'analysisId': f'ruleset_{version}'}).get('Item')
+        except Exception as e:
+            logger.error(f"Error loading reason templates of ruleset {version}: {str(e)}")
+            return None
+        reason_codecs[version] = ReasonCodec(item['reasonTemplates']) if item else None
+    return reason_codecs[version]
+
+def compact_analysis(analysis_result: Dict) -> Dict:
+    """
+    Storage form of an analysis result (comprehendAnalysis)
+    language, sentiment, isFake, confidence and the timestamp are top-level
+    review attributes already and are not repeated.
+    """
+    
+    compact = {
+        'format': ANALYSIS_FORMAT,
+        'rulesetVersion': str(fake_ruleset['version']),  # Also the templates of reasonCodes
+        'reasonCodes': [reason_codec.encode(reason) for reason in analysis_result.get('fakeReasons', [])]
+    }
+    for field in ('prescorerVersion', 'error'):
+        if field in analysis_result:
+            compact[field] = analysis_result[field]
+    
+    # Full precision: the rules compare these scores against thresholds when a review is re-scored
+    payload = {field: analysis_result[field] for field in ANALYSIS_BLOB_FIELDS if analysis_result.get(field)}
+    if payload:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=ANALYSIS_BLOB_DICTIONARY)
+        # Outputs served from AnalysisCache hold Decimals; float() gives back the original score
+        data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=float).encode('utf-8')
+        compact['blob'] = compressor.compress(data) + compressor.flush()
+    return compact
+
+def decompress_analysis_blob(blob) -> Dict:
+    """Payload of a compact analysis blob"""
+    
+    decompressor = zlib.decompressobj(-15, zdict=ANALYSIS_BLOB_DICTIONARY)
+    return json.loads(decompressor.decompress(bytes(blob)) + decompressor.flush())
+
+def expand_analysis(review: Dict) -> Dict:
+    """Analysis result of a stored review, in the shape built by the analyzer"""
+    
+    stored = review.get('comprehendAnalysis') or {}
+    if stored.get('format') != ANALYSIS_FORMAT:
+        return stored  # Written before compact storage
+    
+    payload = decompress_analysis_blob(stored['blob']) if 'blob' in stored else {}
+    codec = get_reason_codec(stored['rulesetVersion'])
+    analysis = {
+        'language': review.get('language'),
+        'sentiment': review.get('sentiment'),
+        'sentimentScores': payload.get('sentimentScores', {}),
+        'keyPhrases': payload.get('keyPhrases', []),
+        'entities': payload.get('entities', []),
+        'isFake': review.get('isFake') == 'true',
+        'confidence': float(review.get('confidence', 0)),
+        'fakeReasons': [codec.decode(code) if codec else code for code in stored.get('reasonCodes', [])],
+        'rulesetVersion': stored['rulesetVersion'],
+        'analysisTimestamp': review.get('analyzedAt')
+    }
+    for field in ('nearDuplicates', 'authorSignals'):
+        if field in payload:
+            analysis[field] = payload[field]
+    for field in ('prescorerVersion', 'error'):
+        if field in stored:
+            analysis[field] = stored[field]
+    return analysis
+
+def analyzed_at_condition(review: Dict) -> Tuple[str, Dict]:
+    """Condition (and its values) that holds only while a review has not been re-analyzed since it was read"""
+    
+    if review.get('analyzedAt'):
+        return 'analyzedAt = :analyzed', {':analyzed': review['analyzedAt']}
+    return 'attribute_not_exists(analyzedAt)', {}
+
+def update_review_analysis(review_id: str, analysis_result: Dict, read_review: Optional[Dict] = None):
+    """
+    Update review with analysis results in DynamoDB
+    With read_review (the review as the caller read it), the update only applies
+    if the review was not re-analyzed since; otherwise ConditionalCheckFailedException
+    is raised and the rollup is left alone.
+    """
+    
+    register_reason_templates()
+    update_kwargs = {
+        'Key': {'reviewId': review_id},
+        'UpdateExpression': '''
+            SET 
+                #lang = :lang,
+                sentiment = :sentiment,
+                isFake = :is_fake,
+                confidence = :confidence,
+                comprehendAnalysis = :analysis,
+                analyzedAt = :timestamp
+            REMOVE pendingRestaurantId
+        ''',
+        'ExpressionAttributeNames': {
+            '#lang': 'language'  # 'language' is a reserved word
+        },
+        'ExpressionAttributeValues': {
+            ':lang': analysis_result['language'],
+            ':sentiment': analysis_result['sentiment'],
+            ':is_fake': 'true' if analysis_result['isFake'] else 'false',
+            ':confidence': Decimal(str(round(float(analysis_result['confidence']), 4))),
+            ':analysis': compact_analysis(analysis_result),
+            ':timestamp': datetime.now().isoformat()
+        },
+        'ReturnValues': 'ALL_OLD'
+    }
+    if read_review is not None:
+        condition, values = analyzed_at_condition(read_review)
+        update_kwargs['ConditionExpression'] = condition
+        update_kwargs['ExpressionAttributeValues'].update(values)
+    
+    try:
+        response = reviews_table.update_item(**update_kwargs)
         
         logger.info(f"Updated analysis for review {review_id}")
         
+    except ClientError as e:
+        if read_review is not None and e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise  # Re-analyzed since the caller read it
+        logger.error(f"Error updating review {review_id}: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Error updating review {review_id}: {str(e)}")
         raise
+    
+    # Move the review between buckets of its restaurant's rollup
+    previous = response.get('Attributes', {})
+    restaurant_id = previous.get('restaurantId')
+    if not restaurant_id:
+        return
+    
+    was_fake = previous.get('isFake') == 'true'
+    old_sentiment = previous.get('sentiment', UNKNOWN_SENTIMENT)
+    new_sentiment = analysis_result['sentiment']
+    sentiment_deltas = {}
+    if old_sentiment != new_sentiment:
+        sentiment_deltas = {old_sentiment: -1, new_sentiment: 1}
+    
+    try:
+        update_restaurant_review_stats(
+            restaurants_table,
+            restaurant_id,
+            fake_delta=int(bool(analysis_result['isFake'])) - int(was_fake),
+            sentiment_deltas=sentiment_deltas
+        )
+    except Exception as e:
+        logger.error(f"Error updating review stats for restaurant {restaurant_id}: {str(e)}")
 
 # For local testing  
 if __name__ == "__main__":
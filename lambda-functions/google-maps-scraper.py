@@ -4,27 +4,98 @@ Scrapes reviews from Google Maps and stores in DynamoDB
 """
 
 import json
+import random
+import hashlib
+import zlib
 import boto3
 import requests
 import time
-import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
 from urllib.parse import quote
 import logging
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from typing import Dict, List, Optional, Set, Tuple
+
+from trustbites_common import (
+    UNKNOWN_SENTIMENT, author_key, index_restaurant_for_search, index_review_for_similarity, lsh_buckets,
+    minhash_signature, pack_signature, restaurant_id_for, review_id_for, update_restaurant_review_stats
+)
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=50))  # Shared by concurrent store batches
 restaurants_table = dynamodb.Table('Restaurants')
 reviews_table = dynamodb.Table('Reviews')
+analysis_table = dynamodb.Table('AnalysisResults')
+search_index_table = dynamodb.Table('RestaurantSearchIndex')
+similarity_index_table = dynamodb.Table('ReviewSimilarityIndex')
+author_profiles_table = dynamodb.Table('AuthorProfiles')
+
+# Hourly author windows only matter until the reviews in them are analyzed
+AUTHOR_WINDOW_TTL_SECONDS = 30 * 24 * 3600
+
+# Deterministic IDs make a re-scrape hit the same items, so stores are upserts
+RESTAURANT_CREATE_ONLY_ATTRIBUTES = {'createdAt', 'reviewCount', 'fakeCount', 'sentimentBreakdown'}
+REVIEW_CONTENT_ATTRIBUTES = ['reviewText', 'rating']  # A change here is an edit that needs re-analysis
+REVIEW_UPSERT_ATTRIBUTES = ['reviewId', 'reviewText', 'rating', 'isFake', 'sentiment']
+
+# BatchGetItem accepts at most 100 keys per call, BatchWriteItem 25 items
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+STORE_CONCURRENCY = 8  # Concurrent write batches and per-review updates
+MAX_THROTTLE_RETRIES = 5
+THROTTLE_BACKOFF_BASE_SECONDS = 0.2
+THROTTLE_BACKOFF_MAX_SECONDS = 5.0
 
 def lambda_handler(event, context):
     """
-    Lambda handler for Google Maps scraping
+    Lambda entry point
+    When invoked for an API job (event carries "job_id"), progress and the
+    result are recorded on the job's AnalysisResults item
+    """
+    
+    job_id = event.get('job_id')
+    if job_id:
+        update_job_status(job_id, 'running')
+    
+    result = run_scrape(event, context)
+    
+    if job_id:
+        body = json.loads(result['body'], parse_float=Decimal)
+        if result['statusCode'] == 200:
+            update_job_status(job_id, 'completed', {'result': body})
+        else:
+            update_job_status(job_id, 'failed', {'error': body.get('error', 'Unknown error')})
+    
+    return result
+
+def update_job_status(job_id: str, status: str, fields: Optional[Dict] = None):
+    """Record job progress on its AnalysisResults item"""
+    
+    now = datetime.now().isoformat()
+    attributes = {'status': status, 'updatedAt': now, **(fields or {})}
+    if status in ('completed', 'failed'):
+        attributes['completedAt'] = now
+    
+    try:
+        analysis_table.update_item(
+            Key={'analysisId': job_id},
+            UpdateExpression='SET ' + ', '.join(f'#a{i} = :v{i}' for i in range(len(attributes))),
+            ExpressionAttributeNames={f'#a{i}': name for i, name in enumerate(attributes)},
+            ExpressionAttributeValues={f':v{i}': value for i, value in enumerate(attributes.values())}
+        )
+    except Exception as e:
+        logger.error(f"Error updating job {job_id}: {str(e)}")
+
+def run_scrape(event, context):
+    """
+    Run Google Maps scraping
     
     Expected event structure:
     {
@@ -62,21 +133,19 @@ def lambda_handler(event, context):
         # Step 3: Store restaurant data
         restaurant_id = store_restaurant(restaurant_data)
         
-        # Step 4: Store reviews
-        stored_reviews = []
-        for review in reviews:
-            review['restaurantId'] = restaurant_id
-            review_id = store_review(review)
-            stored_reviews.append(review_id)
+        # Step 4: Store new and edited reviews (unchanged ones are skipped);
+        # their sentiment is UNKNOWN_SENTIMENT until the analyzer classifies them
+        stored_reviews = store_reviews(restaurant_id, reviews)
         
-        logger.info(f"Successfully scraped {len(stored_reviews)} reviews")
+        logger.info(f"Successfully scraped {len(reviews)} reviews, {len(stored_reviews)} new or edited")
         
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'success': True,
                 'restaurant_id': restaurant_id,
-                'reviews_scraped': len(stored_reviews),
+                'reviews_scraped': len(reviews),
+                'reviews_stored': len(stored_reviews),
                 'review_ids': stored_reviews
             })
         }
@@ -98,17 +167,17 @@ def search_restaurant(name: str, location: str) -> Optional[Dict]:
     # TODO: Replace with actual Google Places API call
     # For hackathon demo, we'll simulate restaurant data
     
-    restaurant_id = f"rest_{uuid.uuid4().hex[:8]}"
-    
-    # Simulated restaurant data (replace with actual API call)
+    # Simulated restaurant data (replace with actual API call); derived from the
+    # query so that scraping the same restaurant again finds the same place
+    digest = hashlib.sha256(f"{name.lower()}\x1f{location.lower()}".encode('utf-8')).digest()
     return {
-        'place_id': f"ChIJ{uuid.uuid4().hex[:16]}",
+        'place_id': f"ChIJ{digest.hex()[:16]}",
         'name': name,
         'address': f"123 Food Street, {location}",
         'location': location.split(',')[0].strip(),
         'cuisine': 'Malaysian',  # Could be detected from name/description
-        'latitude': 3.1390 + (hash(name) % 100) * 0.001,  # Simulated coordinates
-        'longitude': 101.6869 + (hash(name) % 100) * 0.001,
+        'latitude': 3.1390 + (digest[0] % 100) * 0.001,  # Simulated coordinates
+        'longitude': 101.6869 + (digest[1] % 100) * 0.001,
         'rating': 4.2,
         'total_reviews': 150
     }
@@ -149,6 +218,8 @@ def scrape_google_reviews(place_id: str, max_reviews: int) -> List[Dict]:
     ]
     
     all_samples = sample_reviews_en + sample_reviews_ms
+    # Fixed posting dates, so a re-scrape yields the same reviews
+    first_review_date = datetime(2024, 1, 1, 12, 0)
     
     for i in range(min(max_reviews, len(all_samples))):
         review_text = all_samples[i % len(all_samples)]
@@ -160,8 +231,8 @@ def scrape_google_reviews(place_id: str, max_reviews: int) -> List[Dict]:
         review = {
             'authorName': f"User {i+1}",
             'reviewText': review_text,
-            'rating': min(5, max(1, 3 + (hash(review_text) % 5) - 2)),  # Random rating 1-5
-            'reviewDate': datetime.now().isoformat(),
+            'rating': min(5, max(1, 3 + (zlib.crc32(review_text.encode('utf-8')) % 5) - 2)),  # Pseudo-random rating 1-5
+            'reviewDate': (first_review_date + timedelta(days=i)).isoformat(),
             'language': 'ms' if any(word in review_text.lower() for word in ['makanan', 'sedap', 'tempat']) else 'en',
             'sourceUrl': f"https://maps.google.com/place/{place_id}/review_{i}"
         }
@@ -170,10 +241,105 @@ def scrape_google_reviews(place_id: str, max_reviews: int) -> List[Dict]:
     
     return reviews
 
+def dynamo_item(item: Dict) -> Dict:
+    """Copy of an item with floats as Decimals, the way DynamoDB stores (and returns) them"""
+    return json.loads(json.dumps(item), parse_float=Decimal)
+
+def batch_get_items(table_name: str, keys: List[Dict], attributes: Optional[List[str]] = None) -> List[Dict]:
+    """Fetch items in chunks of 100, retrying UnprocessedKeys with jittered backoff"""
+    
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table_name: {'Keys': keys[start:start + BATCH_GET_SIZE]}}
+        if attributes:
+            # Placeholders for every name, since e.g. 'language' is a reserved word
+            request[table_name]['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(attributes)))
+            request[table_name]['ExpressionAttributeNames'] = {f'#p{i}': name for i, name in enumerate(attributes)}
+        
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+        else:
+            logger.error(f"Gave up on {len(request[table_name]['Keys'])} unprocessed {table_name} keys")
+    
+    return items
+
+def write_batch(table_name: str, items: List[Dict], key_names: List[str]) -> Set[Tuple]:
+    """Put up to 25 items with one BatchWriteItem, retrying UnprocessedItems; returns the keys not written"""
+    
+    remaining = items
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        response = dynamodb.batch_write_item(
+            RequestItems={table_name: [{'PutRequest': {'Item': item}} for item in remaining]}
+        )
+        unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not unprocessed:
+            return set()
+        remaining = [request['PutRequest']['Item'] for request in unprocessed]
+        delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+    
+    logger.error(f"Gave up on {len(remaining)} unprocessed {table_name} items")
+    return {tuple(item[name] for name in key_names) for item in remaining}
+
+def batch_write_items(table_name: str, items: List[Dict], key_names: List[str]) -> List[bool]:
+    """Put items in batches of 25 written concurrently; returns whether each item was written"""
+    
+    batches = [items[start:start + BATCH_WRITE_SIZE] for start in range(0, len(items), BATCH_WRITE_SIZE)]
+    failed = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(STORE_CONCURRENCY, len(batches)))) as executor:
+        futures = {executor.submit(write_batch, table_name, batch, key_names): batch for batch in batches}
+        for future, batch in futures.items():
+            try:
+                failed |= future.result()
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} items to {table_name}: {str(e)}")
+                failed |= {tuple(item[name] for name in key_names) for item in batch}
+    
+    return [tuple(item[name] for name in key_names) not in failed for item in items]
+
+def upsert_restaurant(item: Dict) -> bool:
+    """
+    Create a restaurant or refresh its scraped attributes, keeping its review rollups
+    Returns False, without writing, when nothing scraped has changed.
+    """
+    
+    previous = restaurants_table.get_item(Key={'restaurantId': item['restaurantId']}).get('Item')
+    scraped = {
+        name: value for name, value in item.items()
+        if name not in RESTAURANT_CREATE_ONLY_ATTRIBUTES and name not in ('restaurantId', 'lastScraped')
+    }
+    if previous and all(previous.get(name) == value for name, value in scraped.items()):
+        return False
+    
+    attributes = {**scraped, 'lastScraped': item['lastScraped']}
+    names = {f'#a{i}': name for i, name in enumerate(attributes)}
+    values = {f':a{i}': value for i, value in enumerate(attributes.values())}
+    set_clauses = [f'#a{i} = :a{i}' for i in range(len(attributes))]
+    create_only = [name for name in item if name in RESTAURANT_CREATE_ONLY_ATTRIBUTES]
+    for i, name in enumerate(create_only):
+        names[f'#c{i}'] = name
+        values[f':c{i}'] = item[name]
+        set_clauses.append(f'#c{i} = if_not_exists(#c{i}, :c{i})')
+    
+    restaurants_table.update_item(
+        Key={'restaurantId': item['restaurantId']},
+        UpdateExpression='SET ' + ', '.join(set_clauses),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+    index_restaurant_for_search(search_index_table, item, previous.get('name') if previous else None)
+    return True
+
 def store_restaurant(restaurant_data: Dict) -> str:
-    """Store restaurant data in DynamoDB"""
+    """Create or refresh a restaurant in DynamoDB"""
     
-    restaurant_id = f"rest_{uuid.uuid4().hex[:8]}"
+    restaurant_id = restaurant_id_for(restaurant_data['place_id'])
     
     item = {
         'restaurantId': restaurant_id,
@@ -186,38 +352,247 @@ def store_restaurant(restaurant_data: Dict) -> str:
         'avgRating': restaurant_data['rating'],
         'totalReviews': restaurant_data['total_reviews'],
         'lastScraped': datetime.now().isoformat(),
-        'googlePlaceId': restaurant_data['place_id']
+        'googlePlaceId': restaurant_data['place_id'],
+        'reviewCount': 0,
+        'fakeCount': 0,
+        'sentimentBreakdown': {}
     }
     
-    restaurants_table.put_item(Item=item)
-    logger.info(f"Stored restaurant: {restaurant_id}")
+    if upsert_restaurant(dynamo_item(item)):
+        logger.info(f"Stored restaurant: {restaurant_id}")
+    else:
+        logger.info(f"Restaurant unchanged: {restaurant_id}")
     
     return restaurant_id
 
-def store_review(review_data: Dict) -> str:
-    """Store review data in DynamoDB"""
+def update_author_profile(review_item: Dict, previous_rating: Optional[int] = None):
+    """
+    Fold a newly stored review into its author's profile and hourly window
+    For an edited review (previous_rating given) only the rating change is applied.
+    """
+    
+    rating = int(review_item.get('rating') or 0)
+    new_review = previous_rating is None
+    old_rating = 0 if new_review else int(previous_rating or 0)
+    deltas = {
+        'reviewCount': 1 if new_review else 0,
+        'ratedCount': int(rating > 0) - int(old_rating > 0),
+        'ratingSum': rating - old_rating,
+        'ratingSquareSum': rating * rating - old_rating * old_rating,
+        'fiveStarCount': int(rating == 5) - int(old_rating == 5)
+    }
+    if not any(deltas.values()):
+        return
+    
+    values = {f':{name}': delta for name, delta in deltas.items()}
+    update_expression = 'ADD ' + ', '.join(f'{name} :{name}' for name in deltas)
+    if new_review:
+        values[':restaurant'] = {review_item['restaurantId']}
+        update_expression += ', restaurantIds :restaurant'
+    author_profiles_table.update_item(
+        Key={'authorKey': review_item['authorKey'], 'profileKey': 'profile'},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=values
+    )
+    author_profiles_table.update_item(
+        Key={'authorKey': review_item['authorKey'], 'profileKey': f"hour#{review_item['reviewDate'][:13]}"},
+        UpdateExpression='ADD reviewCount :reviewCount, fiveStarCount :fiveStarCount SET expiresAt = :expires',
+        ExpressionAttributeValues={
+            ':reviewCount': deltas['reviewCount'],
+            ':fiveStarCount': deltas['fiveStarCount'],
+            ':expires': int(time.time()) + AUTHOR_WINDOW_TTL_SECONDS
+        }
+    )
+
+def create_new_review(item: Dict) -> bool:
+    """Conditionally put a new review; False when it is already stored (by a concurrent scrape) or the put fails"""
     
-    review_id = f"rev_{uuid.uuid4().hex[:12]}"
+    try:
+        reviews_table.put_item(Item=item, ConditionExpression='attribute_not_exists(reviewId)')
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            logger.error(f"Error storing review {item['reviewId']}: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Error storing review {item['reviewId']}: {str(e)}")
+        return False
+
+def create_reviews(items: List[Dict]) -> List[Dict]:
+    """
+    Write new reviews with concurrent conditional puts, then their similarity postings and author profiles
+    Returns the items this call created; a review a concurrent scrape stored first
+    is left to that scrape, so the rollup counts each review once.
+    """
     
-    item = {
-        'reviewId': review_id,
-        'restaurantId': review_data['restaurantId'],
-        'authorName': review_data['authorName'],
-        'reviewText': review_data['reviewText'],
-        'rating': review_data['rating'],
-        'reviewDate': review_data['reviewDate'],
-        'scrapedAt': datetime.now().isoformat(),
-        'language': review_data['language'],
-        'isFake': 'pending',  # To be analyzed later
-        'confidence': 0.0,
-        'sentiment': 'unknown',
-        'sourceUrl': review_data['sourceUrl']
+    signatures = {}
+    for item in items:
+        signature = minhash_signature(item['reviewText'])
+        if signature:
+            item['minhashSignature'] = pack_signature(signature)
+            signatures[item['reviewId']] = signature
+    
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        created = [item for item, ok in zip(items, executor.map(create_new_review, items)) if ok]
+    if len(created) < len(items):
+        logger.info(f"{len(items) - len(created)} new reviews not created (stored concurrently or failed)")
+    
+    postings = [
+        {'bucket': bucket, 'reviewId': item['reviewId'], 'restaurantId': item['restaurantId']}
+        for item in created if item['reviewId'] in signatures
+        for bucket in lsh_buckets(signatures[item['reviewId']])
+    ]
+    indexed = batch_write_items(similarity_index_table.name, postings, ['bucket', 'reviewId'])
+    if not all(indexed):
+        logger.error(f"Failed to write {indexed.count(False)} similarity postings")
+    
+    def fold_into_profile(item: Dict):
+        try:
+            update_author_profile(item)
+        except Exception as e:
+            logger.error(f"Error updating author profile {item['authorKey']}: {str(e)}")
+    
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        list(executor.map(fold_into_profile, [item for item in created if 'authorKey' in item]))
+    return created
+
+def update_review_content(item: Dict, previous: Dict) -> bool:
+    """
+    Store the edited text and rating of a known review and queue it for analysis again
+    Conditional on the stored content, so an edit is applied once across concurrent scrapes.
+    """
+    
+    signature = minhash_signature(item['reviewText'])
+    values = {
+        ':text': item['reviewText'],
+        ':rating': item['rating'],
+        ':lang': item['language'],
+        ':scraped': item['scrapedAt'],
+        ':pending': 'pending',
+        ':restaurant': item['restaurantId'],
+        ':confidence': item['confidence'],
+        ':sentiment': item['sentiment'],
+        ':old_text': previous['reviewText'],
+        ':old_rating': previous['rating']
+    }
+    set_clauses = [
+        'reviewText = :text', 'rating = :rating', '#lang = :lang', 'scrapedAt = :scraped', 'isFake = :pending',
+        'pendingRestaurantId = :restaurant', 'confidence = :confidence', 'sentiment = :sentiment'
+    ]
+    remove_clauses = ['comprehendAnalysis', 'analyzedAt']
+    if signature:
+        values[':signature'] = pack_signature(signature)
+        set_clauses.append('minhashSignature = :signature')
+    else:
+        remove_clauses.append('minhashSignature')
+    
+    try:
+        reviews_table.update_item(
+            Key={'reviewId': item['reviewId']},
+            UpdateExpression=f"SET {', '.join(set_clauses)} REMOVE {', '.join(remove_clauses)}",
+            ConditionExpression='reviewText = :old_text AND rating = :old_rating',
+            ExpressionAttributeNames={'#lang': 'language'},  # 'language' is a reserved word
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False  # Applied by a concurrent scrape
+        raise
+    
+    if signature:
+        try:
+            index_review_for_similarity(similarity_index_table, item['reviewId'], item['restaurantId'], signature)
+        except Exception as e:
+            logger.error(f"Error indexing review {item['reviewId']} for similarity: {str(e)}")
+    if 'authorKey' in item:
+        try:
+            update_author_profile(item, previous_rating=previous['rating'])
+        except Exception as e:
+            logger.error(f"Error updating author profile {item['authorKey']}: {str(e)}")
+    return True
+
+def upsert_reviews(items: List[Dict]) -> List[str]:
+    """
+    Store new reviews and edits of known ones, skipping unchanged reviews without a write
+    Items carry their deterministic reviewId; returns the IDs written, which are
+    pending analysis. The restaurant's review rollup is updated to match.
+    """
+    
+    items = list({item['reviewId']: item for item in items}.values())
+    existing = {
+        previous['reviewId']: previous
+        for previous in batch_get_items(reviews_table.name, [{'reviewId': item['reviewId']} for item in items],
+                                        REVIEW_UPSERT_ATTRIBUTES)
     }
     
-    reviews_table.put_item(Item=item)
-    logger.info(f"Stored review: {review_id}")
+    new_items = [item for item in items if item['reviewId'] not in existing]
+    edits = [
+        (item, existing[item['reviewId']]) for item in items
+        if item['reviewId'] in existing
+        and any(existing[item['reviewId']].get(name) != item[name] for name in REVIEW_CONTENT_ATTRIBUTES)
+    ]
+    
+    def apply_edit(edit: Tuple[Dict, Dict]) -> bool:
+        try:
+            return update_review_content(*edit)
+        except Exception as e:
+            logger.error(f"Error storing review {edit[0]['reviewId']}: {str(e)}")
+            return False
+    
+    created = create_reviews(new_items) if new_items else []
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        edited = [item for (item, _), ok in zip(edits, executor.map(apply_edit, edits)) if ok]
+    
+    review_delta = len(created)
+    fake_delta = 0
+    sentiment_deltas = {}
+    for item in created + edited:
+        sentiment_deltas[item['sentiment']] = sentiment_deltas.get(item['sentiment'], 0) + 1
+    for item in edited:
+        # The review leaves its analyzed buckets until it is analyzed again
+        previous = existing[item['reviewId']]
+        fake_delta -= int(previous.get('isFake') == 'true')
+        old_sentiment = previous.get('sentiment', item['sentiment'])
+        sentiment_deltas[old_sentiment] = sentiment_deltas.get(old_sentiment, 0) - 1
+    written = [item['reviewId'] for item in created + edited]
+    
+    logger.info(f"Stored {review_delta} new and {len(written) - review_delta} edited reviews, "
+                f"{len(items) - len(written)} unchanged")
+    
+    if written:
+        restaurant_id = items[0]['restaurantId']
+        try:
+            update_restaurant_review_stats(restaurants_table, restaurant_id, review_delta=review_delta,
+                                           fake_delta=fake_delta, sentiment_deltas=sentiment_deltas)
+        except Exception as e:
+            logger.error(f"Error updating review stats for restaurant {restaurant_id}: {str(e)}")
+    return written
+
+def store_reviews(restaurant_id: str, reviews: List[Dict]) -> List[str]:
+    """Store scraped reviews of a restaurant; returns the IDs of new and edited reviews"""
+    
+    items = []
+    for review_data in reviews:
+        item = dynamo_item({
+            'restaurantId': restaurant_id,
+            'authorName': review_data['authorName'],
+            'reviewText': review_data['reviewText'],
+            'rating': review_data['rating'],
+            'reviewDate': review_data['reviewDate'],
+            'scrapedAt': datetime.now().isoformat(),
+            'language': review_data['language'],
+            'isFake': 'pending',  # To be analyzed later
+            'pendingRestaurantId': restaurant_id,  # Sparse PendingReviewsIndex key, removed once analyzed
+            'confidence': 0.0,
+            'sentiment': UNKNOWN_SENTIMENT,  # Until the analyzer classifies it
+            'sourceUrl': review_data['sourceUrl']
+        })
+        if author_key(item):
+            item['authorKey'] = author_key(item)
+        item['reviewId'] = review_id_for(item)
+        items.append(item)
     
-    return review_id
+    return upsert_reviews(items)
 
 # For local testing
 if __name__ == "__main__":
@@ -4,26 +4,360 @@ Uses official Google Places API to get restaurant reviews
 """
 
 import json
+import hashlib
+import math
+import random
+import re
+import threading
+import zlib
 import boto3
 import requests
-import uuid
+import time
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
 import logging
+from boto3.dynamodb.conditions import Attr
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from trustbites_common import (
+    UNKNOWN_SENTIMENT, author_key, contributor_id, index_restaurant_for_search, index_review_for_similarity,
+    lsh_buckets, minhash_signature, pack_signature, restaurant_id_for, review_id_for,
+    update_restaurant_review_stats
+)
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # AWS clients
-dynamodb = boto3.resource('dynamodb')
+dynamodb = boto3.resource('dynamodb', config=Config(max_pool_connections=50))  # Shared by concurrent store batches
 restaurants_table = dynamodb.Table('Restaurants')
 reviews_table = dynamodb.Table('Reviews')
+analysis_table = dynamodb.Table('AnalysisResults')
+search_index_table = dynamodb.Table('RestaurantSearchIndex')
+similarity_index_table = dynamodb.Table('ReviewSimilarityIndex')
+author_profiles_table = dynamodb.Table('AuthorProfiles')
+places_cache_table = dynamodb.Table('PlacesCache')
+lambda_client = boto3.client('lambda')
+
+# Hourly author windows only matter until the reviews in them are analyzed
+AUTHOR_WINDOW_TTL_SECONDS = 30 * 24 * 3600
+
+# Deterministic IDs make a re-scrape hit the same items, so stores are upserts
+RESTAURANT_CREATE_ONLY_ATTRIBUTES = {'createdAt', 'reviewCount', 'fakeCount', 'sentimentBreakdown'}
+REVIEW_CONTENT_ATTRIBUTES = ['reviewText', 'rating']  # A change here is an edit that needs re-analysis
+REVIEW_UPSERT_ATTRIBUTES = ['reviewId', 'reviewText', 'rating', 'isFake', 'sentiment']
+
+# BatchGetItem accepts at most 100 keys per call, BatchWriteItem 25 items
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+STORE_CONCURRENCY = 8  # Concurrent write batches and per-review updates
+MAX_THROTTLE_RETRIES = 5
+THROTTLE_BACKOFF_BASE_SECONDS = 0.2
+THROTTLE_BACKOFF_MAX_SECONDS = 5.0
 
 # Google Places API configuration
 GOOGLE_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY')
 PLACES_API_BASE = "https://maps.googleapis.com/maps/api/place"
+GEOCODE_API_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+PLACES_RATE_LIMIT_PER_SECOND = float(os.environ.get('PLACES_RATE_LIMIT_PER_SECOND', 10))  # Per container
+PLACES_CONNECT_TIMEOUT_SECONDS = 3.05
+PLACES_READ_TIMEOUT_SECONDS = 10
+PLACES_POOL_SIZE = 10  # Keep-alive connections kept per host
+PLACES_MAX_RETRIES = 3
+PLACES_BACKOFF_BASE_SECONDS = 0.5
+PLACES_BACKOFF_MAX_SECONDS = 8.0
+PLACES_RETRY_STATUSES = {'OVER_QUERY_LIMIT'}  # API statuses worth retrying (besides HTTP 5xx)
+
+# Area crawl mode (event "area"): nearby search pages fan out to concurrent Place Details calls
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 8))  # Keep within PLACES_POOL_SIZE
+CRAWL_DEFAULT_RADIUS_METERS = 1000
+CRAWL_MAX_PLACES = 60  # Nearby search returns at most 3 pages of 20
+NEXT_PAGE_TOKEN_DELAY_SECONDS = 2.0  # A next_page_token only becomes valid after a short delay
+NEXT_PAGE_TOKEN_ATTEMPTS = 5
+
+# Places response cache: an in-container LRU in front of the PlacesCache table.
+# Endpoints without a TTL here (or with TTL 0) are always fetched; nearby search
+# pages are cached per area cell below instead, since their next_page_tokens expire.
+PLACES_CACHE_TTL_SECONDS = {
+    'textsearch': int(os.environ.get('PLACES_TEXTSEARCH_CACHE_TTL_HOURS', 24)) * 3600,
+    'details': int(os.environ.get('PLACES_DETAILS_CACHE_TTL_HOURS', 6)) * 3600,
+    'geocode': int(os.environ.get('PLACES_GEOCODE_CACHE_TTL_DAYS', 30)) * 24 * 3600
+}
+PLACES_CACHE_MEMORY_ENTRIES = 500
+PLACES_CACHEABLE_STATUSES = {'OK', 'ZERO_RESULTS'}
+
+# Area results are cached per (geohash cell, radius, type): the nearby search is
+# made from the cell centre, so every location in the cell shares one entry. Past
+# the soft TTL a cell is still served while one invocation refreshes it.
+AREA_CELL_PRECISION = 7  # ~150m x 150m cells, small next to a search radius
+AREA_CACHE_SOFT_TTL_SECONDS = int(os.environ.get('AREA_CACHE_SOFT_TTL_HOURS', 24)) * 3600
+AREA_CACHE_TTL_SECONDS = int(os.environ.get('AREA_CACHE_TTL_DAYS', 7)) * 24 * 3600
+AREA_REFRESH_LEASE_SECONDS = 300  # A stale cell is refreshed by one invocation at a time
+AREA_PLACE_FIELDS = ['place_id', 'name', 'vicinity', 'geometry', 'rating', 'user_ratings_total', 'price_level', 'types']
+AREA_PLACE_TYPE = 'restaurant'
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# District crawl mode (event "district"): a quadtree over the district's bounding box.
+# Each tile is searched with the circle around it; a tile returning the full 60
+# results may hold more, so it is split into four and its quarters searched too.
+DISTRICT_MAX_TILES = int(os.environ.get('DISTRICT_MAX_TILES', 200))  # Bounds API spend per crawl
+DISTRICT_MIN_TILE_RADIUS_METERS = 75  # Saturated tiles this small (a food court) are not split further
+DISTRICT_TILE_ATTEMPTS = 2  # A tile whose page walk fails is searched again once
+EARTH_RADIUS_METERS = 6371000
+
+# Refresh mode (event "refresh"): a Place Details probe for just the rating and
+# review count decides whether a stored restaurant needs its full details and reviews
+PLACES_PROBE_FIELDS = 'place_id,rating,user_ratings_total'
+REFRESH_MIN_AGE_HOURS = int(os.environ.get('REFRESH_MIN_AGE_HOURS', 24))  # Restaurants checked more recently are skipped
+REFRESH_MAX_RESTAURANTS = int(os.environ.get('REFRESH_MAX_RESTAURANTS', 1000))  # Per invocation
+REFRESH_MIN_TIME_MARGIN_MS = 30000  # Stop probing before the Lambda deadline by at least this much
+
+class RateLimiter:
+    """Token bucket shared by every thread of the container"""
+    
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class PlacesApiStats:
+    """Per-endpoint latency and retry counters for Places API calls, reset per invocation"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.endpoints = {}
+    
+    def record(self, endpoint: str, seconds: float, retried: bool = False, failed: bool = False):
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {'latencies': [], 'retries': 0, 'failures': 0})
+            stats['latencies'].append(seconds)
+            stats['retries'] += int(retried)
+            stats['failures'] += int(failed)
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            endpoints = {name: dict(stats, latencies=sorted(stats['latencies'])) for name, stats in self.endpoints.items()}
+        
+        snapshot = {}
+        for name, stats in endpoints.items():
+            latencies = stats['latencies']
+            snapshot[name] = {
+                'calls': len(latencies),
+                'retries': stats['retries'],
+                'failures': stats['failures'],
+                'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+                'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1)
+            }
+        return snapshot
+
+class PlacesCacheStats:
+    """Per-endpoint hit/miss counters for the Places response cache, reset per invocation"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        self.endpoints = {}
+    
+    def add(self, endpoint: str, name: str, count: int = 1):
+        with self.lock:
+            counts = self.endpoints.setdefault(
+                endpoint, {'memory_hits': 0, 'table_hits': 0, 'stale_hits': 0, 'misses': 0, 'expired': 0,
+                           'stored': 0, 'refreshes': 0}
+            )
+            counts[name] += count
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            endpoints = {name: dict(counts) for name, counts in self.endpoints.items()}
+        
+        for counts in endpoints.values():
+            lookups = counts['memory_hits'] + counts['table_hits'] + counts['misses']
+            hits = counts['memory_hits'] + counts['table_hits']
+            counts['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return endpoints
+
+def create_places_session() -> requests.Session:
+    """HTTP session whose keep-alive connections are reused across warm invocations"""
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PLACES_POOL_SIZE, max_retries=0)  # places_get retries
+    session.mount('https://', adapter)
+    return session
+
+places_session = create_places_session()
+places_api_stats = PlacesApiStats()
+places_rate_limiter = RateLimiter(PLACES_RATE_LIMIT_PER_SECOND, burst=max(1, int(PLACES_RATE_LIMIT_PER_SECOND)))
+places_cache_stats = PlacesCacheStats()
+places_cache_memory = OrderedDict()  # In-container tier in front of the PlacesCache table
+places_cache_lock = threading.Lock()
+
+def places_get(endpoint: str, params: Dict, url: Optional[str] = None) -> Dict:
+    """
+    GET a Places API endpoint (e.g. 'details') on the shared session
+    Every attempt waits for the container-wide rate limit. Connection errors,
+    timeouts, HTTP 5xx and OVER_QUERY_LIMIT are retried with jittered backoff;
+    the response of the last attempt is returned (or raised).
+    """
+    
+    url = url or f"{PLACES_API_BASE}/{endpoint}/json"
+    for attempt in range(PLACES_MAX_RETRIES + 1):
+        last_attempt = attempt == PLACES_MAX_RETRIES
+        places_rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = places_session.get(
+                url, params=params, timeout=(PLACES_CONNECT_TIMEOUT_SECONDS, PLACES_READ_TIMEOUT_SECONDS)
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.HTTPError) as e:
+            retryable = not isinstance(e, requests.exceptions.HTTPError) or e.response.status_code >= 500
+            places_api_stats.record(endpoint, time.perf_counter() - started,
+                                    retried=retryable and not last_attempt, failed=not retryable or last_attempt)
+            if not retryable or last_attempt:
+                raise
+            logger.warning(f"Places {endpoint} attempt {attempt + 1} failed, retrying: {e}")
+        else:
+            throttled = data.get('status') in PLACES_RETRY_STATUSES
+            retry = throttled and not last_attempt
+            places_api_stats.record(endpoint, time.perf_counter() - started, retried=retry, failed=throttled and last_attempt)
+            if not retry:
+                return data
+            logger.warning(f"Places {endpoint} returned {data['status']}, retrying")
+        
+        delay = min(PLACES_BACKOFF_MAX_SECONDS, PLACES_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+
+def places_cache_key(endpoint: str, params: Dict) -> str:
+    """Endpoint plus a hash of the request parameters (query or place_id, fields), without the API key"""
+    
+    request = json.dumps({name: value for name, value in params.items() if name != 'key'}, sort_keys=True)
+    return f"{endpoint}#{hashlib.sha256(request.encode('utf-8')).hexdigest()}"
+
+def remember_places_response(cache_key: str, body: str, expires_at: int, soft_expires_at: Optional[int] = None):
+    """Keep a response (as JSON text, so callers get their own copy) in the bounded in-container tier"""
+    
+    with places_cache_lock:
+        places_cache_memory[cache_key] = {'body': body, 'expiresAt': expires_at, 'softExpiresAt': soft_expires_at}
+        places_cache_memory.move_to_end(cache_key)
+        while len(places_cache_memory) > PLACES_CACHE_MEMORY_ENTRIES:
+            places_cache_memory.popitem(last=False)
+
+def get_cached_places_response(endpoint: str, cache_key: str) -> Tuple[Optional[Dict], bool]:
+    """
+    Look up an unexpired response, memory first, then the PlacesCache table
+    Returns the response (None on a miss) and whether it is past its soft TTL.
+    A stale memory entry is checked against the table, which may hold a refresh.
+    """
+    
+    now = time.time()
+    stale_body = None
+    with places_cache_lock:
+        entry = places_cache_memory.get(cache_key)
+        if entry and entry['expiresAt'] > now:
+            places_cache_memory.move_to_end(cache_key)
+            if (entry['softExpiresAt'] or entry['expiresAt']) > now:
+                places_cache_stats.add(endpoint, 'memory_hits')
+                return json.loads(entry['body']), False
+            stale_body = entry['body']
+    
+    try:
+        entry = places_cache_table.get_item(Key={'cacheKey': cache_key}).get('Item')
+    except Exception as e:
+        logger.error(f"Error reading Places cache: {e}")
+        entry = None
+    if entry and entry['expiresAt'] > now:
+        body = zlib.decompress(entry['response'].value).decode('utf-8')
+        soft_expires_at = int(entry['softExpiresAt']) if 'softExpiresAt' in entry else None
+        remember_places_response(cache_key, body, int(entry['expiresAt']), soft_expires_at)
+        stale = soft_expires_at is not None and soft_expires_at <= now
+        places_cache_stats.add(endpoint, 'table_hits')
+        if stale:
+            places_cache_stats.add(endpoint, 'stale_hits')
+        return json.loads(body), stale
+    if stale_body is not None:
+        places_cache_stats.add(endpoint, 'memory_hits')
+        places_cache_stats.add(endpoint, 'stale_hits')
+        return json.loads(stale_body), True
+    
+    if entry:
+        # DynamoDB deletes expired items lazily
+        places_cache_stats.add(endpoint, 'expired')
+    places_cache_stats.add(endpoint, 'misses')
+    return None, False
+
+def store_places_response(endpoint: str, cache_key: str, data: Dict, ttl_seconds: int,
+                          soft_ttl_seconds: Optional[int] = None):
+    """Write a response to both tiers; failures only cost a future cache miss"""
+    
+    body = json.dumps(data, separators=(',', ':'))
+    now = time.time()
+    expires_at = int(now + ttl_seconds)
+    soft_expires_at = int(now + soft_ttl_seconds) if soft_ttl_seconds else None
+    remember_places_response(cache_key, body, expires_at, soft_expires_at)
+    
+    item = {
+        'cacheKey': cache_key,
+        'response': zlib.compress(body.encode('utf-8')),  # Details with reviews run to several KB
+        'cachedAt': datetime.now().isoformat(),
+        'expiresAt': expires_at  # DynamoDB TTL attribute
+    }
+    if soft_expires_at:
+        item['softExpiresAt'] = soft_expires_at
+    try:
+        places_cache_table.put_item(Item=item)
+        places_cache_stats.add(endpoint, 'stored')
+    except Exception as e:
+        logger.error(f"Error writing Places cache: {e}")
+
+def cached_places_get(endpoint: str, params: Dict, url: Optional[str] = None, refresh: bool = False) -> Dict:
+    """
+    places_get through the two-level response cache
+    Only successful responses (OK, ZERO_RESULTS) are cached, for the endpoint's TTL.
+    With refresh, the cached response is skipped and replaced.
+    """
+    
+    ttl_seconds = PLACES_CACHE_TTL_SECONDS.get(endpoint, 0)
+    if ttl_seconds <= 0:
+        return places_get(endpoint, params, url)
+    
+    cache_key = places_cache_key(endpoint, params)
+    if not refresh:
+        data, _ = get_cached_places_response(endpoint, cache_key)
+        if data is not None:
+            return data
+    
+    data = places_get(endpoint, params, url)
+    if data.get('status') in PLACES_CACHEABLE_STATUSES:
+        store_places_response(endpoint, cache_key, data, ttl_seconds)
+    return data
 
 def search_restaurant(restaurant_name: str, location: str = "Kuala Lumpur, Malaysia") -> Optional[Dict]:
     """
@@ -34,7 +368,6 @@ def search_restaurant(restaurant_name: str, location: str = "Kuala Lumpur, Malay
         return None
     
     # Text search for restaurant
-    search_url = f"{PLACES_API_BASE}/textsearch/json"
     params = {
         'query': f"{restaurant_name} {location}",
         'key': GOOGLE_API_KEY,
@@ -42,9 +375,7 @@ def search_restaurant(restaurant_name: str, location: str = "Kuala Lumpur, Malay
     }
     
     try:
-        response = requests.get(search_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = cached_places_get('textsearch', params)
         
         if data['status'] == 'OK' and data['results']:
             return data['results'][0]  # Return first result
@@ -56,11 +387,11 @@ def search_restaurant(restaurant_name: str, location: str = "Kuala Lumpur, Malay
         logger.error(f"Error searching restaurant: {e}")
         return None
 
-def get_restaurant_details(place_id: str) -> Optional[Dict]:
+def get_restaurant_details(place_id: str, refresh: bool = False) -> Optional[Dict]:
     """
     Get detailed information about restaurant including reviews
+    With refresh, a cached response is not used.
     """
-    details_url = f"{PLACES_API_BASE}/details/json"
     params = {
         'place_id': place_id,
         'key': GOOGLE_API_KEY,
@@ -68,9 +399,7 @@ def get_restaurant_details(place_id: str) -> Optional[Dict]:
     }
     
     try:
-        response = requests.get(details_url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = cached_places_get('details', params, refresh=refresh)
         
         if data['status'] == 'OK':
             return data['result']
@@ -82,11 +411,130 @@ def get_restaurant_details(place_id: str) -> Optional[Dict]:
         logger.error(f"Error getting restaurant details: {e}")
         return None
 
+def get_place_summary(place_id: str) -> Optional[Dict]:
+    """
+    Rating and review count of a place, without the reviews
+    A probe for change detection, so it always goes to the API.
+    """
+    params = {
+        'place_id': place_id,
+        'key': GOOGLE_API_KEY,
+        'fields': PLACES_PROBE_FIELDS
+    }
+    
+    try:
+        data = places_get('details_probe', params, url=f"{PLACES_API_BASE}/details/json")
+        
+        if data['status'] == 'OK':
+            return data['result']
+        else:
+            logger.error(f"Error probing place {place_id}: {data.get('status')}")
+            return None
+            
+    except Exception as e:
+        logger.error(f"Error probing place {place_id}: {e}")
+        return None
+
+def dynamo_item(item: Dict) -> Dict:
+    """Copy of an item with floats as Decimals, the way DynamoDB stores (and returns) them"""
+    return json.loads(json.dumps(item), parse_float=Decimal)
+
+def batch_get_items(table_name: str, keys: List[Dict], attributes: Optional[List[str]] = None) -> List[Dict]:
+    """Fetch items in chunks of 100, retrying UnprocessedKeys with jittered backoff"""
+    
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table_name: {'Keys': keys[start:start + BATCH_GET_SIZE]}}
+        if attributes:
+            # Placeholders for every name, since e.g. 'language' is a reserved word
+            request[table_name]['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(attributes)))
+            request[table_name]['ExpressionAttributeNames'] = {f'#p{i}': name for i, name in enumerate(attributes)}
+        
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+        else:
+            logger.error(f"Gave up on {len(request[table_name]['Keys'])} unprocessed {table_name} keys")
+    
+    return items
+
+def write_batch(table_name: str, items: List[Dict], key_names: List[str]) -> Set[Tuple]:
+    """Put up to 25 items with one BatchWriteItem, retrying UnprocessedItems; returns the keys not written"""
+    
+    remaining = items
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        response = dynamodb.batch_write_item(
+            RequestItems={table_name: [{'PutRequest': {'Item': item}} for item in remaining]}
+        )
+        unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not unprocessed:
+            return set()
+        remaining = [request['PutRequest']['Item'] for request in unprocessed]
+        delay = min(THROTTLE_BACKOFF_MAX_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        time.sleep(random.uniform(0, delay))
+    
+    logger.error(f"Gave up on {len(remaining)} unprocessed {table_name} items")
+    return {tuple(item[name] for name in key_names) for item in remaining}
+
+def batch_write_items(table_name: str, items: List[Dict], key_names: List[str]) -> List[bool]:
+    """Put items in batches of 25 written concurrently; returns whether each item was written"""
+    
+    batches = [items[start:start + BATCH_WRITE_SIZE] for start in range(0, len(items), BATCH_WRITE_SIZE)]
+    failed = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(STORE_CONCURRENCY, len(batches)))) as executor:
+        futures = {executor.submit(write_batch, table_name, batch, key_names): batch for batch in batches}
+        for future, batch in futures.items():
+            try:
+                failed |= future.result()
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} items to {table_name}: {e}")
+                failed |= {tuple(item[name] for name in key_names) for item in batch}
+    
+    return [tuple(item[name] for name in key_names) not in failed for item in items]
+
+def upsert_restaurant(item: Dict) -> bool:
+    """
+    Create a restaurant or refresh its scraped attributes, keeping its review rollups
+    Returns False, without writing, when nothing scraped has changed.
+    """
+    
+    previous = restaurants_table.get_item(Key={'restaurantId': item['restaurantId']}).get('Item')
+    scraped = {
+        name: value for name, value in item.items()
+        if name not in RESTAURANT_CREATE_ONLY_ATTRIBUTES and name not in ('restaurantId', 'lastScraped')
+    }
+    if previous and all(previous.get(name) == value for name, value in scraped.items()):
+        return False
+    
+    attributes = {**scraped, 'lastScraped': item['lastScraped']}
+    names = {f'#a{i}': name for i, name in enumerate(attributes)}
+    values = {f':a{i}': value for i, value in enumerate(attributes.values())}
+    set_clauses = [f'#a{i} = :a{i}' for i in range(len(attributes))]
+    create_only = [name for name in item if name in RESTAURANT_CREATE_ONLY_ATTRIBUTES]
+    for i, name in enumerate(create_only):
+        names[f'#c{i}'] = name
+        values[f':c{i}'] = item[name]
+        set_clauses.append(f'#c{i} = if_not_exists(#c{i}, :c{i})')
+    
+    restaurants_table.update_item(
+        Key={'restaurantId': item['restaurantId']},
+        UpdateExpression='SET ' + ', '.join(set_clauses),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+    index_restaurant_for_search(search_index_table, item, previous.get('name') if previous else None)
+    return True
+
 def store_restaurant(restaurant_data: Dict) -> str:
     """
-    Store restaurant information in DynamoDB
+    Create or refresh restaurant information in DynamoDB
     """
-    restaurant_id = str(uuid.uuid4())
+    restaurant_id = restaurant_id_for(restaurant_data['place_id'])
     
     # Extract location info
     geometry = restaurant_data.get('geometry', {}).get('location', {})
@@ -104,52 +552,254 @@ def store_restaurant(restaurant_data: Dict) -> str:
         'googlePlaceId': restaurant_data.get('place_id', ''),
         'priceLevel': restaurant_data.get('price_level', 0),
         'lastScraped': datetime.now().isoformat(),
-        'createdAt': datetime.now().isoformat()
+        'createdAt': datetime.now().isoformat(),
+        'reviewCount': 0,
+        'fakeCount': 0,
+        'sentimentBreakdown': {}
     }
     
     try:
-        restaurants_table.put_item(Item=restaurant_item)
-        logger.info(f"Stored restaurant: {restaurant_item['name']}")
+        if upsert_restaurant(dynamo_item(restaurant_item)):
+            logger.info(f"Stored restaurant: {restaurant_item['name']}")
+        else:
+            logger.info(f"Restaurant unchanged: {restaurant_item['name']}")
         return restaurant_id
     except Exception as e:
         logger.error(f"Error storing restaurant: {e}")
         return None
 
-def store_reviews(restaurant_id: str, reviews_data: List[Dict]):
+def create_new_review(item: Dict) -> bool:
+    """Conditionally put a new review; False when it is already stored (by a concurrent scrape) or the put fails"""
+    
+    try:
+        reviews_table.put_item(Item=item, ConditionExpression='attribute_not_exists(reviewId)')
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            logger.error(f"Error storing review {item['reviewId']}: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error storing review {item['reviewId']}: {e}")
+        return False
+
+def create_reviews(items: List[Dict]) -> List[Dict]:
     """
-    Store reviews in DynamoDB
+    Write new reviews with concurrent conditional puts, then their similarity postings and author profiles
+    Returns the items this call created; a review a concurrent scrape stored first
+    is left to that scrape, so the rollup counts each review once.
     """
-    stored_count = 0
     
-    for review in reviews_data:
+    signatures = {}
+    for item in items:
+        signature = minhash_signature(item['reviewText'])
+        if signature:
+            item['minhashSignature'] = pack_signature(signature)
+            signatures[item['reviewId']] = signature
+    
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        created = [item for item, ok in zip(items, executor.map(create_new_review, items)) if ok]
+    if len(created) < len(items):
+        logger.info(f"{len(items) - len(created)} new reviews not created (stored concurrently or failed)")
+    
+    postings = [
+        {'bucket': bucket, 'reviewId': item['reviewId'], 'restaurantId': item['restaurantId']}
+        for item in created if item['reviewId'] in signatures
+        for bucket in lsh_buckets(signatures[item['reviewId']])
+    ]
+    indexed = batch_write_items(similarity_index_table.name, postings, ['bucket', 'reviewId'])
+    if not all(indexed):
+        logger.error(f"Failed to write {indexed.count(False)} similarity postings")
+    
+    def fold_into_profile(item: Dict):
         try:
-            review_id = str(uuid.uuid4())
-            
-            review_item = {
-                'reviewId': review_id,
-                'restaurantId': restaurant_id,
-                'authorName': review.get('author_name', 'Anonymous'),
-                'reviewText': review.get('text', ''),
-                'rating': review.get('rating', 0),
-                'reviewDate': datetime.fromtimestamp(review.get('time', 0)).isoformat(),
-                'scrapedAt': datetime.now().isoformat(),
-                'language': review.get('language', 'en'),
-                'isFake': 'pending',  # Will be analyzed by AI
-                'confidence': 0.0,
-                'sentiment': 'NEUTRAL',
-                'sourceUrl': f"https://maps.google.com/maps/place/?q=place_id:{review.get('author_url', '')}",
-                'googleReviewId': review.get('author_url', '').split('/')[-1] if review.get('author_url') else ''
-            }
-            
-            reviews_table.put_item(Item=review_item)
-            stored_count += 1
-            
+            update_author_profile(item)
+        except Exception as e:
+            logger.error(f"Error updating author profile {item['authorKey']}: {e}")
+    
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        list(executor.map(fold_into_profile, [item for item in created if 'authorKey' in item]))
+    return created
+
+def update_review_content(item: Dict, previous: Dict) -> bool:
+    """
+    Store the edited text and rating of a known review and queue it for analysis again
+    Conditional on the stored content, so an edit is applied once across concurrent scrapes.
+    """
+    
+    signature = minhash_signature(item['reviewText'])
+    values = {
+        ':text': item['reviewText'],
+        ':rating': item['rating'],
+        ':lang': item['language'],
+        ':scraped': item['scrapedAt'],
+        ':pending': 'pending',
+        ':restaurant': item['restaurantId'],
+        ':confidence': item['confidence'],
+        ':sentiment': item['sentiment'],
+        ':old_text': previous['reviewText'],
+        ':old_rating': previous['rating']
+    }
+    set_clauses = [
+        'reviewText = :text', 'rating = :rating', '#lang = :lang', 'scrapedAt = :scraped', 'isFake = :pending',
+        'pendingRestaurantId = :restaurant', 'confidence = :confidence', 'sentiment = :sentiment'
+    ]
+    remove_clauses = ['comprehendAnalysis', 'analyzedAt']
+    if signature:
+        values[':signature'] = pack_signature(signature)
+        set_clauses.append('minhashSignature = :signature')
+    else:
+        remove_clauses.append('minhashSignature')
+    
+    try:
+        reviews_table.update_item(
+            Key={'reviewId': item['reviewId']},
+            UpdateExpression=f"SET {', '.join(set_clauses)} REMOVE {', '.join(remove_clauses)}",
+            ConditionExpression='reviewText = :old_text AND rating = :old_rating',
+            ExpressionAttributeNames={'#lang': 'language'},  # 'language' is a reserved word
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False  # Applied by a concurrent scrape
+        raise
+    
+    if signature:
+        try:
+            index_review_for_similarity(similarity_index_table, item['reviewId'], item['restaurantId'], signature)
+        except Exception as e:
+            logger.error(f"Error indexing review {item['reviewId']} for similarity: {e}")
+    if 'authorKey' in item:
+        try:
+            update_author_profile(item, previous_rating=previous['rating'])
+        except Exception as e:
+            logger.error(f"Error updating author profile {item['authorKey']}: {e}")
+    return True
+
+def upsert_reviews(items: List[Dict]) -> List[str]:
+    """
+    Store new reviews and edits of known ones, skipping unchanged reviews without a write
+    Items carry their deterministic reviewId; returns the IDs written, which are
+    pending analysis. The restaurant's review rollup is updated to match.
+    """
+    
+    items = list({item['reviewId']: item for item in items}.values())
+    existing = {
+        previous['reviewId']: previous
+        for previous in batch_get_items(reviews_table.name, [{'reviewId': item['reviewId']} for item in items],
+                                        REVIEW_UPSERT_ATTRIBUTES)
+    }
+    
+    new_items = [item for item in items if item['reviewId'] not in existing]
+    edits = [
+        (item, existing[item['reviewId']]) for item in items
+        if item['reviewId'] in existing
+        and any(existing[item['reviewId']].get(name) != item[name] for name in REVIEW_CONTENT_ATTRIBUTES)
+    ]
+    
+    def apply_edit(edit: Tuple[Dict, Dict]) -> bool:
+        try:
+            return update_review_content(*edit)
+        except Exception as e:
+            logger.error(f"Error storing review {edit[0]['reviewId']}: {e}")
+            return False
+    
+    created = create_reviews(new_items) if new_items else []
+    with ThreadPoolExecutor(max_workers=STORE_CONCURRENCY) as executor:
+        edited = [item for (item, _), ok in zip(edits, executor.map(apply_edit, edits)) if ok]
+    
+    review_delta = len(created)
+    fake_delta = 0
+    sentiment_deltas = {}
+    for item in created + edited:
+        sentiment_deltas[item['sentiment']] = sentiment_deltas.get(item['sentiment'], 0) + 1
+    for item in edited:
+        # The review leaves its analyzed buckets until it is analyzed again
+        previous = existing[item['reviewId']]
+        fake_delta -= int(previous.get('isFake') == 'true')
+        old_sentiment = previous.get('sentiment', item['sentiment'])
+        sentiment_deltas[old_sentiment] = sentiment_deltas.get(old_sentiment, 0) - 1
+    written = [item['reviewId'] for item in created + edited]
+    
+    logger.info(f"Stored {review_delta} new and {len(written) - review_delta} edited reviews, "
+                f"{len(items) - len(written)} unchanged")
+    
+    if written:
+        restaurant_id = items[0]['restaurantId']
+        try:
+            update_restaurant_review_stats(restaurants_table, restaurant_id, review_delta=review_delta,
+                                           fake_delta=fake_delta, sentiment_deltas=sentiment_deltas)
         except Exception as e:
-            logger.error(f"Error storing review: {e}")
-            continue
+            logger.error(f"Error updating review stats for restaurant {restaurant_id}: {e}")
+    return written
+
+def store_reviews(restaurant_id: str, reviews_data: List[Dict]) -> List[str]:
+    """
+    Store reviews in DynamoDB
+    Returns the IDs of new and edited reviews; unchanged ones are skipped.
+    """
+    items = []
+    
+    for review in reviews_data:
+        review_item = dynamo_item({
+            'restaurantId': restaurant_id,
+            'authorName': review.get('author_name', 'Anonymous'),
+            'reviewText': review.get('text', ''),
+            'rating': review.get('rating', 0),
+            'reviewDate': datetime.fromtimestamp(review.get('time', 0)).isoformat(),
+            'scrapedAt': datetime.now().isoformat(),
+            'language': review.get('language', 'en'),
+            'isFake': 'pending',  # Will be analyzed by AI
+            'pendingRestaurantId': restaurant_id,  # Sparse PendingReviewsIndex key, removed once analyzed
+            'confidence': 0.0,
+            'sentiment': UNKNOWN_SENTIMENT,  # Until the analyzer classifies it
+            'sourceUrl': f"https://maps.google.com/maps/place/?q=place_id:{review.get('author_url', '')}",
+            'googleReviewId': contributor_id(review.get('author_url', ''))
+        })
+        if author_key(review_item):
+            review_item['authorKey'] = author_key(review_item)
+        review_item['reviewId'] = review_id_for(review_item)
+        items.append(review_item)
+    
+    return upsert_reviews(items)
+
+def update_author_profile(review_item: Dict, previous_rating: Optional[int] = None):
+    """
+    Fold a newly stored review into its author's profile and hourly window
+    For an edited review (previous_rating given) only the rating change is applied.
+    """
     
-    logger.info(f"Stored {stored_count} reviews")
-    return stored_count
+    rating = int(review_item.get('rating') or 0)
+    new_review = previous_rating is None
+    old_rating = 0 if new_review else int(previous_rating or 0)
+    deltas = {
+        'reviewCount': 1 if new_review else 0,
+        'ratedCount': int(rating > 0) - int(old_rating > 0),
+        'ratingSum': rating - old_rating,
+        'ratingSquareSum': rating * rating - old_rating * old_rating,
+        'fiveStarCount': int(rating == 5) - int(old_rating == 5)
+    }
+    if not any(deltas.values()):
+        return
+    
+    values = {f':{name}': delta for name, delta in deltas.items()}
+    update_expression = 'ADD ' + ', '.join(f'{name} :{name}' for name in deltas)
+    if new_review:
+        values[':restaurant'] = {review_item['restaurantId']}
+        update_expression += ', restaurantIds :restaurant'
+    author_profiles_table.update_item(
+        Key={'authorKey': review_item['authorKey'], 'profileKey': 'profile'},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=values
+    )
+    author_profiles_table.update_item(
+        Key={'authorKey': review_item['authorKey'], 'profileKey': f"hour#{review_item['reviewDate'][:13]}"},
+        UpdateExpression='ADD reviewCount :reviewCount, fiveStarCount :fiveStarCount SET expiresAt = :expires',
+        ExpressionAttributeValues={
+            ':reviewCount': deltas['reviewCount'],
+            ':fiveStarCount': deltas['fiveStarCount'],
+            ':expires': int(time.time()) + AUTHOR_WINDOW_TTL_SECONDS
+        }
+    )
 
 def extract_city_from_address(address: str) -> str:
     """
@@ -204,9 +854,385 @@ def extract_cuisine_type(types: List[str]) -> str:
     
     return 'Restaurant'
 
+def normalize_area(area: str) -> str:
+    """Lower-cased area name without punctuation, so spelling variants share a geocode cache entry"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', area.lower()).split())
+
+def geocode_geometry(area: str) -> Optional[Dict]:
+    """Geocoded geometry of an area name: location and viewport"""
+    
+    try:
+        params = {'address': normalize_area(area), 'key': GOOGLE_API_KEY}
+        data = cached_places_get('geocode', params, url=GEOCODE_API_URL)
+        if data['status'] == 'OK' and data['results']:
+            return data['results'][0]['geometry']
+        logger.warning(f"Could not geocode {area}: {data.get('status')}")
+    except Exception as e:
+        logger.error(f"Error geocoding {area}: {e}")
+    return None
+
+def geocode_area(area: str) -> Optional[Dict]:
+    """Coordinates ({'lat', 'lng'}) of an area name"""
+    
+    geometry = geocode_geometry(area)
+    return geometry['location'] if geometry else None
+
+def nearby_search_pages(location: Dict, radius: int, place_type: str = AREA_PLACE_TYPE):
+    """
+    Yield (places, last) for each nearby search page, following next_page_token
+    An error ends the walk without a page flagged last.
+    """
+    
+    params = {
+        'location': f"{location['lat']},{location['lng']}",
+        'radius': radius,
+        'type': place_type,
+        'key': GOOGLE_API_KEY
+    }
+    
+    while True:
+        try:
+            data = places_get('nearbysearch', params)
+            # Until the token is valid the API answers INVALID_REQUEST
+            for _ in range(NEXT_PAGE_TOKEN_ATTEMPTS - 1):
+                if 'pagetoken' not in params or data['status'] != 'INVALID_REQUEST':
+                    break
+                time.sleep(NEXT_PAGE_TOKEN_DELAY_SECONDS / 2)
+                data = places_get('nearbysearch', params)
+        except Exception as e:
+            logger.error(f"Error in nearby search: {e}")
+            return
+        
+        if data['status'] not in ('OK', 'ZERO_RESULTS'):
+            logger.error(f"Nearby search failed: {data['status']}")
+            return
+        last = not data.get('next_page_token')
+        yield data.get('results', []), last
+        
+        if last:
+            return
+        params = {'pagetoken': data['next_page_token'], 'key': GOOGLE_API_KEY}
+        time.sleep(NEXT_PAGE_TOKEN_DELAY_SECONDS)
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    """Geohash of a point: interleaved longitude/latitude bisections, 5 bits per character"""
+    
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    cell = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(cell) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            cell.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(cell)
+
+def geohash_center(cell: str) -> Dict:
+    """Centre ({'lat', 'lng'}) of a geohash cell"""
+    
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lng_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if bits >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return {'lat': round(sum(lat_range) / 2, 7), 'lng': round(sum(lng_range) / 2, 7)}
+
+def area_cache_key(cell: str, radius: int, place_type: str = AREA_PLACE_TYPE) -> str:
+    return f"nearbysearch#{cell}#{radius}#{place_type}"
+
+def area_place_summary(place: Dict) -> Dict:
+    """The nearby search fields kept for a place in the area cache"""
+    return {name: place[name] for name in AREA_PLACE_FIELDS if name in place}
+
+def fetch_area_cell(cell: str, radius: int):
+    """
+    Yield the nearby search pages around a cell's centre, caching the cell once the walk completes
+    Only place summaries are kept; a walk that fails or is cut short is not cached.
+    """
+    
+    places = []
+    for page, last in nearby_search_pages(geohash_center(cell), radius):
+        places.extend(area_place_summary(place) for place in page)
+        if last:
+            store_places_response('nearbysearch', area_cache_key(cell, radius), {'results': places},
+                                  AREA_CACHE_TTL_SECONDS, AREA_CACHE_SOFT_TTL_SECONDS)
+        yield page
+
+def area_place_pages(location: Dict, radius: int, context=None):
+    """
+    Yield pages of restaurants around a location, from its cell's cache entry when there is one
+    A cell past its soft TTL is served as is and refreshed in the background.
+    """
+    
+    cell = geohash_encode(location['lat'], location['lng'], AREA_CELL_PRECISION)
+    cached, stale = get_cached_places_response('nearbysearch', area_cache_key(cell, radius))
+    if cached is not None:
+        if stale:
+            request_area_refresh(cell, radius, context)
+        yield cached['results']
+        return
+    
+    yield from fetch_area_cell(cell, radius)
+
+def request_area_refresh(cell: str, radius: int, context=None):
+    """
+    Refresh a stale cell in the background, unless another invocation already is
+    Deployed, the refresh is an async invocation of this function; run locally,
+    a background thread.
+    """
+    
+    now = int(time.time())
+    try:
+        places_cache_table.update_item(
+            Key={'cacheKey': area_cache_key(cell, radius)},
+            UpdateExpression='SET refreshingUntil = :until',
+            ConditionExpression='attribute_exists(cacheKey) AND '
+                                '(attribute_not_exists(refreshingUntil) OR refreshingUntil < :now)',
+            ExpressionAttributeValues={':until': now + AREA_REFRESH_LEASE_SECONDS, ':now': now}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            logger.error(f"Error leasing refresh of area cell {cell}: {e}")
+        return
+    
+    places_cache_stats.add('nearbysearch', 'refreshes')
+    logger.info(f"Refreshing stale area cell {cell} ({radius}m)")
+    if context is not None:
+        lambda_client.invoke(
+            FunctionName=context.function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'area_refresh': {'cell': cell, 'radius': radius}})
+        )
+    else:
+        threading.Thread(target=refresh_area_cell, args=(cell, radius), daemon=True).start()
+
+def refresh_area_cell(cell: str, radius: int) -> int:
+    """Walk a cell's nearby search pages again, replacing its cache entry; returns the places found"""
+    
+    return sum(len(page) for page in fetch_area_cell(cell, radius))
+
+def distance_meters(a: Dict, b: Dict) -> float:
+    """Great-circle distance between two {'lat', 'lng'} points"""
+    
+    lat1, lat2 = math.radians(a['lat']), math.radians(b['lat'])
+    dlat = lat2 - lat1
+    dlng = math.radians(b['lng'] - a['lng'])
+    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+def tile_circle(tile: Dict) -> Tuple[Dict, int]:
+    """Centre and radius of the smallest circle covering a tile ({'south', 'west', 'north', 'east'})"""
+    
+    center = {'lat': (tile['south'] + tile['north']) / 2, 'lng': (tile['west'] + tile['east']) / 2}
+    radius = distance_meters(center, {'lat': tile['north'], 'lng': tile['east']})
+    return center, max(1, math.ceil(radius))
+
+def split_tile(tile: Dict) -> List[Dict]:
+    """The four quarters of a tile"""
+    
+    middle_lat = (tile['south'] + tile['north']) / 2
+    middle_lng = (tile['west'] + tile['east']) / 2
+    return [
+        {'south': south, 'west': west, 'north': north, 'east': east}
+        for south, north in ((tile['south'], middle_lat), (middle_lat, tile['north']))
+        for west, east in ((tile['west'], middle_lng), (middle_lng, tile['east']))
+    ]
+
+def search_tile(tile: Dict) -> List[Dict]:
+    """
+    Every nearby search result (at most 60) in the circle covering a tile
+    Raises if the page walk failed before its last page, so a partial result
+    is not mistaken for a complete, unsaturated tile.
+    """
+    
+    center, radius = tile_circle(tile)
+    found = []
+    for page, last in nearby_search_pages(center, radius):
+        found.extend(area_place_summary(place) for place in page)
+        if last:
+            return found
+    raise RuntimeError(f"Nearby search failed after {len(found)} results")
+
+def enumerate_district(bounds: Dict, max_tiles: int) -> Tuple[List[Dict], Dict]:
+    """
+    Find the restaurants in a bounding box by searching a quadtree of tiles
+    Tiles run concurrently (under the Places rate limit); a saturated tile's
+    quarters are queued as soon as it returns. Places found by overlapping
+    circles are kept once. A tile whose search fails is retried, then counted
+    in tilesFailed. Returns the places and tiling stats.
+    """
+    
+    places = {}
+    stats = {'tilesSearched': 0, 'tilesSplit': 0, 'tilesRetried': 0, 'tilesFailed': 0, 'maxDepth': 0,
+             'saturatedLeaves': 0, 'duplicateResults': 0}
+    tiles_queued = 1
+    
+    with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as executor:
+        pending = {executor.submit(search_tile, bounds): (bounds, 0, 1)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile, depth, attempt = pending.pop(future)
+                try:
+                    found = future.result()
+                except Exception as e:
+                    logger.error(f"Error searching tile {tile} (attempt {attempt}): {e}")
+                    if attempt < DISTRICT_TILE_ATTEMPTS:
+                        stats['tilesRetried'] += 1
+                        pending[executor.submit(search_tile, tile)] = (tile, depth, attempt + 1)
+                    else:
+                        stats['tilesFailed'] += 1
+                    continue
+                
+                stats['tilesSearched'] += 1
+                stats['maxDepth'] = max(stats['maxDepth'], depth)
+                for place in found:
+                    if place['place_id'] in places:
+                        stats['duplicateResults'] += 1
+                    else:
+                        places[place['place_id']] = place
+                
+                if len(found) < CRAWL_MAX_PLACES:
+                    continue
+                if tile_circle(tile)[1] <= DISTRICT_MIN_TILE_RADIUS_METERS or tiles_queued + 4 > max_tiles:
+                    stats['saturatedLeaves'] += 1
+                    continue
+                stats['tilesSplit'] += 1
+                for child in split_tile(tile):
+                    pending[executor.submit(search_tile, child)] = (child, depth + 1, 1)
+                    tiles_queued += 1
+    
+    return list(places.values()), stats
+
+def crawl_place(place_id: str, include_reviews: bool, refresh: bool = False) -> Optional[Dict]:
+    """Fetch one place's details and store it with its reviews"""
+    
+    details = get_restaurant_details(place_id, refresh)
+    if not details:
+        return None
+    
+    restaurant_id = store_restaurant(details)
+    if not restaurant_id:
+        return None
+    
+    reviews_count = 0
+    if include_reviews and 'reviews' in details:
+        reviews_count = len(store_reviews(restaurant_id, details['reviews']))
+    return {'restaurantId': restaurant_id, 'restaurantName': details.get('name'), 'scrapedReviews': reviews_count}
+
+def restaurants_due_for_refresh(limit: int, min_age_hours: int) -> List[Dict]:
+    """Stored Google restaurants not checked (or scraped) within min_age_hours, up to limit"""
+    
+    cutoff = (datetime.now() - timedelta(hours=min_age_hours)).isoformat()
+    scan_kwargs = {
+        'ProjectionExpression': 'restaurantId, googlePlaceId, avgRating, totalReviews, lastScraped, lastChecked',
+        'FilterExpression': Attr('googlePlaceId').exists() & Attr('googlePlaceId').ne('') & (
+            (Attr('lastChecked').not_exists() & Attr('lastScraped').lt(cutoff)) | Attr('lastChecked').lt(cutoff)
+        )
+    }
+    
+    restaurants = []
+    while len(restaurants) < limit:
+        response = restaurants_table.scan(**scan_kwargs)
+        restaurants.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return restaurants[:limit]
+
+def refresh_restaurant(restaurant: Dict, include_reviews: bool) -> Dict:
+    """
+    Probe a stored restaurant and re-scrape it only if its rating or review count changed
+    Returns the outcome ('unchanged', 'changed' or 'failed') and the reviews stored.
+    """
+    
+    probe = get_place_summary(restaurant['googlePlaceId'])
+    if probe is None:
+        return {'outcome': 'failed', 'scrapedReviews': 0}
+    
+    observed = dynamo_item({'avgRating': probe.get('rating', 0), 'totalReviews': probe.get('user_ratings_total', 0)})
+    changed = any(restaurant.get(name) != value for name, value in observed.items())
+    scraped_reviews = 0
+    if changed:
+        crawled = crawl_place(restaurant['googlePlaceId'], include_reviews, refresh=True)
+        if not crawled:
+            return {'outcome': 'failed', 'scrapedReviews': 0}
+        scraped_reviews = crawled['scrapedReviews']
+    
+    try:
+        restaurants_table.update_item(
+            Key={'restaurantId': restaurant['restaurantId']},
+            UpdateExpression='SET lastChecked = :now',
+            ExpressionAttributeValues={':now': datetime.now().isoformat()}
+        )
+    except Exception as e:
+        logger.error(f"Error recording check of restaurant {restaurant['restaurantId']}: {e}")
+    return {'outcome': 'changed' if changed else 'unchanged', 'scrapedReviews': scraped_reviews}
+
 def lambda_handler(event, context):
     """
-    Lambda handler for Google Places API scraping
+    Lambda entry point
+    When invoked for an API job (event carries "job_id"), progress and the
+    result are recorded on the job's AnalysisResults item
+    """
+    
+    job_id = event.get('job_id')
+    if job_id:
+        update_job_status(job_id, 'running')
+    
+    result = run_scrape(event, context)
+    
+    if job_id:
+        body = json.loads(result['body'], parse_float=Decimal)
+        if result['statusCode'] == 200:
+            update_job_status(job_id, 'completed', {'result': body})
+        else:
+            update_job_status(job_id, 'failed', {'error': body.get('error', 'Unknown error')})
+    
+    return result
+
+def update_job_status(job_id: str, status: str, fields: Optional[Dict] = None):
+    """Record job progress on its AnalysisResults item"""
+    
+    now = datetime.now().isoformat()
+    attributes = {'status': status, 'updatedAt': now, **(fields or {})}
+    if status in ('completed', 'failed'):
+        attributes['completedAt'] = now
+    
+    try:
+        analysis_table.update_item(
+            Key={'analysisId': job_id},
+            UpdateExpression='SET ' + ', '.join(f'#a{i} = :v{i}' for i in range(len(attributes))),
+            ExpressionAttributeNames={f'#a{i}': name for i, name in enumerate(attributes)},
+            ExpressionAttributeValues={f':v{i}': value for i, value in enumerate(attributes.values())}
+        )
+    except Exception as e:
+        logger.error(f"Error updating job {job_id}: {str(e)}")
+
+def run_scrape(event, context):
+    """
+    Run Google Places API scraping
     
     Expected event structure:
     {
@@ -214,8 +1240,41 @@ def lambda_handler(event, context):
         "location": "City, Malaysia",
         "include_reviews": true
     }
+    or, to crawl every restaurant around an area:
+    {
+        "area": "Bukit Bintang, Kuala Lumpur, Malaysia",
+        "radius": 1000,                        # Meters (default 1000)
+        "max_places": 60,                      # At most 60
+        "include_reviews": true,
+        "search_only": false                   # true: just list the restaurants, no details or storage
+    }
+    or, to enumerate a whole district past the 60-result cap:
+    {
+        "district": "Bukit Bintang, Kuala Lumpur, Malaysia",
+        "bounds": {"south": 3.14, "west": 101.70, "north": 3.16, "east": 101.72},  # Default: geocoded viewport
+        "max_tiles": 200,
+        "include_details": false,              # true: also fetch and store every restaurant found
+        "include_reviews": true
+    }
+    or, on a schedule, to refresh stored restaurants whose rating or review count changed:
+    {
+        "refresh": true,
+        "restaurant_ids": ["rest_..."],        # Default: those not checked within min_age_hours
+        "max_restaurants": 1000,
+        "min_age_hours": 24,
+        "include_reviews": true
+    }
     """
     
+    if event.get('area_refresh'):
+        return run_area_refresh(event)
+    if event.get('refresh'):
+        return run_refresh(event, context)
+    if event.get('district'):
+        return run_district_crawl(event, context)
+    if event.get('area'):
+        return run_area_search(event, context) if event.get('search_only') else run_area_crawl(event, context)
+    
     try:
         # Parse input
         restaurant_name = event.get('restaurant_name')
@@ -235,6 +1294,8 @@ def lambda_handler(event, context):
             }
         
         logger.info(f"Scraping data for: {restaurant_name} in {location}")
+        places_api_stats.reset()
+        places_cache_stats.reset()
         
         # Step 1: Search for restaurant
         restaurant_search = search_restaurant(restaurant_name, location)
@@ -265,7 +1326,7 @@ def lambda_handler(event, context):
         # Step 4: Store reviews if requested
         reviews_count = 0
         if include_reviews and 'reviews' in restaurant_details:
-            reviews_count = store_reviews(restaurant_id, restaurant_details['reviews'])
+            reviews_count = len(store_reviews(restaurant_id, restaurant_details['reviews']))
         
         # Success response
         result = {
@@ -275,7 +1336,9 @@ def lambda_handler(event, context):
             'rating': restaurant_details.get('rating'),
             'totalReviews': restaurant_details.get('user_ratings_total', 0),
             'scrapedReviews': reviews_count,
-            'googlePlaceId': place_id
+            'googlePlaceId': place_id,
+            'placesApi': places_api_stats.snapshot(),
+            'placesCache': places_cache_stats.snapshot()
         }
         
         return {
@@ -290,6 +1353,309 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
+def run_area_crawl(event, context):
+    """
+    Crawl the restaurants around an area
+    Nearby search pages (or the area's cached cell) are read in order while Place
+    Details calls for the places already found run concurrently, each place
+    stored as it arrives.
+    """
+    
+    try:
+        area = event['area']
+        radius = int(event.get('radius', CRAWL_DEFAULT_RADIUS_METERS))
+        max_places = min(int(event.get('max_places', CRAWL_MAX_PLACES)), CRAWL_MAX_PLACES)
+        include_reviews = event.get('include_reviews', True)
+        
+        if not GOOGLE_API_KEY:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': 'Google Places API key not configured'})
+            }
+        
+        logger.info(f"Crawling restaurants within {radius}m of {area}")
+        places_api_stats.reset()
+        places_cache_stats.reset()
+        started = time.time()
+        
+        location = geocode_area(area)
+        if not location:
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'error': f'Area "{area}" not found'})
+            }
+        
+        seen_place_ids = set()
+        futures = []
+        pages = 0
+        with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as executor:
+            for places in area_place_pages(location, radius, context):
+                pages += 1
+                for place in places:
+                    if len(seen_place_ids) >= max_places or place['place_id'] in seen_place_ids:
+                        continue
+                    seen_place_ids.add(place['place_id'])
+                    futures.append(executor.submit(crawl_place, place['place_id'], include_reviews))
+                if len(seen_place_ids) >= max_places:
+                    break
+            crawled = [future.result() for future in futures]
+        
+        stored = [place for place in crawled if place]
+        elapsed = time.time() - started
+        logger.info(f"Crawled {len(stored)}/{len(seen_place_ids)} places around {area} in {elapsed:.1f}s")
+        
+        result = {
+            'area': area,
+            'location': location,
+            'pagesFetched': pages,
+            'placesFound': len(seen_place_ids),
+            'placesStored': len(stored),
+            'failedPlaces': len(seen_place_ids) - len(stored),
+            'scrapedReviews': sum(place['scrapedReviews'] for place in stored),
+            'restaurants': stored,
+            'elapsedSeconds': round(elapsed, 2),
+            'placesApi': places_api_stats.snapshot(),
+            'placesCache': places_cache_stats.snapshot()
+        }
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+        
+    except Exception as e:
+        logger.error(f"Area crawl error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+def run_area_search(event, context):
+    """
+    List the restaurants around an area without fetching details or storing them
+    Served from the geocode and area cell caches when warm.
+    """
+    
+    try:
+        area = event['area']
+        radius = int(event.get('radius', CRAWL_DEFAULT_RADIUS_METERS))
+        
+        if not GOOGLE_API_KEY:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': 'Google Places API key not configured'})
+            }
+        
+        places_api_stats.reset()
+        places_cache_stats.reset()
+        started = time.time()
+        
+        location = geocode_area(area)
+        if not location:
+            return {
+                'statusCode': 404,
+                'body': json.dumps({'error': f'Area "{area}" not found'})
+            }
+        
+        restaurants = []
+        seen_place_ids = set()
+        for places in area_place_pages(location, radius, context):
+            for place in places:
+                if place['place_id'] not in seen_place_ids:
+                    seen_place_ids.add(place['place_id'])
+                    restaurants.append(area_place_summary(place))
+        
+        result = {
+            'area': area,
+            'location': location,
+            'cell': geohash_encode(location['lat'], location['lng'], AREA_CELL_PRECISION),
+            'placesFound': len(restaurants),
+            'restaurants': restaurants,
+            'elapsedSeconds': round(time.time() - started, 3),
+            'placesApi': places_api_stats.snapshot(),
+            'placesCache': places_cache_stats.snapshot()
+        }
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+        
+    except Exception as e:
+        logger.error(f"Area search error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+def run_area_refresh(event):
+    """Background refresh of a stale area cell (see request_area_refresh)"""
+    
+    cell = event['area_refresh']['cell']
+    radius = int(event['area_refresh']['radius'])
+    places_found = refresh_area_cell(cell, radius)
+    logger.info(f"Refreshed area cell {cell} ({radius}m): {places_found} places")
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'cell': cell, 'radius': radius, 'placesFound': places_found})
+    }
+
+def run_district_crawl(event, context):
+    """
+    Enumerate the restaurants of a district with a quadtree of nearby searches
+    Reports API calls per restaurant found; with include_details, every
+    restaurant found is then fetched and stored like an area crawl.
+    """
+    
+    try:
+        district = event['district']
+        max_tiles = min(int(event.get('max_tiles', DISTRICT_MAX_TILES)), DISTRICT_MAX_TILES)
+        include_details = event.get('include_details', False)
+        include_reviews = event.get('include_reviews', True)
+        
+        if not GOOGLE_API_KEY:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': 'Google Places API key not configured'})
+            }
+        
+        places_api_stats.reset()
+        places_cache_stats.reset()
+        started = time.time()
+        
+        bounds = event.get('bounds')
+        if not bounds:
+            geometry = geocode_geometry(district)
+            if not geometry or 'viewport' not in geometry:
+                return {
+                    'statusCode': 404,
+                    'body': json.dumps({'error': f'District "{district}" not found'})
+                }
+            viewport = geometry['viewport']
+            bounds = {
+                'south': viewport['southwest']['lat'], 'west': viewport['southwest']['lng'],
+                'north': viewport['northeast']['lat'], 'east': viewport['northeast']['lng']
+            }
+        bounds = {side: float(bounds[side]) for side in ('south', 'west', 'north', 'east')}
+        
+        logger.info(f"Enumerating restaurants of {district} within {bounds}, up to {max_tiles} tiles")
+        restaurants, tiling = enumerate_district(bounds, max_tiles)
+        search_calls = sum(stats['calls'] for endpoint, stats in places_api_stats.snapshot().items()
+                           if endpoint in ('geocode', 'nearbysearch'))
+        enumerated_seconds = time.time() - started
+        logger.info(f"Found {len(restaurants)} restaurants in {district} with {tiling['tilesSearched']} tiles "
+                    f"in {enumerated_seconds:.1f}s")
+        
+        stored = []
+        if include_details:
+            with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as executor:
+                crawled = list(executor.map(lambda place: crawl_place(place['place_id'], include_reviews), restaurants))
+            stored = [place for place in crawled if place]
+        
+        result = {
+            'district': district,
+            'bounds': bounds,
+            **tiling,
+            'placesFound': len(restaurants),
+            'searchApiCalls': search_calls,
+            'apiCallsPerPlace': round(search_calls / len(restaurants), 3) if restaurants else None,
+            'placesStored': len(stored),
+            'scrapedReviews': sum(place['scrapedReviews'] for place in stored),
+            'restaurants': stored if include_details else restaurants,
+            'enumerationSeconds': round(enumerated_seconds, 2),
+            'elapsedSeconds': round(time.time() - started, 2),
+            'placesApi': places_api_stats.snapshot(),
+            'placesCache': places_cache_stats.snapshot()
+        }
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+        
+    except Exception as e:
+        logger.error(f"District crawl error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+def run_refresh(event, context):
+    """
+    Incrementally refresh stored restaurants
+    Each is probed for its rating and review count; full Place Details (with
+    reviews) are fetched only for those that changed. Probing stops short of
+    the Lambda deadline, and the restaurants left are picked up by the next run.
+    """
+    
+    try:
+        max_restaurants = min(int(event.get('max_restaurants', REFRESH_MAX_RESTAURANTS)), REFRESH_MAX_RESTAURANTS)
+        min_age_hours = int(event.get('min_age_hours', REFRESH_MIN_AGE_HOURS))
+        include_reviews = event.get('include_reviews', True)
+        
+        if not GOOGLE_API_KEY:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': 'Google Places API key not configured'})
+            }
+        
+        places_api_stats.reset()
+        places_cache_stats.reset()
+        started = time.time()
+        
+        if event.get('restaurant_ids'):
+            restaurants = batch_get_items(
+                restaurants_table.name,
+                [{'restaurantId': restaurant_id} for restaurant_id in event['restaurant_ids'][:max_restaurants]],
+                ['restaurantId', 'googlePlaceId', 'avgRating', 'totalReviews']
+            )
+            restaurants = [restaurant for restaurant in restaurants if restaurant.get('googlePlaceId')]
+        else:
+            restaurants = restaurants_due_for_refresh(max_restaurants, min_age_hours)
+        logger.info(f"Refreshing {len(restaurants)} restaurants")
+        
+        def refresh(restaurant: Dict) -> Dict:
+            if context is not None and context.get_remaining_time_in_millis() < REFRESH_MIN_TIME_MARGIN_MS:
+                return {'outcome': 'skipped', 'scrapedReviews': 0}
+            return refresh_restaurant(restaurant, include_reviews)
+        
+        with ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY) as executor:
+            outcomes = list(executor.map(refresh, restaurants))
+        
+        counts = {outcome: 0 for outcome in ('unchanged', 'changed', 'failed', 'skipped')}
+        for outcome in outcomes:
+            counts[outcome['outcome']] += 1
+        api_stats = places_api_stats.snapshot()
+        probes = api_stats.get('details_probe', {}).get('calls', 0)
+        full_details = api_stats.get('details', {}).get('calls', 0)
+        elapsed = time.time() - started
+        logger.info(f"Refreshed {len(restaurants)} restaurants in {elapsed:.1f}s: {counts}")
+        
+        result = {
+            'restaurantsChecked': len(restaurants) - counts['skipped'],
+            **counts,
+            'scrapedReviews': sum(outcome['scrapedReviews'] for outcome in outcomes),
+            'probeCalls': probes,
+            'fullDetailsCalls': full_details,
+            'fullDetailsAvoided': counts['unchanged'],
+            'elapsedSeconds': round(elapsed, 2),
+            'placesApi': api_stats,
+            'placesCache': places_cache_stats.snapshot()
+        }
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+        
+    except Exception as e:
+        logger.error(f"Refresh error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
 # For local testing
 if __name__ == "__main__":
     # Test event
@@ -300,4 +1666,4 @@ if __name__ == "__main__":
     }
     
     result = lambda_handler(test_event, None)
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,211 @@
+"""
+Helpers shared by the TrustBites Lambdas
+Packaged next to lambda_function.py in every Lambda deployment zip
+"""
+
+import hashlib
+import re
+import struct
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError
+
+try:
+    import numpy as np
+except ImportError:  # Signatures fall back to pure Python; both paths give the same values
+    np = None
+
+# Sentiment of reviews Comprehend has not classified: pending, pre-scored or keyword fallback
+UNKNOWN_SENTIMENT = 'UNKNOWN'
+
+# MinHash/LSH near-duplicate index, written by the scrapers and read by the analyzer
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16  # 16 bands of 8 rows: pairs above ~0.8 Jaccard almost always share a bucket
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+MINHASH_PRIME = (1 << 31) - 1
+MINHASH_SHINGLE_SIZE = 5
+SIMILARITY_MIN_TEXT_LENGTH = 30  # Shorter texts ("Good food!") match by coincidence
+
+def stable_id(prefix: str, *parts: str) -> str:
+    """ID derived from what identifies an item, the same on every scrape"""
+    
+    digest = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+    return f"{prefix}_{digest[:20]}"
+
+def restaurant_id_for(place_id: str) -> str:
+    return stable_id('rest', place_id)
+
+def review_id_for(review_item: Dict) -> str:
+    """A review is identified by its place, its author and when it was posted"""
+    
+    author = author_key(review_item) or f"text#{review_item['reviewText']}"
+    return stable_id('rev', review_item['restaurantId'], author, review_item['reviewDate'])
+
+def contributor_id(author_url: str) -> str:
+    """Google contributor id from a review's author_url (.../maps/contrib/<id>/reviews)"""
+    
+    match = re.search(r'/contrib/(\d+)', author_url or '')
+    return match.group(1) if match else ''
+
+def author_key(review_item: Dict) -> Optional[str]:
+    """Stable key for a review's author: the Google contributor id when known, else the display name"""
+    
+    if review_item.get('googleReviewId'):
+        return f"google#{review_item['googleReviewId']}"
+    name = ' '.join((review_item.get('authorName') or '').lower().split())
+    if not name or name == 'anonymous':
+        return None
+    return f"name#{name}"
+
+def search_trigrams(text: str) -> Set[str]:
+    """Split text into word-padded trigrams for the restaurant search index"""
+    
+    normalized = re.sub(r'[\W_]+', ' ', (text or '').lower()).strip()
+    trigrams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            trigrams.add(padded[i:i + 3])
+    return trigrams
+
+def index_restaurant_for_search(search_index_table, restaurant: Dict, previous_name: Optional[str] = None):
+    """Write the search postings for a restaurant's name, dropping those only its previous name had"""
+    
+    trigrams = search_trigrams(restaurant.get('name', ''))
+    location_key = (restaurant.get('location') or '').lower()
+    stale_trigrams = search_trigrams(previous_name) - trigrams if previous_name else set()
+    
+    with search_index_table.batch_writer(overwrite_by_pkeys=['searchTerm', 'restaurantId']) as batch:
+        for trigram in stale_trigrams:
+            batch.delete_item(Key={'searchTerm': f"name#{trigram}", 'restaurantId': restaurant['restaurantId']})
+        for trigram in trigrams:
+            batch.put_item(Item={
+                'searchTerm': f"name#{trigram}",
+                'restaurantId': restaurant['restaurantId'],
+                'locationKey': location_key,
+                'tokenCount': len(trigrams)
+            })
+
+def update_restaurant_review_stats(restaurants_table, restaurant_id: str, review_delta: int = 0,
+                                   fake_delta: int = 0, sentiment_deltas: Optional[Dict[str, int]] = None):
+    """Apply incremental changes to the review rollup stored on a restaurant"""
+    
+    # Reviews without a Comprehend sentiment (pending, pre-scored) stay out of the breakdown
+    sentiment_deltas = {s: d for s, d in (sentiment_deltas or {}).items() if d and s != UNKNOWN_SENTIMENT}
+    if not (review_delta or fake_delta or sentiment_deltas):
+        return
+    
+    add_clauses = []
+    set_clauses = []
+    names = {}
+    values = {}
+    
+    if review_delta:
+        add_clauses.append('reviewCount :review_delta')
+        values[':review_delta'] = review_delta
+    if fake_delta:
+        add_clauses.append('fakeCount :fake_delta')
+        values[':fake_delta'] = fake_delta
+    for i, (sentiment, delta) in enumerate(sorted(sentiment_deltas.items())):
+        names[f'#s{i}'] = sentiment
+        values[f':s{i}'] = delta
+        set_clauses.append(f'sentimentBreakdown.#s{i} = if_not_exists(sentimentBreakdown.#s{i}, :zero) + :s{i}')
+    if set_clauses:
+        values[':zero'] = 0
+    
+    update_expression = ' '.join(
+        part for part in (
+            'SET ' + ', '.join(set_clauses) if set_clauses else '',
+            'ADD ' + ', '.join(add_clauses) if add_clauses else ''
+        ) if part
+    )
+    
+    update_kwargs = {
+        'Key': {'restaurantId': restaurant_id},
+        'UpdateExpression': update_expression,
+        'ConditionExpression': 'attribute_exists(restaurantId)',
+        'ExpressionAttributeValues': values
+    }
+    if names:
+        update_kwargs['ExpressionAttributeNames'] = names
+    
+    try:
+        restaurants_table.update_item(**update_kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ValidationException' or not set_clauses:
+            raise
+        # Restaurants stored before the rollup existed have no sentimentBreakdown map yet
+        restaurants_table.update_item(
+            Key={'restaurantId': restaurant_id},
+            UpdateExpression='SET sentimentBreakdown = if_not_exists(sentimentBreakdown, :empty)',
+            ConditionExpression='attribute_exists(restaurantId)',
+            ExpressionAttributeValues={':empty': {}}
+        )
+        restaurants_table.update_item(**update_kwargs)
+
+def minhash_coefficients() -> List[Tuple[int, int]]:
+    """Fixed (a, b) pairs of the MinHash permutations h(x) = (a * x + b) mod p"""
+    
+    coefficients = []
+    for i in range(MINHASH_PERMUTATIONS):
+        value = int.from_bytes(hashlib.blake2b(f'minhash-{i}'.encode('utf-8'), digest_size=8).digest(), 'big')
+        coefficients.append((value % (MINHASH_PRIME - 1) + 1, (value >> 32) % MINHASH_PRIME))
+    return coefficients
+
+MINHASH_COEFFICIENTS = minhash_coefficients()
+if np is not None:
+    MINHASH_A = np.array([a for a, _ in MINHASH_COEFFICIENTS], dtype=np.int64)[:, None]
+    MINHASH_B = np.array([b for _, b in MINHASH_COEFFICIENTS], dtype=np.int64)[:, None]
+
+def similarity_shingle_hashes(review_text: str) -> List[int]:
+    """Hashes of the character shingles of a normalized review text"""
+    
+    normalized = ' '.join(re.sub(r'[^\w\s]', ' ', (review_text or '').lower()).split())
+    if len(normalized) < SIMILARITY_MIN_TEXT_LENGTH:
+        return []
+    return list({
+        zlib.crc32(normalized[i:i + MINHASH_SHINGLE_SIZE].encode('utf-8')) % MINHASH_PRIME
+        for i in range(len(normalized) - MINHASH_SHINGLE_SIZE + 1)
+    })
+
+def minhash_signature(review_text: str) -> Optional[List[int]]:
+    """MinHash signature of a review, or None if it is too short to compare"""
+    
+    hashes = similarity_shingle_hashes(review_text)
+    if not hashes:
+        return None
+    if np is not None:
+        # a < 2^31 and x < 2^31, so a * x + b fits in int64
+        values = (MINHASH_A * np.asarray(hashes, dtype=np.int64)[None, :] + MINHASH_B) % MINHASH_PRIME
+        return values.min(axis=1).tolist()
+    return [min((a * x + b) % MINHASH_PRIME for x in hashes) for a, b in MINHASH_COEFFICIENTS]
+
+def pack_signature(signature: List[int]) -> bytes:
+    """Signature as stored in the review's minhashSignature attribute"""
+    return struct.pack(f'>{MINHASH_PERMUTATIONS}I', *signature)
+
+def unpack_signature(value) -> List[int]:
+    """Inverse of pack_signature; accepts bytes or a boto3 Binary"""
+    return list(struct.unpack(f'>{MINHASH_PERMUTATIONS}I', bytes(getattr(value, 'value', value))))
+
+def lsh_buckets(signature: List[int]) -> List[str]:
+    """One bucket key per band of the signature"""
+    
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f'>{LSH_ROWS}I', *rows), digest_size=8).hexdigest()
+        buckets.append(f'{band:02d}#{digest}')
+    return buckets
+
+def index_review_for_similarity(similarity_index_table, review_id: str, restaurant_id: str, signature: List[int]):
+    """Write the LSH postings the analyzer uses to find near-duplicate reviews"""
+    
+    with similarity_index_table.batch_writer(overwrite_by_pkeys=['bucket', 'reviewId']) as batch:
+        for bucket in lsh_buckets(signature):
+            batch.put_item(Item={
+                'bucket': bucket,
+                'reviewId': review_id,
+                'restaurantId': restaurant_id
+            })
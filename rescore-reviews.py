@@ -0,0 +1,183 @@
+"""
+Re-score analyzed reviews with the current fake review ruleset, without Comprehend.
+Usage: python rescore-reviews.py [workers] [segments] [--dry-run]
+Scans the Reviews table in parallel segments, one process per segment at a time,
+re-applies the ruleset to the Comprehend outputs stored in comprehendAnalysis,
+and writes back the reviews whose verdict changed. Unchanged reviews are only
+tagged with the ruleset version, so later runs skip them. Reviews analyzed by
+the keyword fallback or the local pre-scorer have no Comprehend outputs and are
+not scanned. Reviews whose stored key phrases, entities or near-duplicate matches
+may have been cut down are skipped rather than re-scored on partial inputs.
+"""
+
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+DEFAULT_WORKERS = os.cpu_count() or 4
+SEGMENTS_PER_WORKER = 4  # Smaller segments keep all workers busy until the end
+SCAN_PAGE_SIZE = 500
+
+analyzer = None  # Loaded once per worker process
+
+def load_analyzer():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def init_worker():
+    global analyzer
+    analyzer = load_analyzer()
+
+def verdict(analysis):
+    """The parts of an analysis result a re-score can change"""
+
+    return (
+        bool(analysis.get('isFake')),
+        round(float(analysis.get('confidence', 0)), 4),
+        tuple(analysis.get('fakeReasons', []))
+    )
+
+def record_ruleset_version(item, result, version):
+    """Tag an unchanged result with the ruleset version, re-encoding its reason codes for that version"""
+
+    analyzer.register_reason_templates()
+    stored = item['comprehendAnalysis']
+    if stored.get('format') == analyzer.ANALYSIS_FORMAT:
+        update_expression = 'SET comprehendAnalysis.rulesetVersion = :version, comprehendAnalysis.reasonCodes = :codes'
+        values = {
+            ':version': version,
+            ':codes': [analyzer.reason_codec.encode(reason) for reason in result.get('fakeReasons', [])]
+        }
+    else:
+        # Written before compact storage; store it compacted
+        update_expression = 'SET comprehendAnalysis = :analysis'
+        values = {':analysis': analyzer.compact_analysis(result)}
+
+    # Leave reviews alone that were re-analyzed since they were read
+    condition, condition_values = analyzer.analyzed_at_condition(item)
+    values.update(condition_values)
+
+    analyzer.reviews_table.update_item(
+        Key={'reviewId': item['reviewId']},
+        UpdateExpression=update_expression,
+        ConditionExpression=condition,
+        ExpressionAttributeValues=values
+    )
+
+def write_rescored(item, result, changed, version):
+    """Write a re-scored result back; False if the review was re-analyzed since it was read"""
+
+    try:
+        if changed:
+            # Conditional on analyzedAt too, so the rollup moves only if this write lands
+            analyzer.update_review_analysis(item['reviewId'], result, read_review=item)
+        else:
+            record_ruleset_version(item, result, version)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+    return True
+
+def rescore_segment(segment, total_segments, dry_run):
+    """Scan one segment of the Reviews table, write back changed verdicts and tag unchanged ones"""
+
+    version = str(analyzer.fake_ruleset['version'])  # Stored as a string
+    stats = {'scanned': 0, 'rescored': 0, 'skipped': 0, 'changed': 0, 'errors': 0, 'scoreSeconds': 0.0}
+    scan_kwargs = {
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'Limit': SCAN_PAGE_SIZE,
+        'ProjectionExpression': 'reviewId, reviewText, #lang, sentiment, isFake, confidence, analyzedAt, comprehendAnalysis',
+        'ExpressionAttributeNames': {'#lang': 'language'},  # 'language' is a reserved word
+        # Results already scored with this ruleset version, or without Comprehend outputs, are left alone
+        'FilterExpression': Attr('comprehendAnalysis').exists() & (
+            Attr('comprehendAnalysis.rulesetVersion').not_exists() |
+            Attr('comprehendAnalysis.rulesetVersion').ne(version)
+        ) & Attr('comprehendAnalysis.prescorerVersion').not_exists() & Attr('comprehendAnalysis.error').not_exists() & (
+            Attr('sentiment').ne(analyzer.UNKNOWN_SENTIMENT)
+        )
+    }
+
+    while True:
+        response = analyzer.reviews_table.scan(**scan_kwargs)
+        stats['scanned'] += response.get('ScannedCount', 0)
+
+        for item in response.get('Items', []):
+            stored = analyzer.expand_analysis(item)
+            started = time.perf_counter()
+            result = analyzer.rescore_stored_analysis(item.get('reviewText', ''), stored)
+            stats['scoreSeconds'] += time.perf_counter() - started
+            if result is None:
+                stats['skipped'] += 1
+                continue
+            changed = verdict(result) != verdict(stored)
+            if not dry_run:
+                try:
+                    if not write_rescored(item, result, changed, version):
+                        stats['skipped'] += 1  # Re-analyzed since it was read; the new analysis stands
+                        continue
+                except Exception as e:
+                    print(f"❌ Error writing review {item['reviewId']}: {e}")
+                    stats['errors'] += 1
+                    continue
+            stats['rescored'] += 1
+            stats['changed'] += int(changed)
+
+        if 'LastEvaluatedKey' not in response:
+            return stats
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def rescore_reviews(workers, total_segments, dry_run):
+    totals = {'scanned': 0, 'rescored': 0, 'skipped': 0, 'changed': 0, 'errors': 0, 'scoreSeconds': 0.0}
+    started = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = {
+            executor.submit(rescore_segment, segment, total_segments, dry_run): segment
+            for segment in range(total_segments)
+        }
+        for future in as_completed(futures):
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"❌ Segment {futures[future]} failed: {e}")
+                totals['errors'] += 1
+                continue
+            for key, value in stats.items():
+                totals[key] += value
+
+    totals['elapsedSeconds'] = time.time() - started
+    return totals
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    dry_run = '--dry-run' in sys.argv
+    workers = int(args[0]) if args else DEFAULT_WORKERS
+    total_segments = int(args[1]) if len(args) > 1 else workers * SEGMENTS_PER_WORKER
+
+    version = load_analyzer().fake_ruleset['version']
+    print(f"🔁 Re-scoring reviews with ruleset v{version}: {workers} workers, {total_segments} segments"
+          + (" (dry run)" if dry_run else ""))
+
+    totals = rescore_reviews(workers, total_segments, dry_run)
+    rate = totals['rescored'] / totals['elapsedSeconds'] if totals['elapsedSeconds'] else 0
+
+    print(f"📊 Scanned {totals['scanned']}, re-scored {totals['rescored']} "
+          f"({totals['skipped']} skipped: incomplete Comprehend outputs or re-analyzed meanwhile)")
+    print(f"✏️  Verdict changed for {totals['changed']} reviews"
+          + (" (not written)" if dry_run else f", {totals['errors']} errors"))
+    print(f"⏱️  {totals['elapsedSeconds']:.1f}s total, {totals['scoreSeconds']:.1f}s scoring, {rate:.0f} reviews/s")
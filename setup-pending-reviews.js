@@ -30,9 +30,10 @@ async function markReviewsAsPending(count = 5) {
       await dynamoDocClient.send(new UpdateCommand({
         TableName: "Reviews",
         Key: { reviewId: review.reviewId },
-        UpdateExpression: "SET isFake = :pending",
+        UpdateExpression: "SET isFake = :pending, pendingRestaurantId = :restaurantId",
         ExpressionAttributeValues: {
-          ":pending": "pending"
+          ":pending": "pending",
+          ":restaurantId": review.restaurantId
         }
       }));
       
@@ -50,6 +50,7 @@ export async function updateReviewWithAIAnalysis(
             aiVersion = :aiVersion,
             aiAnalysisDate = :analysisDate,
             detectionReasons = :reasons
+        REMOVE pendingRestaurantId
       `,
       ExpressionAttributeValues: {
         ":isFake": aiAnalysis.isFake ? "true" : "false",
@@ -1,5 +1,5 @@
 import * as dotenv from "dotenv";
-import { DynamoDBClient, CreateTableCommand } from "@aws-sdk/client-dynamodb";
+import { DynamoDBClient, CreateTableCommand, UpdateTimeToLiveCommand, waitUntilTableExists } from "@aws-sdk/client-dynamodb";
 
 // Load environment variables
 dotenv.config({ path: '.env.local' });
@@ -56,7 +56,8 @@ async function createTrustBitesSchema() {
         { AttributeName: "reviewId", AttributeType: "S" },
         { AttributeName: "restaurantId", AttributeType: "S" }, // For querying by restaurant
         { AttributeName: "scrapedAt", AttributeType: "S" },    // For time-based queries
-        { AttributeName: "isFake", AttributeType: "S" }        // For filtering fake/real reviews
+        { AttributeName: "isFake", AttributeType: "S" },       // For filtering fake/real reviews
+        { AttributeName: "pendingRestaurantId", AttributeType: "S" } // Only set while awaiting analysis
       ],
       GlobalSecondaryIndexes: [
         {
@@ -74,6 +75,15 @@ async function createTrustBitesSchema() {
             { AttributeName: "scrapedAt", KeyType: "RANGE" }
           ],
           Projection: { ProjectionType: "ALL" }
+        },
+        {
+          // Sparse: holds only reviews still waiting for analysis
+          IndexName: "PendingReviewsIndex",
+          KeySchema: [
+            { AttributeName: "pendingRestaurantId", KeyType: "HASH" },
+            { AttributeName: "scrapedAt", KeyType: "RANGE" }
+          ],
+          Projection: { ProjectionType: "ALL" }
         }
       ],
       BillingMode: "PAY_PER_REQUEST"
@@ -104,6 +114,92 @@ async function createTrustBitesSchema() {
       BillingMode: "PAY_PER_REQUEST"
     }));
 
+    // 4. Restaurant Search Index Table (trigram postings for name search)
+    console.log("Creating RestaurantSearchIndex table...");
+    await client.send(new CreateTableCommand({
+      TableName: "RestaurantSearchIndex",
+      KeySchema: [
+        { AttributeName: "searchTerm", KeyType: "HASH" },   // e.g. name#vil
+        { AttributeName: "restaurantId", KeyType: "RANGE" }
+      ],
+      AttributeDefinitions: [
+        { AttributeName: "searchTerm", AttributeType: "S" },
+        { AttributeName: "restaurantId", AttributeType: "S" }
+      ],
+      BillingMode: "PAY_PER_REQUEST"
+    }));
+
+    // 5. Analysis Cache Table (Comprehend outputs keyed by review text hash)
+    console.log("Creating AnalysisCache table...");
+    await client.send(new CreateTableCommand({
+      TableName: "AnalysisCache",
+      KeySchema: [
+        { AttributeName: "contentHash", KeyType: "HASH" }
+      ],
+      AttributeDefinitions: [
+        { AttributeName: "contentHash", AttributeType: "S" }
+      ],
+      BillingMode: "PAY_PER_REQUEST"
+    }));
+    await waitUntilTableExists({ client, maxWaitTime: 120 }, { TableName: "AnalysisCache" });
+    await client.send(new UpdateTimeToLiveCommand({
+      TableName: "AnalysisCache",
+      TimeToLiveSpecification: { AttributeName: "expiresAt", Enabled: true }
+    }));
+
+    // 6. Review Similarity Index Table (MinHash/LSH buckets for near-duplicate reviews)
+    console.log("Creating ReviewSimilarityIndex table...");
+    await client.send(new CreateTableCommand({
+      TableName: "ReviewSimilarityIndex",
+      KeySchema: [
+        { AttributeName: "bucket", KeyType: "HASH" },   // e.g. 03#9f2c61d0a4b7e815
+        { AttributeName: "reviewId", KeyType: "RANGE" }
+      ],
+      AttributeDefinitions: [
+        { AttributeName: "bucket", AttributeType: "S" },
+        { AttributeName: "reviewId", AttributeType: "S" }
+      ],
+      BillingMode: "PAY_PER_REQUEST"
+    }));
+
+    // 7. Author Profiles Table (per-author rollups for behavior signals)
+    console.log("Creating AuthorProfiles table...");
+    await client.send(new CreateTableCommand({
+      TableName: "AuthorProfiles",
+      KeySchema: [
+        { AttributeName: "authorKey", KeyType: "HASH" },    // e.g. google#1234567890 or name#ahmad
+        { AttributeName: "profileKey", KeyType: "RANGE" }   // "profile" or an hourly window, e.g. hour#2024-01-15T09
+      ],
+      AttributeDefinitions: [
+        { AttributeName: "authorKey", AttributeType: "S" },
+        { AttributeName: "profileKey", AttributeType: "S" }
+      ],
+      BillingMode: "PAY_PER_REQUEST"
+    }));
+    await waitUntilTableExists({ client, maxWaitTime: 120 }, { TableName: "AuthorProfiles" });
+    await client.send(new UpdateTimeToLiveCommand({
+      TableName: "AuthorProfiles",
+      TimeToLiveSpecification: { AttributeName: "expiresAt", Enabled: true }
+    }));
+
+    // 8. Places Cache Table (Google Places API responses, expired by TTL)
+    console.log("Creating PlacesCache table...");
+    await client.send(new CreateTableCommand({
+      TableName: "PlacesCache",
+      KeySchema: [
+        { AttributeName: "cacheKey", KeyType: "HASH" }   // e.g. details#<sha256 of request parameters>
+      ],
+      AttributeDefinitions: [
+        { AttributeName: "cacheKey", AttributeType: "S" }
+      ],
+      BillingMode: "PAY_PER_REQUEST"
+    }));
+    await waitUntilTableExists({ client, maxWaitTime: 120 }, { TableName: "PlacesCache" });
+    await client.send(new UpdateTimeToLiveCommand({
+      TableName: "PlacesCache",
+      TimeToLiveSpecification: { AttributeName: "expiresAt", Enabled: true }
+    }));
+
     console.log("✅ All tables created successfully!");
     console.log("Wait a few seconds for tables to become active...");
 
@@ -121,7 +217,7 @@ console.log(`
 🗄️ TrustBites Database Schema:
 
 📍 RESTAURANTS TABLE:
-- restaurantId (PK): Unique restaurant identifier  
+- restaurantId (PK): Unique restaurant identifier (rest_<sha256 of the Google place ID>)  
 - name: Restaurant name
 - address: Full address
 - location: City/area for location-based queries
@@ -130,21 +226,29 @@ console.log(`
 - avgRating: Average rating from scraped reviews
 - totalReviews: Total number of reviews scraped
 - lastScraped: When this restaurant was last scraped
+- lastChecked: When a scheduled refresh last probed its rating and review count
 - googlePlaceId: Google Maps place ID
+- reviewCount, fakeCount: Review rollup maintained by scrapers and analyzer
+- sentimentBreakdown: Map of sentiment -> review count (same rollup)
 
 📝 REVIEWS TABLE:  
-- reviewId (PK): Unique review identifier
+- reviewId (PK): Unique review identifier (rev_<sha256 of restaurantId, author and reviewDate>)
 - restaurantId (GSI): Links to restaurant
 - authorName: Reviewer name from Google Maps
+- authorKey: AuthorProfiles key (google#<contributor id> or name#<normalized name>)
 - reviewText: The actual review content
 - rating: Star rating (1-5)
 - reviewDate: When review was originally posted
 - scrapedAt (GSI): When we scraped this review
 - language: Detected language (en, ms, etc.)
 - isFake (GSI): Classification result (true/false/pending)
+- pendingRestaurantId (GSI): Copy of restaurantId, present only while isFake is pending
 - confidence: ML confidence score (0-1)
 - sentiment: POSITIVE/NEGATIVE/NEUTRAL/MIXED
-- comprehendAnalysis: Full Comprehend analysis results
+- comprehendAnalysis: Compact analysis result (format 1): rulesetVersion, reasonCodes
+  ("#<code>|<value>..." into the ruleset's reason templates) and blob (zlib JSON of
+  sentiment scores, key phrases, entities, near-duplicates and author signals)
+- minhashSignature: 128 x uint32 MinHash signature of the review text (binary)
 - sagemakerAnalysis: SageMaker model results
 - sourceUrl: Google Maps review URL
 
@@ -159,6 +263,42 @@ console.log(`
 - languageBreakdown: Distribution of languages
 - confidenceDistribution: ML confidence metrics
 - recommendations: Suggestions for restaurant owners
+- ruleset_<version> items: reasonTemplates (reason code -> sentence) of a fake review ruleset
+
+🔎 RESTAURANT_SEARCH_INDEX TABLE:
+- searchTerm (PK): Name trigram, e.g. "name#vil"
+- restaurantId (SK): Restaurant whose name contains the trigram
+- locationKey: Lower-cased restaurant location for filtering
+- tokenCount: Number of trigrams in the restaurant name (for ranking)
+
+🧠 ANALYSIS_CACHE TABLE:
+- contentHash (PK): SHA-256 of language hint + normalized review text
+- language: Language Comprehend analyzed the text in
+- sentiment, keyPhrases, entities: Comprehend outputs used by fake detection
+- cachedAt: When the entry was written
+- expiresAt: DynamoDB TTL (epoch seconds)
+
+🧬 REVIEW_SIMILARITY_INDEX TABLE:
+- bucket (PK): LSH band and hash of its signature rows, e.g. "03#9f2c61d0a4b7e815"
+- reviewId (SK): Review whose signature falls in the bucket
+- restaurantId: Restaurant of that review
+
+👤 AUTHOR_PROFILES TABLE:
+- authorKey (PK): google#<contributor id>, or name#<normalized author name>
+- profileKey (SK): "profile" for the running totals, "hour#YYYY-MM-DDTHH" per hourly window
+- reviewCount, fiveStarCount: Reviews stored (in total / in the window)
+- ratedCount, ratingSum, ratingSquareSum: Rating totals (mean and variance in O(1))
+- restaurantIds: String set of restaurants reviewed (profile item)
+- expiresAt: DynamoDB TTL on hourly windows (epoch seconds)
+
+🗺️ PLACES_CACHE TABLE:
+- cacheKey (PK): Places endpoint + SHA-256 of the request parameters (query or place_id, fields),
+  or nearbysearch#<geohash cell>#<radius>#<type> for an area's nearby search results
+- response: zlib-compressed JSON response (binary)
+- cachedAt: When the entry was written
+- expiresAt: DynamoDB TTL (epoch seconds), per-endpoint TTL
+- softExpiresAt: Area cells only; past it the cell is served stale and refreshed in the background
+- refreshingUntil: Area cells only; lease held by the invocation refreshing the cell
 `);
 
 createTrustBitesSchema();
\ No newline at end of file
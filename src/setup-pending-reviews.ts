@@ -25,9 +25,10 @@ async function markReviewsAsPending(count: number = 3) {
       await dynamoDocClient.send(new UpdateCommand({
         TableName: "Reviews",
         Key: { reviewId: review.reviewId },
-        UpdateExpression: "SET isFake = :pending",
+        UpdateExpression: "SET isFake = :pending, pendingRestaurantId = :restaurantId",
         ExpressionAttributeValues: {
-          ":pending": "pending"
+          ":pending": "pending",
+          ":restaurantId": review.restaurantId
         }
       }));
       
@@ -0,0 +1,55 @@
+"""
+Check that Places reviews are keyed to their real Google author, without calling AWS.
+Every review's author_url ends in /reviews, so keying on its last path segment
+would put all reviewers on a single author profile.
+Usage: python test-author-keys.py
+"""
+
+import importlib.util
+import os
+import sys
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-1')
+
+# Shape of the author_url the Places Details API returns for a review
+AUTHOR_URL = "https://www.google.com/maps/contrib/104873412598613461523/reviews"
+OTHER_AUTHOR_URL = "https://www.google.com/maps/contrib/117335206398717404812/reviews"
+
+def load_scraper():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('google_places_scraper', os.path.join(lambda_dir, 'google-places-scraper.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def review_author_key(scraper, review):
+    """The authorKey store_reviews gives a Places review"""
+
+    return scraper.author_key({
+        'authorName': review.get('author_name', 'Anonymous'),
+        'googleReviewId': scraper.contributor_id(review.get('author_url', ''))
+    })
+
+def test_contributor_id(scraper):
+    assert scraper.contributor_id(AUTHOR_URL) == '104873412598613461523'
+    assert scraper.contributor_id('') == ''
+    assert scraper.contributor_id(None) == ''
+    print("✅ contributor_id parses the id out of author_url")
+
+def test_authors_get_their_own_keys(scraper):
+    keys = [review_author_key(scraper, review) for review in (
+        {'author_name': 'Aisyah', 'author_url': AUTHOR_URL},
+        {'author_name': 'Daniel', 'author_url': OTHER_AUTHOR_URL},
+        {'author_name': 'Mei Ling'}
+    )]
+
+    assert keys == ['google#104873412598613461523', 'google#117335206398717404812', 'name#mei ling'], keys
+    print("✅ Each reviewer gets their own author key")
+
+if __name__ == "__main__":
+    scraper = load_scraper()
+    test_contributor_id(scraper)
+    test_authors_get_their_own_keys(scraper)
+    print("🎉 All author key checks passed")
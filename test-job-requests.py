@@ -0,0 +1,61 @@
+"""
+Check that queueing a job stores its request body in a form DynamoDB accepts, without calling AWS.
+boto3 rejects Python floats, so a body such as {"restaurant_id": ..., "min_confidence": 0.8}
+must not fail the put of the job item.
+Usage: python test-job-requests.py
+"""
+
+import importlib.util
+import json
+import os
+import sys
+from boto3.dynamodb.types import TypeSerializer
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-1')
+os.environ.setdefault('CURSOR_SECRET', 'test-job-requests')
+
+class FakeTable:
+    """Stands in for the AnalysisResults table; serializes items the way boto3 does"""
+
+    def __init__(self):
+        self.items = []
+
+    def put_item(self, Item):
+        serializer = TypeSerializer()
+        self.items.append({name: serializer.serialize(value) for name, value in Item.items()})
+
+class FakeLambda:
+    def __init__(self):
+        self.payloads = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        self.payloads.append(json.loads(Payload))
+
+def load_api_handler():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('api_gateway_handler', os.path.join(lambda_dir, 'api-gateway-handler.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_float_in_job_body(api):
+    api.analysis_table = FakeTable()
+    api.lambda_client = FakeLambda()
+    response = api.lambda_handler({
+        'httpMethod': 'POST',
+        'path': '/api/analyze',
+        'body': json.dumps({'restaurant_id': 'rest_123', 'min_confidence': 0.8, 'weights': [0.25, 1.5]})
+    }, None)
+
+    assert response['statusCode'] == 202, response
+    request = api.analysis_table.items[0]['request']['M']
+    assert request['min_confidence'] == {'N': '0.8'}, request
+    assert api.lambda_client.payloads[0]['min_confidence'] == 0.8
+    print("✅ A job body with floats is queued and stored")
+
+if __name__ == "__main__":
+    api = load_api_handler()
+    test_float_in_job_body(api)
+    print("🎉 All job request checks passed")
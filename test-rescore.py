@@ -0,0 +1,118 @@
+"""
+Check that re-scoring stored analysis results under an unchanged ruleset is a no-op, without calling AWS.
+Each synthetic review is scored the way the analyzer scores it, stored in the
+compact form, read back, and re-scored; the verdict must come back unchanged,
+or the review must be skipped when its stored inputs may have been cut down.
+Usage: python test-rescore.py
+"""
+
+import importlib.util
+import os
+import random
+import sys
+from decimal import Decimal
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-southeast-1')
+
+WORDS = ('food service place staff nasi lemak roti canai teh tarik curry rice noodles chicken sambal spicy sweet '
+         'best ever amazing experience perfect place highly recommend five stars worst never again terrible').split()
+SUSPICIOUS_PHRASES = ['best ever', 'amazing experience', 'perfect place', 'highly recommend', 'five stars',
+                      'worst ever', 'terrible experience', 'never again', 'waste of money']
+ENTITY_TYPES = ['COMMERCIAL_ITEM', 'ORGANIZATION', 'LOCATION', 'PERSON']
+
+def load_analyzer():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def verdict(analysis):
+    return bool(analysis['isFake']), round(float(analysis['confidence']), 4), list(analysis['fakeReasons'])
+
+def stored_review(analyzer, rng: random.Random):
+    """Review text and the review item the analyzer would store for it"""
+
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+    sentiment = rng.choice(['POSITIVE', 'NEGATIVE', 'NEUTRAL'])
+    top = rng.choice([rng.random(), 0.95 + rng.uniform(-0.0004, 0.0004), 0.9 + rng.uniform(-0.0004, 0.0004)])
+    rest = [rng.random() for _ in range(3)]
+    scores = dict(zip(['Positive', 'Negative', 'Neutral', 'Mixed'], [top] + [(1 - top) * r / sum(rest) for r in rest]))
+    if sentiment == 'NEGATIVE':
+        scores['Positive'], scores['Negative'] = scores['Negative'], scores['Positive']
+
+    key_phrases = [rng.choice(SUSPICIOUS_PHRASES + WORDS) for _ in range(rng.randint(0, 16))]
+    entities = [{'Text': rng.choice(WORDS), 'Type': rng.choice(ENTITY_TYPES)} for _ in range(rng.randint(0, 8))]
+    result = analyzer.build_analysis_result(
+        text, 'en', {'Sentiment': sentiment, 'SentimentScore': scores},
+        {'KeyPhrases': [{'Text': phrase} for phrase in key_phrases]}, {'Entities': entities}
+    )
+    if rng.random() < 0.3:
+        result = analyzer.apply_near_duplicates(result, [
+            {'reviewId': f'review_{i}', 'restaurantId': f'rest_{rng.randint(1, 9)}', 'similarity': rng.uniform(0.8, 1.0)}
+            for i in range(rng.randint(1, 8))
+        ])
+    if rng.random() < 0.5:
+        review_count = rng.randint(1, 30)
+        result = analyzer.apply_author_behavior(result, {
+            'review_count': review_count, 'restaurants_reviewed': review_count, 'rating_mean': 5.0,
+            'rating_variance': rng.choice([0.0, 0.01 + rng.uniform(-0.00004, 0.00004), rng.random()]),
+            'five_star_share': rng.random(), 'hour_reviews': rng.randint(1, 25), 'hour_five_star_reviews': rng.randint(0, 12)
+        })
+
+    review = {
+        'language': result['language'],
+        'sentiment': result['sentiment'],
+        'isFake': 'true' if result['isFake'] else 'false',
+        'confidence': Decimal(str(round(float(result['confidence']), 4))),
+        'comprehendAnalysis': analyzer.compact_analysis(result),
+        'analyzedAt': result['analysisTimestamp']
+    }
+    return text, result, review
+
+def test_unchanged_ruleset_is_a_no_op(analyzer):
+    rng = random.Random(16)
+    rescored = skipped = 0
+    for _ in range(5000):
+        text, result, review = stored_review(analyzer, rng)
+        stored = analyzer.expand_analysis(review)
+        assert verdict(stored) == verdict(result), (verdict(stored), verdict(result))
+
+        rescore = analyzer.rescore_stored_analysis(text, stored)
+        if rescore is None:
+            skipped += 1
+            continue
+        rescored += 1
+        assert verdict(rescore) == verdict(result), (text, verdict(rescore), verdict(result))
+
+    assert rescored and skipped
+    print(f"✅ Re-scoring under the same ruleset changed no verdicts ({rescored} re-scored, {skipped} skipped)")
+
+def test_cut_down_inputs_are_skipped(analyzer):
+    text = 'Nasi lemak with sambal and fried chicken, friendly staff and quick service'
+    scores = {'Positive': 0.6, 'Negative': 0.1, 'Neutral': 0.2, 'Mixed': 0.1}
+    full_inputs = [
+        ({'KeyPhrases': [{'Text': word} for word in WORDS[:analyzer.STORED_KEY_PHRASES]] + [
+            {'Text': phrase} for phrase in SUSPICIOUS_PHRASES[:3]]}, {'Entities': []}),
+        ({'KeyPhrases': []}, {'Entities': [{'Text': 'Nasi', 'Type': 'LOCATION'}] * analyzer.STORED_ENTITIES + [
+            {'Text': 'Brand', 'Type': 'ORGANIZATION'}] * 4})
+    ]
+    for key_phrases, entities in full_inputs:
+        result = analyzer.build_analysis_result(text, 'en', {'Sentiment': 'POSITIVE', 'SentimentScore': scores},
+                                                key_phrases, entities)
+        assert analyzer.rescore_stored_analysis(text, result) is None
+
+    result = analyzer.build_analysis_result(text, 'en', {'Sentiment': 'POSITIVE', 'SentimentScore': scores},
+                                            {'KeyPhrases': []}, {'Entities': []})
+    matches = [{'reviewId': f'review_{i}', 'restaurantId': 'rest_1', 'similarity': 0.9}
+               for i in range(analyzer.STORED_NEAR_DUPLICATES + 1)]
+    assert analyzer.rescore_stored_analysis(text, analyzer.apply_near_duplicates(result, matches)) is None
+    print("✅ Results whose key phrases, entities or near-duplicates were cut down are skipped")
+
+if __name__ == "__main__":
+    analyzer = load_analyzer()
+    test_unchanged_ruleset_is_a_no_op(analyzer)
+    test_cut_down_inputs_are_skipped(analyzer)
+    print("🎉 All re-scoring checks passed")
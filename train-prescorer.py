@@ -0,0 +1,157 @@
+"""
+Train the analyzer's local pre-scorer from already-analyzed Reviews items.
+Usage: python train-prescorer.py [output.json]
+Fits a logistic regression over the analyzer's own features (hashed n-gram
+TF-IDF plus length, rating, exclamation and superlative features) and picks
+the score band outside of which the model agrees with the Comprehend-based
+verdicts at least TARGET_AGREEMENT of the time on held-out reviews.
+Ship the JSON with the analyzer and set PRESCORER_MODEL_PATH to enable it.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+from datetime import datetime
+import numpy as np
+from load_env import load_env_file
+
+# Load environment variables from .env.local
+load_env_file()
+
+HASH_DIMS = 2 ** 12
+EPOCHS = 20
+BATCH_SIZE = 512
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-4
+HOLDOUT_FRACTION = 0.2
+TARGET_AGREEMENT = 0.98  # Required agreement with Comprehend for reviews finalized locally
+MIN_BAND_SUPPORT = 50  # Held-out reviews needed on a side before it is finalized locally
+
+def load_analyzer():
+    lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambda-functions')
+    if lambda_dir not in sys.path:
+        sys.path.insert(0, lambda_dir)  # The Lambdas import trustbites_common from their own directory
+    spec = importlib.util.spec_from_file_location('comprehend_analyzer', os.path.join(lambda_dir, 'comprehend-analyzer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def get_labeled_reviews(analyzer):
+    """Reviews with a Comprehend-based verdict (not fallback or pre-scorer results)"""
+    
+    scan_kwargs = {
+        'FilterExpression': 'isFake IN (:true, :false) AND attribute_not_exists(comprehendAnalysis.prescorerVersion) '
+                            'AND attribute_not_exists(comprehendAnalysis.#error)',
+        'ProjectionExpression': 'reviewText, rating, isFake',
+        'ExpressionAttributeNames': {'#error': 'error'},
+        'ExpressionAttributeValues': {':true': 'true', ':false': 'false'}
+    }
+    reviews = []
+    
+    while True:
+        response = analyzer.reviews_table.scan(**scan_kwargs)
+        reviews.extend(item for item in response.get('Items', []) if (item.get('reviewText') or '').strip())
+        if 'LastEvaluatedKey' not in response:
+            return reviews
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def choose_band(probabilities: np.ndarray, labels: np.ndarray):
+    """
+    Thresholds beyond which local verdicts agree with Comprehend often enough
+    A side that never reaches TARGET_AGREEMENT gets a threshold no score can cross.
+    """
+    
+    order = np.argsort(probabilities)
+    sorted_probabilities = probabilities[order]
+    sorted_labels = labels[order]
+    band_sizes = np.arange(1, len(order) + 1)
+    
+    # Genuine side: the highest cut whose lower band is still mostly genuine
+    genuine_agreement = np.cumsum(1 - sorted_labels) / band_sizes
+    qualifying = np.nonzero((genuine_agreement >= TARGET_AGREEMENT) & (band_sizes >= MIN_BAND_SUPPORT)
+                            & (sorted_probabilities < 0.5))[0]
+    genuine_below = float(sorted_probabilities[qualifying[-1]]) if len(qualifying) else -1.0
+    
+    # Fake side: the lowest cut whose upper band is still mostly fake
+    fake_agreement = np.cumsum(sorted_labels[::-1]) / band_sizes
+    qualifying = np.nonzero((fake_agreement >= TARGET_AGREEMENT) & (band_sizes >= MIN_BAND_SUPPORT)
+                            & (sorted_probabilities[::-1] > 0.5))[0]
+    fake_above = float(sorted_probabilities[::-1][qualifying[-1]]) if len(qualifying) else 2.0
+    return genuine_below, fake_above
+
+def train_prescorer(output_path: str = 'prescorer-model.json'):
+    analyzer = load_analyzer()
+    reviews = get_labeled_reviews(analyzer)
+    if len(reviews) < 2 * MIN_BAND_SUPPORT:
+        print(f"❌ Only {len(reviews)} analyzed reviews; analyze more before training")
+        return
+    
+    labels = np.array([1.0 if review['isFake'] == 'true' else 0.0 for review in reviews], dtype=np.float32)
+    superlatives = frozenset(analyzer.PRESCORER_SUPERLATIVES)
+    hashed = [analyzer.prescorer_hashed_tokens(review, HASH_DIMS) for review in reviews]
+    dense = np.array([analyzer.prescorer_dense_features(review, superlatives) for review in reviews], dtype=np.float32)
+    
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(reviews))
+    holdout_size = int(len(reviews) * HOLDOUT_FRACTION)
+    holdout, train = order[:holdout_size], order[holdout_size:]
+    
+    # IDF and dense scaling come from the training split only
+    document_frequency = np.zeros(HASH_DIMS, dtype=np.float32)
+    for i in train:
+        document_frequency[np.unique(hashed[i])] += 1
+    model = {
+        'version': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'hash_dims': HASH_DIMS,
+        'superlatives': superlatives,
+        'idf': np.log((1 + len(train)) / (1 + document_frequency)).astype(np.float32) + 1,
+        'dense_mean': dense[train].mean(axis=0),
+        'dense_std': np.maximum(dense[train].std(axis=0), 1e-6)
+    }
+    
+    def features(indices):
+        return analyzer.prescorer_matrix([hashed[i] for i in indices], dense[indices].tolist(), model)
+    
+    # Mini-batch logistic regression, one feature matrix per batch in memory
+    weights = np.zeros(HASH_DIMS + analyzer.PRESCORER_DENSE_FEATURES, dtype=np.float32)
+    bias = 0.0
+    for epoch in range(EPOCHS):
+        epoch_order = rng.permutation(train)
+        for start in range(0, len(epoch_order), BATCH_SIZE):
+            batch = epoch_order[start:start + BATCH_SIZE]
+            x = features(batch)
+            error = 1.0 / (1.0 + np.exp(-(x @ weights + bias))) - labels[batch]
+            weights -= LEARNING_RATE * (x.T @ error / len(batch) + L2_PENALTY * weights)
+            bias -= LEARNING_RATE * float(error.mean())
+    model['weights'] = weights
+    model['bias'] = bias
+    
+    holdout_probabilities = np.concatenate([
+        1.0 / (1.0 + np.exp(-(features(holdout[start:start + BATCH_SIZE]) @ weights + bias)))
+        for start in range(0, len(holdout), BATCH_SIZE)
+    ])
+    genuine_below, fake_above = choose_band(holdout_probabilities, labels[holdout])
+    model['genuine_below'] = genuine_below
+    model['fake_above'] = fake_above
+    
+    local = (holdout_probabilities <= genuine_below) | (holdout_probabilities >= fake_above)
+    agreement = ((holdout_probabilities >= fake_above) == (labels[holdout] == 1))[local].mean() if local.any() else 0.0
+    accuracy = ((holdout_probabilities >= 0.5) == (labels[holdout] == 1)).mean()
+    
+    serializable = {
+        name: value.tolist() if isinstance(value, np.ndarray) else value
+        for name, value in model.items()
+    }
+    serializable['superlatives'] = sorted(superlatives)
+    serializable['trained_on'] = len(train)
+    with open(output_path, 'w') as f:
+        json.dump(serializable, f)
+    
+    print(f"✅ Trained pre-scorer {model['version']} on {len(train)} reviews ({labels.mean():.1%} fake)")
+    print(f"📊 Held-out accuracy {accuracy:.1%}; genuine below {genuine_below:.3f}, fake above {fake_above:.3f}")
+    print(f"⚡ {local.mean():.1%} of held-out reviews decided locally, {agreement:.1%} agreeing with Comprehend")
+    print(f"💾 Saved to {output_path}")
+
+if __name__ == "__main__":
+    train_prescorer(sys.argv[1] if len(sys.argv) > 1 else 'prescorer-model.json')